@@ -5,29 +5,72 @@ if __name__ == '__main__':
     raise SystemExit()
 
 import os
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, TypeVar
 import pygame
-from audio.audio_manager import AudioManager
+from audio.audio_manager import AudioManager, DEFAULT_NOTES, get_note_classifier
+from audio.ensemble import Ensemble
+from audio.note_model import NoteModel
+from audio.song_catalog import SongCatalog
+from audio.synth import SynthCache, make_sound
 from screen.login import Login
 from screen.main_menu import MainMenu
 from screen.options import Options
 from screen.song_select import SongSelect
 from screen.calibrate import Calibrate
+from screen.tuner import Tuner
 from screen.performance import Performance
 from screen.analysis import Analysis
 from user.user import User
+from user.user_store import UserStore
+from user.performance_history import PerformanceHistory
+from user.leaderboard import Leaderboard
+from user.calibration_profiles import CalibrationProfiles
 
 # Handle type checking without incurring a circular import error as TYPE_CHECKING is always False at runtime
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
+    import numpy as np
     from ui.button import Button
     from ui.scrollbar import ScrollBar
     from ui.text_input import TextInput
     from ui.song_tab import SongTab
 
+T = TypeVar('T')
+
+# Posted when a song preview has finished rendering, so a menu waiting for input handles it straight away
+PREVIEW_RENDERED = pygame.event.custom_type()
+
 class Application:
-    def __init__(self):
+    def __init__(self, headless: bool = False, audio: AudioManager | None = None, clock=None):
+        '''
+        Create the Application instance.
+
+        Args:
+            headless (bool): Run without a window, using the SDL dummy drivers. Screens do not transition after a performance.
+                             default: False
+            audio (AudioManager): Audio source to use in place of the microphone
+                                  default: None, use the microphone
+            clock: Clock to use in place of pygame.time.Clock, with the same `tick` method
+                   default: None, use pygame.time.Clock
+        '''
+        self.headless = headless
+        # Headless runs keep their users, scores, history, calibration and renders in a temporary directory,
+        # so they start from the same state every time and never write to the saved data
+        self.data_directory: tempfile.TemporaryDirectory | None = None
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+            self.data_directory = tempfile.TemporaryDirectory(prefix='music-maestro-', ignore_cleanup_errors=True)
+            os.mkdir(os.path.join(self.data_directory.name, 'users'))
+
         self.BACKGROUND_COLOR = (255, 255, 255)
         self.WINDOW_SIZE = (1280, 720)
+        self.menu_frame_rate = 60 # Upper bound on redraws per second for menu screens
+        self.idle_timeout = 500 # Milliseconds to wait for input on menu screens before drawing a frame anyway
+        self.idle_poll_interval = .01 # Seconds between checks for input while a menu screen waits
         self.font_sizes = {}
         self.images = {}
 
@@ -53,6 +96,7 @@ class Application:
         self.text_inputs: list[TextInput] = []
         self.song_tabs: list[SongTab] = []
         self.song: tuple[str, str, str] | None = None
+        self.song_catalog = SongCatalog(**self.get_data_paths(index_path='song_catalog.json'))
         
         self.screens = {
             'main_menu': MainMenu(self),
@@ -60,33 +104,65 @@ class Application:
             'options': Options(self),
             'login': Login(self),
             'calibrate': Calibrate(self),
+            'tuner': Tuner(self),
             'performance': Performance(self),
             'analysis': Analysis(self)
         }
 
-        self.clock = pygame.time.Clock()
-        self.audio = AudioManager()
+        self.clock = clock if clock else pygame.time.Clock()
+        # Screens run one at a time as a task of the event loop, and leaving a screen cancels its task
+        self.screen_task: asyncio.Task | None = None
+        self.next_screen: str | None = None
+        # Blocking reads of the microphone run one at a time in the order they are made, as do writes to disk,
+        # so a read or write still in flight when a screen is left finishes before the next one starts
+        self.capture_executor = ThreadPoolExecutor(1, thread_name_prefix='capture')
+        self.persistence_executor = ThreadPoolExecutor(1, thread_name_prefix='persistence')
+        # Songs are rendered for previews on their own executor, so a preview never waits behind writes to disk
+        self.preview_executor = ThreadPoolExecutor(1, thread_name_prefix='preview')
+        self.saves: set[asyncio.Future] = set()
+        self.audio = audio if audio else AudioManager()
+        self.ensemble = Ensemble.from_channels(self.audio)
+        # Song of each player after the first, who all play Application.song unless given their own part
+        self.parts: list[tuple[str, str, str]] = []
 
         self.performance_results = {}
+        self.record_sessions = False
+        # Score notes by MIDI number, so they must be played in the right octave, rather than by pitch class
+        self.octave_aware = False
+        # Play a click on every beat of a performance
+        self.play_metronome = False
 
-        # Default note values
-        self.default_notes = {
-            'A': [440],
-            'A#/Bb': [466],
-            'B': [493],
-            'C': [523],
-            'C#/Db': [554],
-            'D': [587],
-            'D#/Eb': [622],
-            'E': [659],
-            'F': [698],
-            'F#/Gb': [739],
-            'G': [783],
-            'G#/Ab': [830]
-        }
+        self.default_notes = DEFAULT_NOTES
         self.reset_notes()
 
-        self.user = User()
+        self.user_store = UserStore(**self.get_data_paths(path=os.path.join('users', 'users.db'), legacy_directory='users'))
+        self.user = User(self.user_store)
+        self.performance_history = PerformanceHistory(**self.get_data_paths(path=os.path.join('users', 'history.db')))
+        self.leaderboard = Leaderboard(**self.get_data_paths(path=os.path.join('users', 'leaderboard.db')))
+        self.leaderboard.seed(self.user_store)
+        self.calibration_profiles = CalibrationProfiles(**self.get_data_paths(path='calibration.json'))
+        self.load_calibration()
+
+        self.synth_cache = SynthCache(**self.get_data_paths(directory='synth'))
+        # Path of the song being previewed and the sound playing it
+        self.preview: tuple[str, pygame.mixer.Sound] | None = None
+        # Path of the song being rendered to be previewed and the task rendering it
+        self.preview_render: tuple[str, asyncio.Task] | None = None
+
+    def get_data_paths(self, **names: str) -> dict[str, str]:
+        '''
+        Get the locations a store should keep its data in, for passing to its constructor.
+
+        Args:
+            **names: Each argument of the store's constructor and the name of the file or directory it is a location of
+
+        Returns:
+            dict: Each argument and its location in the temporary data directory of a headless run,
+                  or an empty dictionary so the store uses its default locations
+        '''
+        if not self.data_directory:
+            return {}
+        return {argument: os.path.join(self.data_directory.name, name) for argument, name in names.items()}
 
     def _handle_event(self, event: pygame.event.Event) -> None:
         mouse_position = pygame.mouse.get_pos()
@@ -106,12 +182,35 @@ class Application:
             return
 
         for button in self.screen_buttons:
-            if button.is_hovered(mouse_position):
+            if button.is_hovered(mouse_position, mouse_clicked):
                 button.call()
                 return
             
     def reset_notes(self) -> None:
         self.notes = self.default_notes.copy()
+
+    def load_calibration(self) -> None:
+        '''
+        Use the saved calibration of the current user and input device, or the default notes if there is none.
+        The note classifier is compiled straight away, so the first performance is ready to play.
+        '''
+        notes = self.calibration_profiles.load(self.user, self.audio.get_device_name())
+        if notes:
+            self.notes = dict(notes)
+        else:
+            self.reset_notes()
+        self.compile_notes()
+
+    def save_calibration(self) -> None:
+        self.calibration_profiles.save(self.user, self.audio.get_device_name(), self.notes)
+        self.compile_notes()
+
+    def compile_notes(self) -> None:
+        '''
+        Compile the note classifier and the multi-octave note model from the current calibration.
+        '''
+        get_note_classifier(self.notes)
+        self.note_model = NoteModel.from_notes(self.notes)
             
     def clear_screen(self) -> None:
         self.screen.fill(self.BACKGROUND_COLOR)
@@ -120,23 +219,119 @@ class Application:
         self.text_inputs = []
         self.song_tabs = []
 
-    def run_event_loop(self) -> None:
+    def invalidate_widgets(self) -> None:
+        '''
+        Draw every widget on the screen again on its next render, such as after the static elements have been drawn over them.
+        '''
+        for widget in self.screen_buttons + self.text_inputs:
+            widget.invalidate()
+
+    def get_render_count(self) -> int:
+        '''
+        Get the number of times the widgets on the screen have been drawn, which stays the same while the screen is idle.
+        '''
+        widgets = self.screen_buttons + self.text_inputs + self.song_tabs + ([self.scroll_bar] if self.scroll_bar else [])
+        return sum(widget.render_count for widget in widgets)
+
+    async def _get_events(self) -> list[pygame.event.Event]:
+        '''
+        Get all pending events, waiting until an event arrives or `idle_timeout` passes, so an idle menu does not
+        spin the CPU. The events are checked every `idle_poll_interval`, and the event loop sleeps in between rather
+        than blocking in `pygame.event.wait`, so other tasks such as writes to disk carry on while the menu waits.
+        Screens that animate every frame run their own loop and get their events themselves.
+
+        Returns:
+            events (list): Events to be handled this frame
+        '''
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.idle_timeout / 1000
+        events = pygame.event.get()
+        while not events and loop.time() < deadline:
+            await asyncio.sleep(self.idle_poll_interval)
+            events = pygame.event.get()
+        return events
+
+    async def next_frame(self, frame_rate: int) -> int:
+        '''
+        Wait for the next frame, then let every other task that is ready run, such as audio that has finished streaming.
+        Leaving a screen takes effect here, so a screen's loop should await this once a frame.
+
+        Args:
+            frame_rate (int): Most frames per second
+
+        Returns:
+            int: Milliseconds passed since the previous frame
+        '''
+        # The clock paces frames more precisely than the event loop's timers, which are as coarse as 15ms on Windows
+        frame_time = self.clock.tick(frame_rate)
+        await asyncio.sleep(0)
+        return frame_time
+
+    async def capture(self, read: Callable[[], T]) -> AsyncIterator[T]:
+        '''
+        Call a blocking read of the microphone over and over on the capture executor, until the task iterating is cancelled.
+        The next read is always queued behind the one in flight, so the stream is read without gaps however long the
+        event loop takes to get to each result. Reads that have not started when the task is cancelled never run.
+
+        Args:
+            read (Callable): Function reading audio, such as `AudioManager.stream`
+
+        Yields:
+            The result of each read, in order
+        '''
+        loop = asyncio.get_running_loop()
+        reads = [loop.run_in_executor(self.capture_executor, read)]
+        try:
+            while True:
+                reads.append(loop.run_in_executor(self.capture_executor, read))
+                yield await reads.pop(0)
+        finally:
+            for pending in reads:
+                pending.cancel()
+
+    def persist(self, function: Callable[..., T], *args: Any) -> asyncio.Future[T]:
+        '''
+        Write to disk on the persistence executor, so the screen keeps running while it is written.
+        Writes are made one at a time, in the order they are made.
+
+        Args:
+            function (Callable): Function that writes to disk
+            *args: Arguments of the function
+
+        Returns:
+            Future: The result of the function, which can be awaited
+        '''
+        save = asyncio.get_running_loop().run_in_executor(self.persistence_executor, function, *args)
+        self.saves.add(save)
+        save.add_done_callback(self.saves.discard)
+        return save
+
+    async def run_event_loop(self) -> None:
         self.current_screen.setup()
         while True:
-            mouse_position = pygame.mouse.get_pos()
-            mouse_clicked = pygame.mouse.get_pressed()[0]
+            await self.next_frame(self.menu_frame_rate)
+            render_count = self.get_render_count()
 
-            for event in pygame.event.get():
+            events = await self._get_events()
+            for event in events:
                 self._handle_event(event)
 
+            mouse_position = pygame.mouse.get_pos()
+            mouse_clicked = pygame.mouse.get_pressed()[0]
+
             for button in self.screen_buttons:
-                button.is_hovered(mouse_position)
+                button.is_hovered(mouse_position, mouse_clicked)
 
             for text_input in self.text_inputs:
                 text_input.check(mouse_position, mouse_clicked)
 
             self.current_screen.render_dynamic_elements(mouse_position=mouse_position)
-            pygame.display.flip()
+
+            # Widgets only draw when their state changes, so if none have and no input other than moving the mouse
+            # has been handled, the display is unchanged
+            handled_input = any(event.type != pygame.MOUSEMOTION for event in events)
+            if handled_input or self.get_render_count() != render_count:
+                pygame.display.flip()
             
     def load_files(self, extensions: list[str] = ['.png', '.jpg']) -> list[list[str]]:
         '''
@@ -173,23 +368,124 @@ class Application:
         '''
         End all PyGame processes and close the PyGame window.
         '''
+        self.user.flush()
+        # Finish any writes still being made, but not any preview still being rendered
+        self.preview_executor.shutdown(wait=False, cancel_futures=True)
+        self.persistence_executor.shutdown()
         pygame.font.quit()
         pygame.quit()
         raise SystemExit
     
-    def set_screen(self, screen_name: str):
+    def set_screen(self, screen_name: str) -> None:
+        '''
+        Move to another screen. The current screen's task is cancelled, taking effect the next time it awaits,
+        and the new screen starts once it has finished. If the event loop is not running yet it is started,
+        and this returns once a screen finishes without moving to another.
+
+        Args:
+            screen_name (str): Name of the screen in Application.screens
+        '''
         if screen_name not in self.screens:
             raise KeyError(f'Screen {screen_name} does not exist.')
-        
-        self.current_screen = self.screens[screen_name]
 
-        if screen_name not in ('calibrate', 'performance'):
-            self.run_event_loop()
-        else:
-            self.current_screen.setup()
+        self.next_screen = screen_name
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self.run_screens())
+            return
+        if self.screen_task:
+            self.screen_task.cancel()
+
+    async def run_screens(self) -> None:
+        '''
+        Run screens one after another until one finishes without moving to another, then wait for any writes still being made.
+        '''
+        try:
+            while self.next_screen:
+                screen_name, self.next_screen = self.next_screen, None
+                self.current_screen = self.screens[screen_name]
+                # Songs are only previewed while choosing one
+                if screen_name != 'song_select':
+                    self.stop_preview()
+
+                self.screen_task = asyncio.create_task(self.current_screen.run())
+                try:
+                    await self.screen_task
+                except asyncio.CancelledError:
+                    # Only a screen being left for another is expected, not the event loop being stopped
+                    if not self.next_screen:
+                        raise
+            await asyncio.gather(*self.saves)
+        finally:
+            self.screen_task = None
 
     def set_song(self, song: tuple[str, str, str]) -> None:
         self.song = song
+
+    def play_preview(self, path: str) -> None:
+        '''
+        Play a synthesized rendering of a song, stopping any other preview. Previewing a song that is already playing
+        or being rendered stops it. A song that has been rendered before starts straight away, and one that has not is
+        rendered on the preview executor, so the screen keeps running, and starts playing once it has been rendered.
+
+        Args:
+            path (str): Location of the song file
+        '''
+        playing = self.preview and self.preview[0] == path and self.preview[1].get_num_channels()
+        rendering = self.preview_render and self.preview_render[0] == path and not self.preview_render[1].done()
+        self.stop_preview()
+        if playing or rendering:
+            return
+
+        samples = self.synth_cache.load(path)
+        if samples is None:
+            self.preview_render = (path, asyncio.create_task(self._render_preview(path)))
+        else:
+            self._start_preview(path, samples)
+
+    async def _render_preview(self, path: str) -> None:
+        samples = await asyncio.get_running_loop().run_in_executor(self.preview_executor, self._render_song, path)
+        self.preview_render = None
+        self._start_preview(path, samples)
+
+    def _render_song(self, path: str) -> np.ndarray:
+        samples = self.synth_cache.get(path)
+        if pygame.get_init():
+            pygame.event.post(pygame.event.Event(PREVIEW_RENDERED))
+        return samples
+
+    def _start_preview(self, path: str, samples: np.ndarray) -> None:
+        sound = make_sound(samples, self.synth_cache.synth.rate)
+        if sound:
+            sound.play()
+            self.preview = (path, sound)
+
+    def stop_preview(self) -> None:
+        if self.preview_render:
+            self.preview_render[1].cancel()
+            self.preview_render = None
+        if self.preview:
+            self.preview[1].stop()
+            self.preview = None
+
+    async def set_players(self, players: int) -> None:
+        '''
+        Reopen the microphone with one channel for each player, so each can play into their own channel of a
+        multichannel interface. If the input device does not have that many channels, a single player is used.
+
+        Args:
+            players (int): Number of players
+        '''
+        self.ensemble.close()
+        # Close the stream once any read still in flight from the last screen has finished, without blocking the screen
+        await asyncio.get_running_loop().run_in_executor(self.capture_executor, self.audio.close)
+        try:
+            self.audio = AudioManager(channels=players)
+        except OSError:
+            self.audio = AudioManager()
+        self.ensemble = Ensemble.from_channels(self.audio)
+        self.load_calibration()
     
     @staticmethod
     def load_font(size: int) -> pygame.font.Font:
@@ -1,10 +1,95 @@
-import wave
+from __future__ import annotations
+from functools import lru_cache
+import threading
 import numpy as np
-from scipy.io import wavfile
+import scipy.fft
 from pyaudio import PyAudio, paInt16
 
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from audio.recorder import SessionRecorder
+
+# Frequency in Hz of each note before it is calibrated
+DEFAULT_NOTES = {
+    'A': [440],
+    'A#/Bb': [466],
+    'B': [493],
+    'C': [523],
+    'C#/Db': [554],
+    'D': [587],
+    'D#/Eb': [622],
+    'E': [659],
+    'F': [698],
+    'F#/Gb': [739],
+    'G': [783],
+    'G#/Ab': [830]
+}
+
+# Number of points in the FFT of each frame
+FFT_SIZE = 2**14
+# Libraries that can compute the FFT, see `AudioManager.set_fft_backend`
+FFT_BACKENDS = ('numpy', 'scipy')
+# Whether numpy's FFTs accept an `out` array to write into, which was added in numpy 2.0
+NUMPY_FFT_OUT = int(np.__version__.split('.')[0]) >= 2
+
+@lru_cache(maxsize=8)
+def get_hamming_window(length: int) -> np.ndarray:
+    # w(n) = .54 - .46*cos((2*(pi)*n)/(M-1)) , 0 <= n <= M-1 where M = number of points in the output window
+    return np.hamming(length).astype(np.float32)
+
+@lru_cache(maxsize=8)
+def get_bin_frequencies(rate: int) -> np.ndarray:
+    '''
+    Get the frequency in Hz reported for each bin of a frame's spectrum that is searched for the dominant frequency.
+
+    Args:
+        rate (int): Sampling frequency in Hz
+
+    Returns:
+        ndarray: Frequency of each bin, from the first bin
+    '''
+    # Gives the frequencies associated with the coefficients: .fftfreq(window_length,sampling_spacing) where sampling_spacing is the inverse of sampling rate
+    frequencies = np.fft.fftfreq(FFT_SIZE // 2 + 1, 1 / rate)
+    # Filter out negative frequencies and return the floor division of 2 for each frequency. Finally, add 1 to each frequency
+    return (frequencies[frequencies >= 0] // 2) + 1
+
+@lru_cache(maxsize=8)
+def get_hann_window(length: int) -> np.ndarray:
+    return np.hanning(length).astype(np.float32)
+
+def get_interpolated_frequency(signal: np.ndarray, rate: int, fft_size: int = 8192, minimum_frequency: float = 30.0) -> float:
+    '''
+    Estimate the dominant frequency of a signal more finely than the FFT's bins, for tuning to within a cent.
+    The signal is Hann windowed and zero padded, and the peak is interpolated with a parabola through the
+    log magnitude of the loudest bin and its neighbours.
+
+    Args:
+        signal (ndarray): Mono audio signal, no longer than `fft_size`
+        rate (int): Sampling frequency in Hz
+        fft_size (int): Number of points in the FFT
+                        default: 8192
+        minimum_frequency (float): Frequency in Hz below which peaks are ignored, so hum and rumble are not reported
+                                   default: 30.0
+
+    Returns:
+        float: Dominant frequency in Hz
+    '''
+    windowed = np.asarray(signal, dtype=np.float32) * get_hann_window(len(signal))
+    magnitude = np.abs(scipy.fft.rfft(windowed, fft_size))
+    lowest = max(1, int(minimum_frequency * fft_size / rate))
+    peak = lowest + int(np.argmax(magnitude[lowest:-1]))
+
+    # The vertex of the parabola is between -0.5 and 0.5 bins from the loudest bin
+    before, centre, after = np.log(magnitude[peak - 1:peak + 2] + 1e-12)
+    curvature = before - 2 * centre + after
+    offset = .5 * (before - after) / curvature if curvature < 0 else 0.0
+    return float((peak + offset) * rate / fft_size)
+
 class AudioManager:
-    def __init__(self, chunk: int = 1024, rate: int = 44_100):
+    # Frames transformed at once, which bounds the size of the FFT buffers
+    FFT_BLOCK_SIZE = 64
+
+    def __init__(self, chunk: int = 1024, rate: int = 44_100, channels: int = 1, device_index: int | None = None, fft_backend: str = 'scipy', fft_workers: int | None = None):
         '''
         Initialize a SoundData object.
 
@@ -13,36 +98,83 @@ class AudioManager:
                          default: 1024
             rate (int): Nampling frequency in Hz
                         default: 44,100
+            channels (int): Number of input channels, e.g. one per player on a multichannel interface
+                            default: 1
+            device_index (int): PyAudio index of the input device
+                                default: None, use the default input device
+            fft_backend (str): Library that computes the FFT of each frame, one of `FFT_BACKENDS`
+                               default: 'scipy'
+            fft_workers (int): Number of threads the scipy backend computes each block of FFTs with
+                               default: None, one thread
         '''
         self.chunk = chunk
         self.rate  = rate
+        self.channels = channels
+        self.device_index = device_index
         self.buffer = None
+        # Sample range of the stream held in the buffer, and of the buffer last analysed
+        self.buffer_range: tuple[int, int] | None = None
+        self.analysed_range: tuple[int, int] | None = None
+        self.samples_read = 0
+        # The buffer is written by the stream thread and read by the performance loop
+        self.buffer_lock = threading.Lock()
+        self.recorder: SessionRecorder | None = None
+        self.pyaudio: PyAudio | None = None
+        # FFT buffers are reused between calls, with a set per thread as channels can be analysed in parallel
+        self.fft_buffers = threading.local()
+        self.set_fft_backend(fft_backend, fft_workers)
+        self.audio_stream = self._open_stream()
 
-        # Create an audio stream object from the microphone using PyAudio
-        self.audio_stream = PyAudio().open(
+    def _open_stream(self):
+        '''
+        Create an audio stream object from the microphone using PyAudio.
+        Sources that do not use the microphone override this.
+        '''
+        self.pyaudio = PyAudio()
+        return self.pyaudio.open(
             format=paInt16,
-            channels=1,
-            rate=rate,
+            channels=self.channels,
+            rate=self.rate,
             input=True,
-            frames_per_buffer=chunk
+            input_device_index=self.device_index,
+            frames_per_buffer=self.chunk
         )
 
-    def _write_stream_to_file(self, filename: str, data: list):
+    def get_device_name(self) -> str:
+        '''
+        Get the name of the input device, which calibrations are saved under.
+        Sources that do not use the microphone are named after their class.
+        '''
+        if not self.pyaudio:
+            return self.__class__.__name__
+        if self.device_index is None:
+            return self.pyaudio.get_default_input_device_info()['name']
+        return self.pyaudio.get_device_info_by_index(self.device_index)['name']
+
+    def close(self) -> None:
+        if self.audio_stream:
+            self.audio_stream.close()
+
+    def set_fft_backend(self, backend: str = 'scipy', workers: int | None = None) -> None:
         '''
-        Write contents of data to a Wave file.
+        Choose the library that computes the FFT of each frame.
 
         Args:
-            filename (str): Name of Wave file to be written to
-            data (list): Mono audio signal
+            backend (str): 'numpy' for `numpy.fft`, which writes into a preallocated output, or 'scipy' for `scipy.fft`,
+                           which can split each block of frames between threads
+                           default: 'scipy'
+            workers (int): Number of threads the scipy backend uses
+                           default: None, one thread
+
+        Raises:
+            ValueError: When the backend is not one of `FFT_BACKENDS`, or workers are given to the numpy backend
         '''
-        wave_file = wave.open(f'./assets/{filename}.wav', 'wb')
-        # Set details of the data being written
-        wave_file.setnchannels(1)
-        wave_file.setsampwidth(PyAudio().get_sample_size(paInt16))
-        wave_file.setframerate(self.rate)
-        # Convert the list into a binary string and overwrite the Wave file
-        wave_file.writeframes(b''.join(data))
-        wave_file.close()
+        if backend not in FFT_BACKENDS:
+            raise ValueError(f'FFT backend must be one of {", ".join(FFT_BACKENDS)}, not {backend}')
+        if workers is not None and backend != 'scipy':
+            raise ValueError('Only the scipy FFT backend can use more than one worker')
+        self.fft_backend = backend
+        self.fft_workers = workers
 
     def _framing(self, data: np.ndarray) -> tuple[np.ndarray, int]:
         '''
@@ -66,56 +198,79 @@ class AudioManager:
         # Ensure at least one frame
         number_of_frames = int(np.ceil(abs(signal_length - frame_length) / frame_step)) 
 
-        # Find indices
-        index_a = np.tile(np.arange(0, frame_length), (number_of_frames, 1))                               
-        index_b = np.tile(np.arange(0, number_of_frames * frame_step, frame_step), (frame_length, 1))
+        # Pad out the signal to ensure every frame is whole, converting it to float32 for the FFT
+        padded_buffer = np.zeros(number_of_frames * frame_step + frame_length, dtype=np.float32)
+        padded_buffer[:signal_length] = data
 
-        # Rearrange the array so rows become columns and colums become rows
-        indices = index_a + index_b.T
-
-        # Pad out the signal to ensure the frames have at least the same length as the indices array
-        padding_amount = number_of_frames * frame_step + frame_length
-        padding = np.zeros((padding_amount-signal_length))
-        padded_buffer = np.append(data, padding)
-
-        # Ensure data is int32 datatype
-        frames = padded_buffer[indices.astype(np.int32, copy=False)]
+        # Each frame is a view into the padded signal rather than a copy
+        frames = np.lib.stride_tricks.sliding_window_view(padded_buffer, frame_length)[::frame_step][:number_of_frames]
 
         return frames, frame_length
 
-    def _get_dominant_frequency(self, frame: np.ndarray):
+    def _get_fft_buffers(self, frame_length: int, bins: int) -> threading.local:
+        '''
+        Get this thread's FFT buffers, allocating them for the first call or when the frame size changes.
         '''
-        Find the dominant frequency of a single frame.
+        buffers = self.fft_buffers
+        if getattr(buffers, 'shape', None) != (frame_length, bins):
+            buffers.shape = (frame_length, bins)
+            # Only the first frame_length points of each row are written, so the rest stay zero padding
+            buffers.input = np.zeros((self.FFT_BLOCK_SIZE, FFT_SIZE), dtype=np.float32)
+            buffers.output = np.empty((self.FFT_BLOCK_SIZE, FFT_SIZE // 2 + 1), dtype=np.complex64)
+            buffers.magnitude = np.empty((self.FFT_BLOCK_SIZE, bins), dtype=np.float32)
+        return buffers
+
+    def _get_peak_frequencies(self, frames: np.ndarray, frame_length: int) -> np.ndarray:
+        '''
+        Find the dominant frequency of each frame.
 
         Args:
-            frame (ndarray): Amplitude information at a point in time
-        
+            frames (ndarray): Frames, in the format of `_framing`
+            frame_length (int): Length of each frame
+
         Returns:
-            float: Dominant frequency in Hz
+            ndarray: Dominant frequency of each frame in Hz
         '''
-        # Perform fast fourier transform on real input with nfft points to be calculated
-        nfft = 2**14
-        fourier_transform = np.fft.rfft(frame, nfft)
+        bin_frequencies = get_bin_frequencies(self.rate)
+        window = get_hamming_window(frame_length)
+        buffers = self._get_fft_buffers(frame_length, len(bin_frequencies))
+        peaks = np.empty(len(frames), dtype=np.int64)
+
+        for start in range(0, len(frames), self.FFT_BLOCK_SIZE):
+            block = frames[start:start + self.FFT_BLOCK_SIZE]
+            size = len(block)
+            # Perform Hamming window function on the frames, straight into the zero padded FFT input
+            np.multiply(block, window, out=buffers.input[:size, :frame_length])
 
-        magnitude_spectrum = (1 / nfft) * abs(fourier_transform)
-        power_spectrum = (1 / (nfft * nfft)) * magnitude_spectrum * magnitude_spectrum
+            # Perform fast fourier transform on real input with FFT_SIZE points
+            if self.fft_backend == 'scipy':
+                fourier_transform = scipy.fft.rfft(buffers.input[:size], workers=self.fft_workers)
+            elif NUMPY_FFT_OUT:
+                fourier_transform = np.fft.rfft(buffers.input[:size], out=buffers.output[:size])
+            else:
+                fourier_transform = np.fft.rfft(buffers.input[:size])
 
-        # Gives the frequencies associated with the coefficients: .fftfreq(window_length,sampling_spacing) where sampling_spacing is the inverse of sampling rate
-        frequencies = np.fft.fftfreq(len(power_spectrum), 1 / self.rate)
+            # Only the first part of the spectrum contains useful data. The loudest bin is the same whether or not
+            # the magnitude is scaled or squared into power, so the magnitude is compared directly.
+            magnitude = np.abs(fourier_transform[:, :len(bin_frequencies)], out=buffers.magnitude[:size])
+            peaks[start:start + size] = magnitude.argmax(axis=1)
 
-        # Filter out negative frequencies and return the floor division of 2 for each frequency. Finally, add 1 to each frequency
-        frequencies = (frequencies[np.where(frequencies >= 0)] // 2) + 1 
+        # Convert the dominant frequency to Hz
+        return bin_frequencies[peaks]
 
-        # Take only the first half of the spectra as only the first part contains useful data   
-        power_spectrum = power_spectrum[:len(frequencies)]
+    def get_frame_frequencies(self, signal: np.ndarray) -> np.ndarray:
+        '''
+        Split a mono signal into frames and find the dominant frequency of each.
 
-        # Get maximum value
-        maxiumum_index = np.argmax(power_spectrum)
+        Args:
+            signal (ndarray): Mono audio signal
+
+        Returns:
+            ndarray: Dominant frequency of each frame, rounded to 3 decimal places
+        '''
+        frames, frame_length = self._framing(signal)
+        return np.round(self._get_peak_frequencies(frames, frame_length), 3)
 
-        # Convert the dominant frequency to Hz
-        return frequencies[maxiumum_index]
-        
-        
     def stream(self, time=.1):
         '''
         Update audio stream buffer.
@@ -127,33 +282,98 @@ class AudioManager:
         # To record (time) seconds into the buffer, we must take (rate)*(time) samples.
         # In each iteration (chunk) samples are taken, so we must loop (rate)*(time)/(chunk) times.
         buffer_hex = [self.audio_stream.read(self.chunk) for _ in range(int(self.rate / self.chunk * time))]
-        self._write_stream_to_file('buffer', buffer_hex)
-        self.rate, self.buffer = wavfile.read('./assets/buffer.wav')
+        data = b''.join(buffer_hex)
+        if self.recorder:
+            self.recorder.write_audio(data)
+
+        with self.buffer_lock:
+            # Interpret the raw bytes directly rather than round tripping them through a Wave file on disk
+            self.buffer = np.frombuffer(data, dtype=np.int16)
+            if self.channels > 1:
+                # Samples are interleaved, so each column of the buffer is one channel
+                self.buffer = self.buffer.reshape(-1, self.channels)
+            self.samples_read += len(self.buffer)
+            self.buffer_range = (self.samples_read - len(self.buffer), self.samples_read)
+
+    def read(self, samples: int) -> np.ndarray:
+        '''
+        Read the newest audio straight from the stream, for analysis that cannot wait for a whole buffer.
+        Audio already waiting in the stream is read too, so a reader that falls behind catches up.
+
+        Args:
+            samples (int): Least number of samples to read, blocking until they have been recorded
+
+        Returns:
+            ndarray: The samples, with a column for each channel when there is more than one
+        '''
+        samples = max(samples, self.audio_stream.get_read_available())
+        data = np.frombuffer(self.audio_stream.read(samples, exception_on_overflow=False), dtype=np.int16)
+        return data.reshape(-1, self.channels) if self.channels > 1 else data
+
+    def get_input_latency(self) -> float:
+        '''
+        Get the seconds the input device takes to deliver audio to the stream, or 0 for sources without a device.
+        '''
+        return self.audio_stream.get_input_latency() if self.audio_stream else 0.0
+
+    def start_recording(self, recorder: SessionRecorder | None) -> None:
+        '''
+        Start or stop sending the audio stream to a recorder. Sample positions are counted from the start of the recording.
+
+        Args:
+            recorder (SessionRecorder): Recorder to write the stream to, or None to stop recording
+        '''
+        with self.buffer_lock:
+            self.recorder = recorder
+            self.samples_read = 0
 
-    def get_dominant_frequencies(self) -> np.ndarray:
+    def get_dominant_frequencies(self, channel: int = 0) -> np.ndarray:
         '''
         Analyse the buffer data to find the dominant frequencies.
 
+        Args:
+            channel (int): Channel of the buffer to analyse, when there is more than one
+                           default: 0
+
         Returns:
             dominant_frequencies (list) : list of the dominant frequencies identified
 
         Raises:
             ValueError: When `self.buffer` is not a Numpy array
         '''
-        # Perform framing on the signal
-        if not isinstance(self.buffer, np.ndarray):
-            raise ValueError(f'{self.__class__.__name__}.buffer must be of type numpy.ndarray not {type(self.buffer)}')
-        frames, frame_length = self._framing(self.buffer)
-        # Perform Hamming window function on the frames
-        # w(n) = .54 - .46*cos((2*(pi)*n)/(M-1)) , 0 <= n <= M-1 where M = number of points in the output window
-        windows = frames * np.hamming(frame_length)
+        return np.unique(self.get_hop_frequencies(channel))
 
-        # Find the dominant frequency for each frame
-        dominant_frequencies = np.array([self._get_dominant_frequency(window) for window in windows])
-        dominant_frequencies = np.round(dominant_frequencies, 3)
-        dominant_frequencies = np.unique(dominant_frequencies)
+    def get_hop_frequencies(self, channel: int = 0, since: int | None = None) -> np.ndarray:
+        '''
+        Analyse the buffer data to find the dominant frequency of each frame, or hop, in order.
 
-        return dominant_frequencies
+        Args:
+            channel (int): Channel of the buffer to analyse, when there is more than one
+                           default: 0
+            since (int): Position in the stream, in samples, up to which audio has already been analysed. Frames start
+                         so that the first frame's last hop of audio begins there. Ignored when the buffer's range is unknown.
+                         default: None, analyse every frame
+
+        Returns:
+            ndarray: Dominant frequency of each frame, rounded to 3 decimal places
+
+        Raises:
+            ValueError: When `self.buffer` is not a Numpy array
+        '''
+        with self.buffer_lock:
+            buffer, self.analysed_range = self.buffer, self.buffer_range
+
+        # Perform framing on the signal
+        if not isinstance(buffer, np.ndarray):
+            raise ValueError(f'{self.__class__.__name__}.buffer must be of type numpy.ndarray not {type(buffer)}')
+        if buffer.ndim > 1:
+            buffer = buffer[:, channel]
+        if since is not None and self.analysed_range:
+            frame_length, frame_step = int(.025 * self.rate), int(.01 * self.rate)
+            buffer = buffer[max(0, since - self.analysed_range[0] - frame_length + frame_step):]
+            if len(buffer) <= frame_length:
+                return np.zeros(0)
+        return self.get_frame_frequencies(buffer)
 
     def get_note_from_frequency(self, note_frequencies: dict, frequencies: np.ndarray):
         '''
@@ -166,24 +386,78 @@ class AudioManager:
         Returns:
             note (str): Single note or None if no note identified   
         '''
+        return get_note_classifier(note_frequencies).classify(frequencies)
+
+class NoteClassifier:
+    '''
+    Note frequencies compiled into arrays, so that frequencies are classified in a few array operations
+    rather than by looping over every frequency of every note.
+    '''
+    def __init__(self, note_frequencies: dict[str, list[int]]) -> None:
+        '''
+        Compile a set of note frequencies.
+
+        Args:
+            note_frequencies (dict): Dictionary of notes and their associated frequencies, in the format of `Application.notes`
+        '''
+        # Notes without frequencies can never be the closest match
+        self.notes = [note for note, targets in note_frequencies.items() if targets]
+        targets = [note_frequencies[note] for note in self.notes]
+        self.targets = np.array([target for note_targets in targets for target in note_targets], dtype=np.float64)
+        # Index of each note's first target, so the targets of each note can be reduced together
+        self.note_starts = np.cumsum([0] + [len(note_targets) for note_targets in targets[:-1]])
+
+    def classify(self, frequencies: np.ndarray) -> str | None:
+        '''
+        Convert a list of frequencies into their likeliest music note.
+
+        Args:
+            frequencies (ndarray): Numpy array of frequencies
+
+        Returns:
+            note (str): Single note, 'rest' for background noise, or None if no note identified
+        '''
         # If 1.0 is a dominant frequency assume it is background noise
         if 1.0 in frequencies:
             return 'rest'
-        
-        # Initialise closest_match
-        closest_match = [None, float('inf')]
-
-        for note, targets in note_frequencies.items():
-            weight = 0
-            for freq in frequencies:
-                min_distance_from_target = min(
-                    [abs(100 * round(np.sin((np.pi / np.log(2)) * np.log(freq / target_freq)), 4)) for target_freq in targets]
-                )
-                if not min_distance_from_target:
-                    min_distance_from_target = -100
-                weight += min_distance_from_target
-                
-            if weight < closest_match[1]:
-                closest_match = [note, weight]
-        
-        return closest_match[0]
\ No newline at end of file
+        if not self.notes:
+            return None
+        if not len(frequencies):
+            return self.notes[0]
+
+        # Distance of each frequency from each target, which is 0 when they are a whole number of octaves apart
+        distances = np.abs(100 * np.round(np.sin((np.pi / np.log(2)) * np.log(frequencies[:, None] / self.targets)), 4))
+        # Each frequency counts the distance to the nearest target of each note, or a bonus for an exact match
+        note_distances = np.minimum.reduceat(distances, self.note_starts, axis=1)
+        note_distances[note_distances == 0] = -100
+
+        # The note with the lowest total weight is the closest match, the first note winning ties
+        return self.notes[int(np.argmin(note_distances.sum(axis=0)))]
+
+    def classify_each(self, frequencies: np.ndarray) -> list[str | None]:
+        '''
+        Find the likeliest note of each frequency on its own, such as the dominant frequency of each frame.
+
+        Args:
+            frequencies (ndarray): Numpy array of frequencies
+
+        Returns:
+            list: Note of each frequency, 'rest' for background noise, or None if no note identified
+        '''
+        if not self.notes:
+            return ['rest' if frequency == 1.0 else None for frequency in frequencies]
+
+        distances = np.abs(100 * np.round(np.sin((np.pi / np.log(2)) * np.log(frequencies[:, None] / self.targets)), 4))
+        nearest = np.argmin(np.minimum.reduceat(distances, self.note_starts, axis=1), axis=1)
+        return ['rest' if frequency == 1.0 else self.notes[note] for frequency, note in zip(frequencies.tolist(), nearest.tolist())]
+
+@lru_cache(maxsize=16)
+def _compile_notes(note_frequencies: tuple[tuple[str, tuple[int, ...]], ...]) -> NoteClassifier:
+    return NoteClassifier({note: list(targets) for note, targets in note_frequencies})
+
+def get_note_classifier(note_frequencies: dict[str, list[int]]) -> NoteClassifier:
+    '''
+    Get the compiled classifier for a set of note frequencies, compiling it the first time the set is seen.
+    Note frequencies change in place during calibration, so classifiers are cached by value.
+    '''
+    return _compile_notes(tuple((note, tuple(targets)) for note, targets in note_frequencies.items()))
@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from audio.audio_manager import AudioManager, get_note_classifier
+from audio.note_model import NoteModel
+from audio.scoring import get_pitch_class
+
+class Ensemble:
+    '''
+    The audio inputs of every player in a performance, one per player.
+
+    An input is a channel of an AudioManager, so players can share a multichannel interface or each use their own device.
+    Each player's input is analysed in its own thread. Most of the analysis is NumPy, which releases the GIL, so the
+    analysis of each frame takes about as long for several players as for one, and CPU use grows linearly with players.
+    '''
+    def __init__(self, inputs: list[tuple[AudioManager, int]]) -> None:
+        '''
+        Create an Ensemble instance.
+
+        Args:
+            inputs (list): The AudioManager and channel of each player
+        '''
+        self.inputs = inputs
+        # Each AudioManager is streamed once, however many of its channels are used
+        self.sources = list(dict.fromkeys(audio for audio, _ in inputs))
+        # A single player is analysed on the calling thread, as there is nothing to run alongside it
+        self.executor = ThreadPoolExecutor(len(inputs), thread_name_prefix='analysis') if len(inputs) > 1 else None
+        # Sample range of the buffer each input last analysed, so the same audio is not analysed twice
+        self.reset()
+
+    @classmethod
+    def from_channels(cls, audio: AudioManager) -> 'Ensemble':
+        '''
+        Create an Ensemble with one player on each channel of an AudioManager.
+        '''
+        return cls([(audio, channel) for channel in range(audio.channels)])
+
+    def reset(self) -> None:
+        '''
+        Forget which audio has been analysed, such as when the stream's sample positions restart.
+        '''
+        self.analysed_ranges: list[tuple[int, int] | None] = [None] * len(self.inputs)
+
+    def __len__(self) -> int:
+        return len(self.inputs)
+
+    def stream(self, time: float = .1) -> None:
+        '''
+        Update the buffer of every input.
+
+        Args:
+            time (float): Length of each audio stream buffer in seconds
+                          default: 0.1
+        '''
+        for audio in self.sources:
+            audio.stream(time)
+
+    def _detect(self, number: int, notes: dict[str, list[int]], note_model: NoteModel | None, active: list[bool] | None) -> np.ndarray | None:
+        audio, channel = self.inputs[number]
+        if active is not None and not active[number]:
+            return None
+        # Sources that do not count samples are always analysed
+        if audio.buffer_range is not None and audio.buffer_range == self.analysed_ranges[number]:
+            return None
+        analysed_range = self.analysed_ranges[number]
+        frequencies: np.ndarray = audio.get_hop_frequencies(channel, analysed_range[1] if analysed_range else None)
+        self.analysed_ranges[number] = audio.analysed_range
+        if note_model:
+            return note_model.get_midi_numbers(frequencies)
+        return np.array([get_pitch_class(note) for note in get_note_classifier(notes).classify_each(frequencies)], dtype=np.int16)
+
+    def detect(self, notes: dict[str, list[int]], note_model: NoteModel | None = None, active: list[bool] | None = None) -> list[np.ndarray | None]:
+        '''
+        Find the pitch each player played in each hop of audio streamed since the last detection.
+
+        Args:
+            notes (dict): Dictionary of notes and their associated frequencies, in the format of `Application.notes`
+            note_model (NoteModel): Model to find the note and its octave with
+                                    default: None, find only the pitch class with `notes`
+            active (list): Whether to analyse each player's input
+                           default: None, analyse every input
+
+        Returns:
+            list: Pitch class, or MIDI number when a note model is given, detected in each hop of each player's buffer,
+                  -1 for no note, or None for a player who is not active or whose buffer has already been analysed
+        '''
+        if not self.executor:
+            return [self._detect(0, notes, note_model, active)]
+        return list(self.executor.map(lambda number: self._detect(number, notes, note_model, active), range(len(self.inputs))))
+
+    def close(self) -> None:
+        if self.executor:
+            self.executor.shutdown()
@@ -0,0 +1,191 @@
+import os
+from typing import Any, BinaryIO
+import numpy as np
+from scipy.io import wavfile
+from audio.audio_manager import AudioManager, DEFAULT_NOTES, get_note_classifier
+from audio.note_detector import NoteDetector
+from audio.note_model import PITCH_CLASS_NAMES
+from audio.scoring import ScoringEngine, SongTimeline, get_pitch_class
+
+def load_recording(path: str | BinaryIO) -> tuple[int, np.ndarray]:
+    '''
+    Load a Wave file as a mono int16 signal.
+
+    Args:
+        path (str | BinaryIO): Location of the Wave file, or the open file
+
+    Returns:
+        rate (int): Sampling frequency of the signal in Hz
+        signal (ndarray): The mono signal
+    '''
+    rate, signal = wavfile.read(path)
+    if signal.ndim > 1:
+        signal = signal.mean(axis=1)
+    if signal.dtype != np.int16:
+        # Scale floating point and wider integer formats into the int16 range
+        peak = np.abs(signal).max() or 1
+        signal = signal / peak * 32767
+    return rate, signal.astype(np.int16)
+
+class RecordingAnalyser(AudioManager):
+    '''
+    AudioManager that analyses recordings instead of opening the microphone.
+    '''
+    def _open_stream(self) -> None:
+        return None
+
+class RecordingGrader:
+    '''
+    Grades recordings of a song with the same pitch detection and scoring as the performance loop, without a window or microphone.
+
+    The recording is split into the overlapping frames `AudioManager` analyses, and the pitch of each frame is found
+    once and run through a `NoteDetector`. The note being held is then sampled every `interval` seconds, as the
+    performance loop does each frame, and the samples are scored in one pass.
+    '''
+    def __init__(self, song_path: str, notes: dict[str, list[int]] | None = None, offset: float = 0.0, interval: float = 1 / 60, buffer_time: float = .1, fft_backend: str = 'scipy') -> None:
+        '''
+        Create a RecordingGrader instance.
+
+        Args:
+            song_path (str): Location of the song file
+            notes (dict): Dictionary of notes and their associated frequencies, in the format of `Application.notes`
+                          default: None, use the uncalibrated frequencies
+            offset (float): Seconds into each recording at which the first note of the song is played
+                            default: 0.0
+            interval (float): Seconds between detections, the frame time of the performance loop
+                              default: 1 / 60
+            buffer_time (float): Length of audio analysed for each detection in seconds, as in `AudioManager.stream`
+                                 default: 0.1
+            fft_backend (str): Library that computes the FFT of each frame, one of `FFT_BACKENDS`
+                               default: 'scipy'
+        '''
+        self.song_path = song_path
+        self.song_name = os.path.splitext(os.path.basename(song_path))[0].split(' - ')[0]
+        self.timeline = SongTimeline.from_file(song_path)
+        self.scoring_engine = ScoringEngine(self.timeline, required_matches=1)
+        self.notes = notes if notes else DEFAULT_NOTES
+        self.offset = offset
+        self.interval = interval
+        self.buffer_time = buffer_time
+        self.analyser = RecordingAnalyser(fft_backend=fft_backend)
+
+    def _get_frame_frequencies(self, signal: np.ndarray) -> tuple[np.ndarray, int, int]:
+        '''
+        Find the dominant frequency of every frame of a signal.
+
+        Returns:
+            frequencies (ndarray): Dominant frequency of each frame, rounded as in `AudioManager.get_dominant_frequencies`
+            frame_length (int): Length of each frame in samples
+            frame_step (int): Samples between the start of each frame
+        '''
+        frequencies = self.analyser.get_frame_frequencies(signal)
+        return frequencies, int(.025 * self.analyser.rate), int(.01 * self.analyser.rate)
+
+    def _get_held_pitches(self, frequencies: np.ndarray) -> np.ndarray:
+        '''
+        Find the pitch class of the note being held after each frame, or -1 where no note is being played.
+        '''
+        notes = get_note_classifier(self.notes).classify_each(frequencies)
+        held = np.full(len(frequencies), -1, dtype=np.int16)
+        for event in NoteDetector().update(np.array([get_pitch_class(note) for note in notes])):
+            held[event['hop']:] = event['pitch'] if event['event'] == 'onset' else -1
+        return held
+
+    def detect(self, signal: np.ndarray, rate: int) -> tuple[np.ndarray, list[str | None]]:
+        '''
+        Detect the note being played throughout the song.
+
+        Args:
+            signal (ndarray): Mono int16 recording
+            rate (int): Sampling frequency of the recording in Hz
+
+        Returns:
+            times (ndarray): Song time of each detection in seconds
+            detected (list): Note detected at each time, or None where the recording has ended
+        '''
+        self.analyser.rate = rate
+        frame_frequencies, frame_length, frame_step = self._get_frame_frequencies(signal)
+        held_pitches = self._get_held_pitches(frame_frequencies)
+        # Buffers are a whole number of chunks, as in `AudioManager.stream`
+        buffer_length = int(rate / self.analyser.chunk * self.buffer_time) * self.analyser.chunk
+
+        # Only detections inside a note's acceptance window can be scored
+        onsets = self.scoring_engine.onsets
+        if not len(onsets):
+            return np.zeros(0), []
+        start = onsets[0] - self.scoring_engine.early_tolerance
+        end = onsets[-1] + self.scoring_engine.late_tolerance
+        times = np.arange(start, end + self.interval, self.interval)
+
+        # Index of the last frame wholly inside the buffer ending at each detection
+        buffer_ends = np.round((times + self.offset) * rate).astype(np.int64)
+        last_frames = (buffer_ends - frame_length) // frame_step
+
+        detected = []
+        for buffer_end, last_frame in zip(buffer_ends, last_frames):
+            if buffer_end < buffer_length or last_frame < 0:
+                # The buffer is padded with silence before the recording starts
+                detected.append('rest')
+            elif buffer_end > len(signal):
+                detected.append(None)
+            else:
+                pitch = int(held_pitches[last_frame])
+                detected.append(PITCH_CLASS_NAMES[pitch] if pitch >= 0 else 'rest')
+        return times, detected
+
+    def grade(self, path: str) -> dict[str, Any]:
+        '''
+        Grade a recording.
+
+        Args:
+            path (str): Location of the Wave file
+
+        Returns:
+            dict: The results, in the format of `Application.performance_results`, with the recording's path as 'recording'
+        '''
+        rate, signal = load_recording(path)
+        return self.grade_signal(signal, rate, path)
+
+    def grade_signal(self, signal: np.ndarray, rate: int, recording: str = '') -> dict[str, Any]:
+        '''
+        Grade a recording that has already been loaded.
+
+        Args:
+            signal (ndarray): Mono int16 recording
+            rate (int): Sampling frequency of the recording in Hz
+            recording (str): Name of the recording, returned as 'recording'
+                             default: ''
+
+        Returns:
+            dict: The results, in the format of `Application.performance_results`
+        '''
+        times, detected = self.detect(signal, rate)
+        results = self.scoring_engine.score(times, np.array([get_pitch_class(note) for note in detected], dtype=np.int8))
+
+        # The note detected last while each note was expected, as shown on the Analysis screen
+        detected_notes = {}
+        for time, note in zip(times, detected):
+            expected_note = self.scoring_engine.get_expected_note(time)
+            if expected_note is not None:
+                detected_notes[expected_note] = note
+
+        score = int(np.count_nonzero(results['hits']))
+        song_length = len(results['hits'])
+        return {
+            'recording': recording,
+            'song_name': self.song_name,
+            'song_length': song_length,
+            'score': score,
+            'accuracy': round(100 * score / song_length) if song_length else 0,
+            'accuracy_breakdown': results['accuracy_curve'].tolist(),
+            'note_results': [
+                {
+                    'note_name': self.timeline.note_names[index],
+                    'hit': bool(hit),
+                    # Milliseconds between the note's onset and it being played, negative when played early
+                    'offset_ms': None if np.isnan(offset) else float(offset * 1000),
+                    'detected': detected_notes.get(int(index))
+                }
+                for index, hit, offset in zip(results['notes'], results['hits'], results['offsets'])
+            ]
+        }
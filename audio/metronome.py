@@ -0,0 +1,133 @@
+import numpy as np
+import pygame
+from audio.scoring import SongTimeline
+from audio.synth import make_sound
+
+class Metronome:
+    '''
+    An audible click track, with an accented click on the first beat of every bar.
+
+    Each click is placed at the sample its beat falls on, counted from the tempo, so clicks are exactly a beat apart
+    however unevenly the performance loop runs. The two clicks are computed once, and the track from the start of
+    playback to the end of the song is rendered in one go before playback and handed to `pygame.mixer`, so nothing is
+    scheduled per frame.
+    '''
+    # Length of a click in seconds
+    CLICK_LENGTH = .03
+    # Frequency of the accented and the other clicks in Hz
+    CLICK_FREQUENCIES = {'accent': 1760, 'beat': 880}
+
+    def __init__(self, seconds_per_beat: float, beats_per_bar: int = 4, first_downbeat: float = 0.0, rate: int = 44_100, volume: float = .5) -> None:
+        '''
+        Create a Metronome instance.
+
+        Args:
+            seconds_per_beat (float): Seconds between clicks
+            beats_per_bar (int): Number of beats in a bar, from the top of the time signature
+                                 default: 4
+            first_downbeat (float): Song time in seconds of the first beat of a bar, e.g. after a pickup bar
+                                    default: 0.0
+            rate (int): Sampling frequency of the click track in Hz
+                        default: 44,100
+            volume (float): Peak amplitude of the accented click, from 0 to 1. Other clicks are a little quieter.
+                            default: 0.5
+        '''
+        self.seconds_per_beat = seconds_per_beat
+        self.beats_per_bar = beats_per_bar
+        self.first_downbeat = first_downbeat
+        self.rate = rate
+        self.clicks = {
+            'accent': self._create_click(self.CLICK_FREQUENCIES['accent'], volume),
+            'beat': self._create_click(self.CLICK_FREQUENCIES['beat'], volume * .7)
+        }
+        # The track being played and the song time of its first sample
+        self.track: np.ndarray | None = None
+        self.start_time = 0.0
+        self.sound: pygame.mixer.Sound | None = None
+
+    @classmethod
+    def from_timeline(cls, timeline: SongTimeline, **kwargs) -> 'Metronome':
+        '''
+        Create a Metronome keeping time with a song.
+
+        Args:
+            timeline (SongTimeline): The song
+            **kwargs: Other arguments of `Metronome`
+        '''
+        # Bars start a whole number of bars from the first barline, which allows for a pickup bar
+        first_downbeat = float(timeline.bar_onsets[0]) if len(timeline.bar_onsets) else 0.0
+        return cls(timeline.seconds_per_beat, timeline.beats_per_bar, first_downbeat, **kwargs)
+
+    def _create_click(self, frequency: float, volume: float) -> np.ndarray:
+        '''
+        Synthesize an exponentially decaying tone, starting at its peak so its first sample is its onset.
+        '''
+        times = np.arange(int(self.CLICK_LENGTH * self.rate)) / self.rate
+        click = np.cos(2 * np.pi * frequency * times) * np.exp(-times * 5 / self.CLICK_LENGTH)
+        return (click * volume * np.iinfo(np.int16).max).astype(np.int16)
+
+    def get_beats(self, start: float, end: float) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Find the beats in a span of song time.
+
+        Args:
+            start (float): Song time in seconds to find beats from, which can be negative during the lead in
+            end (float): Song time in seconds to find beats before
+
+        Returns:
+            tuple: Song time of each beat in seconds, and whether each beat is the first of a bar
+        '''
+        beats = np.arange(np.ceil(start / self.seconds_per_beat), np.ceil(end / self.seconds_per_beat))
+        downbeat = np.rint(self.first_downbeat / self.seconds_per_beat)
+        return beats * self.seconds_per_beat, (beats - downbeat) % self.beats_per_bar == 0
+
+    def render(self, start: float, length: int) -> np.ndarray:
+        '''
+        Render part of the click track. Beats are placed by their sample from song time 0, so rendering a track
+        in parts gives the same samples as rendering it whole.
+
+        Args:
+            start (float): Song time in seconds of the first sample
+            length (int): Number of samples
+
+        Returns:
+            ndarray: Mono int16 click track
+        '''
+        first_sample = round(start * self.rate)
+        click_length = len(self.clicks['beat'])
+        # Clicks that start before the track may still be sounding at its start
+        times, accents = self.get_beats((first_sample - click_length) / self.rate, (first_sample + length) / self.rate)
+        positions = np.rint(times * self.rate).astype(np.int64) - first_sample
+
+        indices = positions[:, None] + np.arange(click_length)
+        samples = np.where(accents[:, None], self.clicks['accent'], self.clicks['beat'])
+        in_track = (indices >= 0) & (indices < length)
+        track = np.zeros(length, dtype=np.int32)
+        np.add.at(track, indices[in_track], samples[in_track])
+        return np.clip(track, np.iinfo(np.int16).min, np.iinfo(np.int16).max).astype(np.int16)
+
+    def prepare(self, start: float, end: float) -> None:
+        '''
+        Render the click track between two song times, ready to be played. Rendering a long song takes a while,
+        so this is done before playback is due to start rather than when it starts.
+
+        Args:
+            start (float): Song time in seconds that playback starts at
+            end (float): Song time in seconds that the track ends at
+        '''
+        # The track starts on the sample nearest the start time
+        self.start_time = round(start * self.rate) / self.rate
+        self.track = self.render(self.start_time, max(0, round((end - self.start_time) * self.rate)))
+        self.sound = make_sound(self.track, self.rate)
+
+    def play(self) -> None:
+        '''
+        Start playing the click track made by `prepare`.
+        '''
+        # Without an output device the track is still rendered, but nothing is heard
+        if self.sound:
+            self.sound.play()
+
+    def stop(self) -> None:
+        if self.sound:
+            self.sound.stop()
@@ -0,0 +1,80 @@
+import numpy as np
+
+class NoteDetector:
+    '''
+    Decides when a player starts and stops playing a note, from the pitch detected in each analysis hop.
+
+    Each hop is a frame of `AudioManager._framing`, 10ms of audio, so decisions do not depend on how often the
+    performance loop renders. The pitch of each hop is median filtered to remove single hop glitches, then a note
+    starts once `onset_hops` filtered hops agree on it and stops once `offset_hops` filtered hops have not matched it.
+    Stopping takes longer than starting, so a note is held through brief dropouts without delaying the next note.
+    '''
+    def __init__(self, median_hops: int = 3, onset_hops: int = 2, offset_hops: int = 3) -> None:
+        '''
+        Create a NoteDetector instance.
+
+        Args:
+            median_hops (int): Number of hops the median filter spans. With three, a hop's pitch is kept whenever a neighbour agrees with it.
+                               default: 3
+            onset_hops (int): Number of consecutive filtered hops of a pitch needed to start a note
+                              default: 2
+            offset_hops (int): Number of consecutive filtered hops not of the held pitch needed to stop the note
+                               default: 3
+        '''
+        self.median_hops = median_hops
+        self.onset_hops = onset_hops
+        self.offset_hops = offset_hops
+        # Confidence is the share of the raw hops that led to a decision which agree with it
+        self.history_length = median_hops + onset_hops - 1
+        self.reset()
+
+    def reset(self) -> None:
+        self.history: list[int] = []
+        # Pitch of the note being held, or -1 when no note is being played
+        self.pitch = -1
+        self.candidate = -1
+        self.candidate_hops = 0
+        self.missed_hops = 0
+        # Number of hops analysed since the detector was reset
+        self.hop = 0
+
+    def _create_event(self, event: str, pitch: int, agreeing: int) -> dict[str, str | int | float]:
+        return {'event': event, 'pitch': pitch, 'hop': self.hop, 'confidence': agreeing / len(self.history)}
+
+    def update(self, pitches: np.ndarray) -> list[dict[str, str | int | float]]:
+        '''
+        Analyse more hops, in addition to those already analysed.
+
+        Args:
+            pitches (ndarray): Pitch class or MIDI number detected in each hop, in order, or -1 for no note
+
+        Returns:
+            list: Each note that started or stopped, in order, as dictionaries of:
+                'event': 'onset' or 'offset'
+                'pitch': Pitch of the note
+                'hop': Index of the hop the decision was made on, counted from the last reset
+                'confidence': Share of the most recent hops that agree with the decision, from 0 to 1
+        '''
+        events = []
+        for pitch in np.asarray(pitches).tolist():
+            self.history = (self.history + [pitch])[-self.history_length:]
+            window = sorted(self.history[-self.median_hops:])
+            filtered = window[len(window) // 2]
+
+            if filtered == self.candidate:
+                self.candidate_hops += 1
+            else:
+                self.candidate, self.candidate_hops = filtered, 1
+            self.missed_hops = 0 if filtered == self.pitch else self.missed_hops + 1
+
+            if filtered >= 0 and filtered != self.pitch and self.candidate_hops >= self.onset_hops:
+                # A new note ends the held note straight away
+                if self.pitch >= 0:
+                    events.append(self._create_event('offset', self.pitch, sum(hop != self.pitch for hop in self.history)))
+                self.pitch, self.missed_hops = filtered, 0
+                events.append(self._create_event('onset', filtered, self.history.count(filtered)))
+            elif self.pitch >= 0 and self.missed_hops >= self.offset_hops:
+                events.append(self._create_event('offset', self.pitch, sum(hop != self.pitch for hop in self.history)))
+                self.pitch = -1
+            self.hop += 1
+        return events
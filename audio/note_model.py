@@ -0,0 +1,149 @@
+import numpy as np
+
+# Name of each pitch class, starting from C, as used for the keys of `Application.notes`
+PITCH_CLASS_NAMES = ['C', 'C#/Db', 'D', 'D#/Eb', 'E', 'F', 'F#/Gb', 'G', 'G#/Ab', 'A', 'A#/Bb', 'B']
+# MIDI number of A4, the note the reference frequency is tuned to
+REFERENCE_NOTE = 69
+
+class NoteModel:
+    '''
+    Maps frequencies to notes across a range of octaves, by MIDI number.
+
+    A frequency's MIDI number is found in closed form, 12 * log2(frequency / reference) + 69, and snapped to the
+    nearest tuned note with a binary search, so classification takes the same time however wide the range is.
+    Each pitch class can be tuned by an offset in cents, such as those measured by calibration.
+    '''
+    def __init__(self, lowest: int = 21, highest: int = 108, reference: float = 440.0, offsets: np.ndarray | None = None) -> None:
+        '''
+        Create a NoteModel instance.
+
+        Args:
+            lowest (int): MIDI number of the lowest note
+                          default: 21, A0, the lowest key of a piano
+            highest (int): MIDI number of the highest note
+                           default: 108, C8, the highest key of a piano
+            reference (float): Frequency of A4 in Hz
+                               default: 440.0
+            offsets (ndarray): Cents each pitch class, starting from C, is tuned away from equal temperament
+                               default: None, equal temperament
+        '''
+        self.lowest = lowest
+        self.highest = highest
+        self.reference = reference
+        self.offsets = np.zeros(12) if offsets is None else np.asarray(offsets, dtype=np.float64)
+
+        midi_numbers = np.arange(lowest, highest + 1)
+        # Where each note sits in semitones once tuned, sorted for the binary search
+        positions = midi_numbers + self.offsets[midi_numbers % 12] / 100
+        order = np.argsort(positions, kind='stable')
+        self.positions = positions[order]
+        self.midi_numbers = midi_numbers[order]
+
+    @classmethod
+    def from_notes(cls, notes: dict[str, list[int]], **kwargs) -> 'NoteModel':
+        '''
+        Create a NoteModel tuned to a calibration.
+
+        Args:
+            notes (dict): Dictionary of notes and their associated frequencies, in the format of `Application.notes`.
+                          The frequencies of each pitch class can be in any octave.
+            **kwargs: Other arguments of `NoteModel`
+
+        Returns:
+            NoteModel: Model with each calibrated pitch class offset by its median distance from equal temperament
+        '''
+        reference = kwargs.get('reference', 440.0)
+        offsets = np.zeros(12)
+        for pitch_class, name in enumerate(PITCH_CLASS_NAMES):
+            frequencies = [frequency for frequency in notes.get(name, []) if frequency > 1]
+            if not frequencies:
+                continue
+            cents = 1200 * np.log2(np.median(frequencies) / reference) - 100 * (pitch_class - REFERENCE_NOTE % 12)
+            # Distance from the nearest octave of the pitch class
+            offsets[pitch_class] = (cents + 600) % 1200 - 600
+        return cls(offsets=offsets, **kwargs)
+
+    def _get_nearest(self, frequencies: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        Find the frequencies in semitones from C-1, the index of the nearest tuned note to each, and whether each is a note.
+        '''
+        frequencies = np.asarray(frequencies, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            semitones = 12 * np.log2(frequencies / self.reference) + REFERENCE_NOTE
+
+        above = np.clip(np.searchsorted(self.positions, semitones), 1, len(self.positions) - 1)
+        below = above - 1
+        nearest = np.where(semitones - self.positions[below] <= self.positions[above] - semitones, below, above)
+        in_range = (frequencies > 1) & (np.abs(semitones - self.positions[nearest]) < 1)
+        return semitones, nearest, in_range
+
+    def get_midi_numbers(self, frequencies: np.ndarray) -> np.ndarray:
+        '''
+        Find the nearest note to each frequency.
+
+        Args:
+            frequencies (ndarray): Frequencies in Hz
+
+        Returns:
+            ndarray: MIDI number of each note, or -1 for frequencies that are silence or more than a semitone outside the range
+        '''
+        _, nearest, in_range = self._get_nearest(frequencies)
+        return np.where(in_range, self.midi_numbers[nearest], -1)
+
+    def get_cents(self, frequencies: np.ndarray) -> np.ndarray:
+        '''
+        Find how far each frequency is from its nearest note, as found by `get_midi_numbers`.
+
+        Args:
+            frequencies (ndarray): Frequencies in Hz
+
+        Returns:
+            ndarray: Cents each frequency is sharp, or flat when negative, or NaN where there is no note
+        '''
+        semitones, nearest, in_range = self._get_nearest(frequencies)
+        return np.where(in_range, 100 * (semitones - self.positions[nearest]), np.nan)
+
+    def classify(self, frequencies: np.ndarray) -> int:
+        '''
+        Find the note most likely being played, from the dominant frequencies of a buffer.
+
+        Args:
+            frequencies (ndarray): Dominant frequencies, in the format of `AudioManager.get_dominant_frequencies`
+
+        Returns:
+            int: MIDI number of the note, or -1 if no note is being played
+        '''
+        # A dominant frequency of 1.0 is background noise, as in `AudioManager.get_note_from_frequency`
+        if 1.0 in frequencies or not len(frequencies):
+            return -1
+        midi_numbers = self.get_midi_numbers(frequencies)
+        midi_numbers = midi_numbers[midi_numbers >= 0]
+        if not len(midi_numbers):
+            return -1
+        # The most common note, the lowest winning ties
+        return int(np.bincount(midi_numbers).argmax())
+
+    @staticmethod
+    def get_name(midi_number: int) -> str:
+        '''
+        Get the name of a note in scientific pitch notation, e.g. 69 is 'A4' and 61 is 'C#/Db4'.
+        Anything that is not a note, such as -1, is a 'rest'.
+        '''
+        if midi_number < 0:
+            return 'rest'
+        return f'{PITCH_CLASS_NAMES[midi_number % 12]}{midi_number // 12 - 1}'
+
+    @staticmethod
+    def get_midi_number(name: str | None) -> int:
+        '''
+        Get the MIDI number of a note named by `get_name`.
+
+        Returns:
+            int: MIDI number of the note, or -1 if the name is not a note
+        '''
+        if not name or not name[-1].isdigit():
+            return -1
+        pitch_class, octave = name.rstrip('0123456789'), int(name[len(name.rstrip('0123456789')):])
+        if pitch_class not in PITCH_CLASS_NAMES:
+            return -1
+        return (octave + 1) * 12 + PITCH_CLASS_NAMES.index(pitch_class)
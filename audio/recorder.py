@@ -0,0 +1,90 @@
+import os
+import json
+import wave
+import queue
+import threading
+from typing import Any
+
+class SessionRecorder:
+    '''
+    Records a performance so it can be replayed exactly: the raw microphone audio and a log of
+    every frame of the performance loop.
+
+    Audio and log events are handed to a background thread which writes them to disk, so recording never
+    blocks the audio stream or the performance loop.
+    '''
+    def __init__(self, directory: str, rate: int, header: dict[str, Any], channels: int = 1) -> None:
+        '''
+        Create a SessionRecorder instance and start its writer thread.
+
+        Args:
+            directory (str): Directory to write 'audio.wav', 'events.jsonl' and 'session.json' to. Created if it does not exist.
+            rate (int): Sampling frequency of the audio in Hz
+            header (dict): Information needed to replay the session, such as the song and note calibration
+            channels (int): Number of interleaved channels in the audio
+                            default: 1
+        '''
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'session.json'), 'w') as file:
+            json.dump(header, file)
+
+        self.rate = rate
+        self.channels = channels
+        self.queue: queue.Queue[tuple[str, Any] | None] = queue.Queue()
+        self.thread = threading.Thread(target=self._write, daemon=True)
+        self.thread.start()
+
+    def _write(self) -> None:
+        '''
+        Write queued audio chunks and log events to disk until the recorder is closed.
+        '''
+        with wave.open(os.path.join(self.directory, 'audio.wav'), 'wb') as audio_file, \
+             open(os.path.join(self.directory, 'events.jsonl'), 'w') as events_file:
+            # 16 bit audio, to match the microphone stream
+            audio_file.setnchannels(self.channels)
+            audio_file.setsampwidth(2)
+            audio_file.setframerate(self.rate)
+
+            while (item := self.queue.get()) is not None:
+                kind, data = item
+                if kind == 'audio':
+                    audio_file.writeframes(data)
+                else:
+                    events_file.write(json.dumps(data, separators=(',', ':')) + '\n')
+
+    def write_audio(self, data: bytes) -> None:
+        self.queue.put(('audio', data))
+
+    def log(self, event: dict[str, Any]) -> None:
+        self.queue.put(('event', event))
+
+    def close(self) -> None:
+        '''
+        Finish writing everything queued and close the files.
+        '''
+        self.queue.put(None)
+        self.thread.join()
+
+class ReplaySession:
+    '''
+    A recorded session loaded back from disk.
+    '''
+    def __init__(self, directory: str) -> None:
+        '''
+        Load a session written by SessionRecorder.
+
+        Args:
+            directory (str): Directory the session was recorded to
+        '''
+        with open(os.path.join(directory, 'session.json'), 'r') as file:
+            self.header: dict[str, Any] = json.load(file)
+
+        with open(os.path.join(directory, 'events.jsonl'), 'r') as file:
+            self.events: list[dict[str, Any]] = [json.loads(line) for line in file]
+        self.frames = [event for event in self.events if 'ms' in event]
+
+        with wave.open(os.path.join(directory, 'audio.wav'), 'rb') as audio_file:
+            self.rate = audio_file.getframerate()
+            self.channels = audio_file.getnchannels()
+            self.audio = audio_file.readframes(audio_file.getnframes())
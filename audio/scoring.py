@@ -0,0 +1,232 @@
+import numpy as np
+
+# Semitones above C of each note letter, and the semitones each accidental adds
+LETTER_PITCHES = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+ACCIDENTAL_PITCHES = {'#': 1, 'b': -1, 'n': 0}
+
+def get_pitch_class(note: str | None) -> int:
+    '''
+    Convert a note name into its pitch class, the number of semitones above C.
+
+    Args:
+        note (str): Note name such as 'E', 'F#', 'Bb' or 'A#/Bb'. Anything else, such as 'rest', is not a note.
+
+    Returns:
+        int: Pitch class from 0 to 11, or -1 if the name is not a note
+    '''
+    if not note:
+        return -1
+    note = note.split('/')[0]
+    if note[0] not in LETTER_PITCHES or (len(note) > 1 and note[1] not in ACCIDENTAL_PITCHES):
+        return -1
+    accidental = ACCIDENTAL_PITCHES[note[1]] if len(note) > 1 else 0
+    return (LETTER_PITCHES[note[0]] + accidental) % 12
+
+def get_midi_number(note: str) -> int:
+    '''
+    Convert a note name from a song file into its MIDI number.
+    Song files number each octave from A up to G, so their A and B are the A and B of the octave below in
+    scientific pitch notation. E.g. 'E4n' is E4 (64), but 'A5n' is A4 (69) and 'A5b' is A flat 4 (68).
+
+    Args:
+        note (str): Note name from a song file, such as 'E4n', 'F4#' or 'A5b'
+
+    Returns:
+        int: MIDI number of the note, or -1 if the name is not a note
+    '''
+    if len(note) < 3 or note[0] not in LETTER_PITCHES or not note[1].isdigit() or note[2] not in ACCIDENTAL_PITCHES:
+        return -1
+    octave = int(note[1]) - 1 if note[0] in 'AB' else int(note[1])
+    return (octave + 1) * 12 + LETTER_PITCHES[note[0]] + ACCIDENTAL_PITCHES[note[2]]
+
+class SongTimeline:
+    '''
+    A song compiled into arrays of note timings and pitches, with times in seconds from the start of the first note.
+    '''
+    def __init__(self, song_contents: list[list[str]]) -> None:
+        '''
+        Compile a song.
+
+        Args:
+            song_contents (list): The song file split into bars of notes, with the metadata as the first bar
+                                  E.g. [['tempo=100', 'cleff=treble', ...], ['E4n1.000n', 'E4n1.000n', ...], ...]
+        '''
+        header = dict(field.split('=', 1) for field in song_contents[0] if '=' in field)
+        self.tempo = int(header['tempo'])
+        self.seconds_per_beat = 60 / self.tempo
+        # E.g. a time signature of '3/4' has three beats in a bar
+        self.beats_per_bar = int(header.get('time_signature', '4/4').split('/')[0])
+
+        # E.g. 'A5b0.500n' is the note A flat 5 ('A5b') lasting half a beat ('0.500') which is not a rest ('n')
+        notes = [note for bar in song_contents[1:] for note in bar if note]
+        self.note_names = [note[:3] for note in notes]
+        self.labels = [note[0] if note[2] == 'n' else note[0] + note[2] for note in notes]
+        self.is_rest = np.array([note[-1] == 'r' for note in notes])
+        self.pitch_classes = np.array([get_pitch_class(label) for label in self.labels], dtype=np.int8)
+        self.pitch_classes[self.is_rest] = -1
+        self.midi_numbers = np.array([get_midi_number(name) for name in self.note_names], dtype=np.int16)
+        self.midi_numbers[self.is_rest] = -1
+
+        self.durations = np.array([float(note[3:-1]) for note in notes]) * self.seconds_per_beat
+        ends = np.cumsum(self.durations)
+        self.onsets = ends - self.durations
+        self.length = float(ends[-1]) if len(ends) else 0.0
+
+        # A barline is drawn at the end of every bar but the last
+        bar_lengths = [sum(float(note[3:-1]) for note in bar if note) for bar in song_contents[1:]]
+        self.bar_onsets = np.cumsum(bar_lengths)[:-1] * self.seconds_per_beat
+
+    @classmethod
+    def from_file(cls, path: str) -> 'SongTimeline':
+        '''
+        Compile a song from its file.
+
+        Args:
+            path (str): Location of the song file
+        '''
+        with open(path, mode='r') as file:
+            song_data = file.read().split('|')
+        return cls([bar.strip('\n').split(',') for bar in song_data])
+
+class ScoringEngine:
+    '''
+    Scores a stream of timestamped detected pitches against a song timeline, independent of frame rate and rendering.
+
+    Each detection is matched to the nearest note, in time, that has the same pitch and whose acceptance window
+    ([onset - early_tolerance, onset + late_tolerance]) contains it. A note is hit once `required_matches` detections
+    have matched it. Rests are not scored. Pitches are pitch classes, or MIDI numbers when the octave must be right too.
+    '''
+    # How many notes either side of a detection are considered when matching it
+    MATCH_NEIGHBOURS = 2
+
+    def __init__(self, timeline: SongTimeline, early_tolerance: float = .15, late_tolerance: float = .3, required_matches: int = 5, octave_aware: bool = False) -> None:
+        '''
+        Create a ScoringEngine instance.
+
+        Args:
+            timeline (SongTimeline): The song being played
+            early_tolerance (float): Seconds before a note's onset that it can be played
+                                     default: 0.15
+            late_tolerance (float): Seconds after a note's onset that it can be played
+                                    default: 0.3
+            required_matches (int): Number of matching detections needed for a note to be hit
+                                    default: 5
+            octave_aware (bool): Whether detections are MIDI numbers, so notes must be played in the right octave, rather than pitch classes
+                                 default: False
+        '''
+        self.timeline = timeline
+        self.early_tolerance = early_tolerance
+        self.late_tolerance = late_tolerance
+        self.required_matches = required_matches
+        self.octave_aware = octave_aware
+
+        # Only notes are scored, so indices below are into these arrays rather than the timeline
+        self.note_indices = np.flatnonzero(~timeline.is_rest)
+        self.onsets = timeline.onsets[self.note_indices]
+        self.pitches = (timeline.midi_numbers if octave_aware else timeline.pitch_classes)[self.note_indices]
+        self.reset()
+
+    def reset(self) -> None:
+        self.match_counts = np.zeros(len(self.onsets), dtype=np.int64)
+        self.first_matches = np.full(len(self.onsets), np.inf)
+
+    def match(self, times: np.ndarray, pitches: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Match each detection to a note.
+
+        Args:
+            times (ndarray): Song time of each detection in seconds
+            pitches (ndarray): Pitch class or MIDI number of each detection, or -1 for no note
+
+        Returns:
+            notes (ndarray): Index of the note each detection matched
+            matched (ndarray): Whether each detection matched a note at all
+        '''
+        times = np.asarray(times, dtype=np.float64)
+        pitches = np.asarray(pitches)
+        notes = np.zeros(len(times), dtype=np.int64)
+        distances = np.full(len(times), np.inf)
+        if not len(self.onsets):
+            return notes, np.zeros(len(times), dtype=bool)
+
+        nearest = np.searchsorted(self.onsets, times)
+        for neighbour in range(-self.MATCH_NEIGHBOURS, self.MATCH_NEIGHBOURS):
+            candidates = np.clip(nearest + neighbour, 0, len(self.onsets) - 1)
+            offsets = times - self.onsets[candidates]
+            valid = (
+                (self.pitches[candidates] == pitches)
+                & (offsets >= -self.early_tolerance)
+                & (offsets <= self.late_tolerance)
+                & (np.abs(offsets) < distances)
+            )
+            notes[valid] = candidates[valid]
+            distances[valid] = np.abs(offsets[valid])
+
+        return notes, np.isfinite(distances)
+
+    def feed(self, times: np.ndarray, pitches: np.ndarray) -> np.ndarray:
+        '''
+        Score more detections, in addition to those already fed.
+
+        Args:
+            times (ndarray): Song time of each detection in seconds
+            pitches (ndarray): Pitch class or MIDI number of each detection, or -1 for no note
+
+        Returns:
+            ndarray: Indices into the timeline of the notes that have just been hit
+        '''
+        was_hit = self.match_counts >= self.required_matches
+        notes, matched = self.match(times, pitches)
+        np.add.at(self.match_counts, notes[matched], 1)
+        np.minimum.at(self.first_matches, notes[matched], np.asarray(times, dtype=np.float64)[matched])
+        newly_hit = (self.match_counts >= self.required_matches) & ~was_hit
+        return self.note_indices[newly_hit]
+
+    def get_expected_note(self, time: float) -> int | None:
+        '''
+        Get the note whose acceptance window contains a time, preferring the most recent onset.
+
+        Returns:
+            int | None: Index into the timeline of the note, or None if no note is expected
+        '''
+        note = int(np.searchsorted(self.onsets, time + self.early_tolerance, side='right')) - 1
+        if note < 0 or time - self.onsets[note] > self.late_tolerance:
+            return None
+        return int(self.note_indices[note])
+
+    def get_hit_count(self) -> int:
+        return int(np.count_nonzero(self.match_counts >= self.required_matches))
+
+    def get_results(self) -> dict[str, np.ndarray]:
+        '''
+        Get the results of every note.
+
+        Returns:
+            dict:
+                'notes': Index into the timeline of each note
+                'hits': Whether each note was hit
+                'offsets': Seconds between each hit note's onset and its first matching detection, NaN if missed
+                'accuracy_curve': Percent of notes hit out of all notes up to and including each note
+        '''
+        hits = self.match_counts >= self.required_matches
+        return {
+            'notes': self.note_indices,
+            'hits': hits,
+            'offsets': np.where(hits, self.first_matches - self.onsets, np.nan),
+            'accuracy_curve': np.round(100 * np.cumsum(hits) / np.arange(1, len(hits) + 1)).astype(np.int64)
+        }
+
+    def score(self, times: np.ndarray, pitches: np.ndarray) -> dict[str, np.ndarray]:
+        '''
+        Score a complete stream of detections in one pass, discarding anything already fed.
+
+        Args:
+            times (ndarray): Song time of each detection in seconds
+            pitches (ndarray): Pitch class or MIDI number of each detection, or -1 for no note
+
+        Returns:
+            dict: The results, in the format of `get_results`
+        '''
+        self.reset()
+        self.feed(times, pitches)
+        return self.get_results()
@@ -0,0 +1,133 @@
+import os
+import json
+import threading
+from typing import Any
+
+class SongCatalog:
+    '''
+    Persisted index of the song library, so song select does not have to walk and read every song file on each visit.
+    Refreshes are made one at a time, so the index can be refreshed from several threads, such as by the grading server.
+    '''
+    def __init__(self, directory: str = '.\\assets\\songs', index_path: str = '.\\assets\\song_catalog.json') -> None:
+        '''
+        Create a SongCatalog instance and load the saved index if there is one.
+
+        Args:
+            directory (str): Directory containing the song files
+                             default: '.\\assets\\songs'
+            index_path (str): Location of the persisted index
+                              default: '.\\assets\\song_catalog.json'
+        '''
+        self.directory = directory
+        self.index_path = index_path
+        self.directory_mtime = 0.0
+        self.songs: dict[str, dict[str, Any]] = {}
+        # Held for the whole of a refresh, as every refresh writes the index through the same temporary file
+        self.lock = threading.Lock()
+        self._load_index()
+
+    def _load_index(self) -> None:
+        '''
+        Load the index from disk. A missing or corrupt index is rebuilt on the next refresh.
+        '''
+        try:
+            with open(self.index_path, 'r') as file:
+                index = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            return
+
+        self.directory_mtime = index.get('directory_mtime', 0.0)
+        self.songs = index.get('songs', {})
+
+    def _save_index(self) -> None:
+        '''
+        Write the index to a temporary file and rename it over the old index so it is never left half written.
+        '''
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({'directory_mtime': self.directory_mtime, 'songs': self.songs}, file)
+        os.replace(temp_path, self.index_path)
+
+    @staticmethod
+    def read_header(path: str) -> dict[str, str]:
+        '''
+        Read the metadata header of a song file without reading the rest of the song.
+        E.g. 'tempo=100,cleff=treble,time_signature=4/4,key=C,notes=62|'
+
+        Args:
+            path (str): Location of the song file
+
+        Returns:
+            header (dict): Each metadata name and its value
+        '''
+        with open(path, 'r') as file:
+            line = file.readline().split('|')[0].strip()
+        return dict(field.split('=', 1) for field in line.split(',') if '=' in field)
+
+    def _create_entry(self, path: str, file_name: str, mtime: float) -> dict[str, Any]:
+        song_name, song_difficulty = file_name.split(' - ')
+        header = self.read_header(path)
+        return {
+            'name': song_name,
+            'difficulty': song_difficulty,
+            'path': path,
+            'notes': int(header.get('notes', 0)),
+            'tempo': int(header.get('tempo', 0)),
+            'mtime': mtime
+        }
+
+    def refresh(self, force: bool = False) -> bool:
+        '''
+        Bring the index up to date with the song directory. Nothing is read unless the directory has been
+        modified, and then only songs that are new or whose file has changed are read again.
+        Edits to an existing song that do not modify the directory are picked up with `force`.
+
+        Args:
+            force (bool): Check every song even if the directory has not been modified
+                          default: False
+
+        Returns:
+            bool: Whether the index changed
+        '''
+        with self.lock:
+            directory_mtime = os.stat(self.directory).st_mtime
+            if directory_mtime == self.directory_mtime and not force:
+                return False
+
+            songs = {}
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    file_name, extension = os.path.splitext(entry.name)
+                    if extension != '.txt' or ' - ' not in file_name:
+                        continue
+
+                    mtime = entry.stat().st_mtime
+                    cached = self.songs.get(entry.name)
+                    if cached and cached['mtime'] == mtime:
+                        songs[entry.name] = cached
+                    else:
+                        songs[entry.name] = self._create_entry(os.path.join(self.directory, entry.name), file_name, mtime)
+
+            changed = songs != self.songs
+            self.songs = songs
+            self.directory_mtime = directory_mtime
+            self._save_index()
+            return changed
+
+    def get_songs(self) -> list[dict[str, Any]]:
+        '''
+        Get every song in the library.
+
+        Returns:
+            songs (list): Index entries sorted by file name
+        '''
+        return [self.songs[file_name] for file_name in sorted(self.songs)]
+
+    def get_song(self, song_name: str) -> dict[str, Any] | None:
+        '''
+        Look up a song by its file name without the extension, e.g. 'Ode to Joy - Easy'.
+
+        Returns:
+            dict | None: The song's index entry, or None if there is no such song
+        '''
+        return self.songs.get(f'{song_name}.txt')
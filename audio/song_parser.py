@@ -57,8 +57,6 @@ class SongParser:
             'pos': 1280,
             'note_length': float(note[3:-1]),
             'note_name': note[:3],
-            'long_duration_bool': 0, # Used to track if a note longer than 1 beat has been spawned for its note duration
-            'played': 5, # Number of times microphone detected note must match before the note is successfully played 
             'note_img_offset': 0,
             'note_img': None,
             'tilt': None
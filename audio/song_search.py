@@ -0,0 +1,87 @@
+import re
+from bisect import bisect_left, bisect_right
+from typing import Any
+
+class SongSearch:
+    '''
+    In-memory index over the song library for searching as the user types.
+
+    A query is a list of space separated terms, all of which must match:
+        - A word prefix of the song title, e.g. 'ode jo'
+        - A difficulty, e.g. 'easy'
+        - A tempo or note count range, e.g. 'tempo>80', 'notes<=60', 'tempo=90'
+    '''
+    RANGE_PATTERN = re.compile(r'^(tempo|notes|length)(<=|>=|<|>|=)(\d+)$')
+
+    def __init__(self, songs: list[dict[str, Any]]) -> None:
+        '''
+        Build the search index.
+
+        Args:
+            songs (list): Song catalog entries to be searched
+        '''
+        self.songs = songs
+        self.prefixes: dict[str, set[int]] = {}
+        self.difficulties: dict[str, set[int]] = {}
+
+        for i, song in enumerate(songs):
+            for word in re.findall(r"[a-z0-9']+", song['name'].lower()):
+                for length in range(1, len(word) + 1):
+                    self.prefixes.setdefault(word[:length], set()).add(i)
+            self.difficulties.setdefault(song['difficulty'].lower(), set()).add(i)
+
+        # Sorted (value, index) columns for range queries
+        self.ranges = {
+            field: sorted((song[field], i) for i, song in enumerate(songs)) for field in ('tempo', 'notes')
+        }
+        self.range_keys = {field: [value for value, _ in column] for field, column in self.ranges.items()}
+        self.cache: dict[str, list[int]] = {'': list(range(len(songs)))}
+
+    def _range(self, field: str, operator: str, value: int) -> set[int]:
+        '''
+        Find all songs with a tempo or note count satisfying a comparison.
+
+        Returns:
+            set: Indices of the matching songs
+        '''
+        keys = self.range_keys[field]
+        start, end = 0, len(keys)
+        if operator in ('>', '>='):
+            start = bisect_right(keys, value) if operator == '>' else bisect_left(keys, value)
+        elif operator in ('<', '<='):
+            end = bisect_left(keys, value) if operator == '<' else bisect_right(keys, value)
+        else:
+            start, end = bisect_left(keys, value), bisect_right(keys, value)
+        return {i for _, i in self.ranges[field][start:end]}
+
+    def _match_term(self, term: str) -> set[int]:
+        range_match = self.RANGE_PATTERN.match(term)
+        if range_match:
+            field, operator, value = range_match.groups()
+            return self._range('notes' if field == 'length' else field, operator, int(value))
+        if term in self.difficulties:
+            return self.difficulties[term]
+        return self.prefixes.get(term, set())
+
+    def search(self, query: str) -> list[int]:
+        '''
+        Find the songs matching a query.
+
+        Args:
+            query (str): Space separated search terms
+
+        Returns:
+            list: Indices of the matching songs in library order
+        '''
+        terms = query.lower().split()
+        key = ' '.join(terms)
+        if key not in self.cache:
+            if len(self.cache) > 256:
+                self.cache = {'': self.cache['']}
+            matches = None
+            for term in terms:
+                matches = self._match_term(term) if matches is None else matches & self._match_term(term)
+                if not matches:
+                    break
+            self.cache[key] = sorted(matches)
+        return self.cache[key]
@@ -0,0 +1,145 @@
+from typing import Callable
+import numpy as np
+from audio.audio_manager import AudioManager
+from audio.note_model import NoteModel, REFERENCE_NOTE
+from audio.recorder import ReplaySession
+
+class SignalSource(AudioManager):
+    '''
+    Audio source that plays back a signal instead of reading the microphone.
+    The signal is played in step with a clock, so a simulated clock gives the same buffers on every run.
+    '''
+    def __init__(self, signal: np.ndarray, clock, chunk: int = 1024, rate: int = 44_100):
+        '''
+        Initialize a SignalSource object.
+
+        Args:
+            signal (ndarray): Mono int16 audio signal, starting from the first call to `stream`
+            clock: Clock driving the performance loop, with a `get_ticks` method giving milliseconds
+            chunk (int): Number of samples grouped together
+                         default: 1024
+            rate (int): Sampling frequency in Hz
+                        default: 44,100
+        '''
+        self.signal = signal.astype(np.int16, copy=False)
+        self.clock = clock
+        self.start_time = None
+        super().__init__(chunk, rate)
+
+    def _open_stream(self) -> None:
+        return None
+
+    def _get_position(self) -> int:
+        '''
+        Get the number of samples that have been played since the first call to `stream`.
+        '''
+        if self.start_time is None:
+            self.start_time = self.clock.get_ticks()
+        return int((self.clock.get_ticks() - self.start_time) / 1000 * self.rate)
+
+    def stream(self, time=.1):
+        '''
+        Update audio stream buffer with the most recent (time) seconds of the signal.
+
+        Args:
+            time (float): Length of audio stream buffer in seconds
+                          default: 0.1
+        '''
+        end = self._get_position()
+        length = int(self.rate / self.chunk * time) * self.chunk
+        buffer = self.signal[max(0, end - length):end]
+        # Pad with silence before the signal starts and after it ends
+        self.buffer = np.pad(buffer, (length - len(buffer), 0))
+        self.buffer_range = (end - length, end)
+
+class ReferenceSource(AudioManager):
+    '''
+    Audio source that synthesizes a player who always plays the note currently expected of them.
+    '''
+    def __init__(self, notes: dict[str, list[int]], get_note: Callable[[], str] | None = None, chunk: int = 1024, rate: int = 44_100):
+        '''
+        Initialize a ReferenceSource object.
+
+        Args:
+            notes (dict): Dictionary of notes and their associated frequencies, in the format of `Application.notes`
+            get_note (Callable): Function returning the name of the note to play, e.g. 'F#', or with its octave in the format of
+                                 `NoteModel.get_name`, e.g. 'F#/Gb4'. Silence is played for any other name.
+                                 default: None, play silence
+            chunk (int): Number of samples grouped together
+                         default: 1024
+            rate (int): Sampling frequency in Hz
+                        default: 44,100
+        '''
+        self.notes = notes
+        self.get_note = get_note
+        super().__init__(chunk, rate)
+
+    def _open_stream(self) -> None:
+        return None
+
+    def stream(self, time=.1):
+        '''
+        Update audio stream buffer with (time) seconds of the expected note.
+
+        Args:
+            time (float): Length of audio stream buffer in seconds
+                          default: 0.1
+        '''
+        length = int(self.rate / self.chunk * time) * self.chunk
+        note = self.get_note() if self.get_note else None
+        midi_number = NoteModel.get_midi_number(note)
+        if midi_number >= 0:
+            frequency = 440 * 2 ** ((midi_number - REFERENCE_NOTE) / 12)
+        else:
+            frequency = next(
+                (frequencies[0] for name, frequencies in self.notes.items() if note in name.split('/')), None
+            )
+        if frequency is None:
+            self.buffer = np.zeros(length, dtype=np.int16)
+            return
+
+        self.buffer = (np.sin(2 * np.pi * frequency * np.arange(length) / self.rate) * 8000).astype(np.int16)
+
+class ReplaySource(AudioManager):
+    '''
+    Audio source that feeds a recorded session back frame by frame, so that each frame analyses
+    exactly the audio it analysed when it was recorded.
+    '''
+    def __init__(self, session: ReplaySession, clock, chunk: int = 1024):
+        '''
+        Initialize a ReplaySource object.
+
+        Args:
+            session (ReplaySession): The recorded session
+            clock: Clock replaying the session's frames, with a `frame` attribute giving the index of the current frame
+            chunk (int): Number of samples grouped together
+                         default: 1024
+        '''
+        self.session = session
+        self.clock = clock
+        self.signal = np.frombuffer(session.audio, dtype=np.int16)
+        if session.channels > 1:
+            self.signal = self.signal.reshape(-1, session.channels)
+        super().__init__(chunk, session.rate, session.channels)
+
+    def _open_stream(self) -> None:
+        return None
+
+    def stream(self, time=.1):
+        '''
+        Update audio stream buffer with the audio the current frame analysed when it was recorded.
+
+        Args:
+            time (float): Length of audio stream buffer in seconds, used when the frame did no analysis
+                          default: 0.1
+        '''
+        frame = self.session.frames[self.clock.frame] if self.clock.frame < len(self.session.frames) else {}
+        if not frame.get('range'):
+            length = int(self.rate / self.chunk * time) * self.chunk
+            self.buffer = np.zeros((length, self.channels) if self.channels > 1 else length, dtype=np.int16)
+            self.buffer_range = None
+            return
+
+        start, end = frame['range']
+        self.buffer = self.signal[start:end]
+        self.buffer_range = (start, end)
@@ -0,0 +1,217 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+import pygame
+from audio.note_model import REFERENCE_NOTE
+from audio.scoring import SongTimeline
+
+def make_sound(track: np.ndarray, rate: int) -> pygame.mixer.Sound | None:
+    '''
+    Create a sound from a mono int16 track, initialising the mixer at the track's rate if it is not already.
+
+    Args:
+        track (ndarray): Mono int16 audio
+        rate (int): Sampling frequency of the track in Hz
+
+    Returns:
+        Sound | None: The sound, or None if there is no output device
+    '''
+    mixer_format = pygame.mixer.get_init()
+    try:
+        if mixer_format is None or mixer_format[:2] != (rate, -16):
+            pygame.mixer.quit()
+            pygame.mixer.init(frequency=rate, size=-16, channels=1)
+    except pygame.error:
+        return None
+
+    channels = pygame.mixer.get_init()[2]
+    track = track if channels == 1 else np.repeat(track[:, None], channels, axis=1)
+    return pygame.sndarray.make_sound(np.ascontiguousarray(track))
+
+class Synth:
+    '''
+    Additive synthesizer that plays notes one after another, each a sum of harmonics shaped by an ADSR envelope.
+
+    Every sample of every note is computed at once: each sample is tagged with its note and its time into the note,
+    and the harmonics and envelope are evaluated over those arrays, so rendering a song takes no Python loop over notes.
+    '''
+    def __init__(self,
+                 rate: int = 44_100,
+                 harmonics: tuple[float, ...] = (1.0, .5, .3, .15),
+                 attack: float = .01,
+                 decay: float = .1,
+                 sustain: float = .7,
+                 release: float = .1,
+                 volume: float = .3) -> None:
+        '''
+        Create a Synth instance.
+
+        Args:
+            rate (int): Sampling frequency in Hz
+                        default: 44,100
+            harmonics (tuple): Amplitude of each harmonic, starting from the fundamental
+                               default: (1.0, 0.5, 0.3, 0.15)
+            attack (float): Seconds a note takes to reach full volume
+                            default: 0.01
+            decay (float): Seconds a note then takes to fall to its sustain level
+                           default: 0.1
+            sustain (float): Volume a held note settles at, from 0 to 1
+                             default: 0.7
+            release (float): Seconds a note takes to fade out once it ends, overlapping the next note
+                             default: 0.1
+            volume (float): Peak amplitude of a note, from 0 to 1
+                            default: 0.3
+        '''
+        self.rate = rate
+        self.harmonics = np.asarray(harmonics, dtype=np.float64) / sum(harmonics)
+        self.attack = attack
+        self.decay = decay
+        self.sustain = sustain
+        self.release = release
+        self.volume = volume
+
+    def get_settings(self) -> dict[str, int | float | list[float]]:
+        '''
+        Get every setting that changes the audio rendered, e.g. to tell renders apart.
+        '''
+        return {
+            'rate': self.rate,
+            'harmonics': self.harmonics.tolist(),
+            'attack': self.attack,
+            'decay': self.decay,
+            'sustain': self.sustain,
+            'release': self.release,
+            'volume': self.volume
+        }
+
+    def _get_envelope(self, times: np.ndarray) -> np.ndarray:
+        '''
+        Get the volume of the attack, decay and sustain of a note, from the seconds since the note started.
+        '''
+        attack = times / self.attack
+        decay = 1 - (1 - self.sustain) * (times - self.attack) / self.decay
+        return np.where(times < self.attack, attack, np.maximum(decay, self.sustain))
+
+    def render(self, midi_numbers: np.ndarray, durations: np.ndarray) -> np.ndarray:
+        '''
+        Render notes played one after another.
+
+        Args:
+            midi_numbers (ndarray): MIDI number of each note, or -1 for a rest
+            durations (ndarray): Length of each note in seconds
+
+        Returns:
+            ndarray: Mono int16 audio, long enough for the release of the last note
+        '''
+        midi_numbers = np.asarray(midi_numbers)
+        starts = np.rint(np.cumsum(durations) * self.rate).astype(np.int64)
+        starts = np.concatenate(([0], starts[:-1]))
+        lengths = np.rint(np.asarray(durations) * self.rate).astype(np.int64)
+        track = np.zeros(starts[-1] + lengths[-1] + int(self.release * self.rate) if len(starts) else 0)
+
+        notes = np.flatnonzero(midi_numbers >= 0)
+        if not len(notes):
+            return track.astype(np.int16)
+        # Each note sounds for its length and then its release
+        sounding = lengths[notes] + int(self.release * self.rate)
+        note_of_sample = np.repeat(np.arange(len(notes)), sounding)
+        offsets = np.arange(len(note_of_sample)) - np.repeat(np.cumsum(sounding) - sounding, sounding)
+        times = offsets / self.rate
+
+        frequencies = 440 * 2 ** ((midi_numbers[notes] - REFERENCE_NOTE) / 12)
+        phases = 2 * np.pi * frequencies[note_of_sample] * times
+        wave = np.zeros(len(times))
+        for harmonic, amplitude in enumerate(self.harmonics, start=1):
+            wave += amplitude * np.sin(harmonic * phases)
+
+        # Held notes follow the envelope, and then fade linearly from wherever the envelope reached when they ended
+        note_lengths = (lengths[notes] / self.rate)[note_of_sample]
+        released = np.clip(1 - (times - note_lengths) / self.release, 0, 1) * self._get_envelope(note_lengths)
+        envelope = np.where(times < note_lengths, self._get_envelope(times), released)
+
+        np.add.at(track, starts[notes][note_of_sample] + offsets, wave * envelope)
+        return (np.clip(track * self.volume, -1, 1) * np.iinfo(np.int16).max).astype(np.int16)
+
+    def render_song(self, timeline: SongTimeline) -> np.ndarray:
+        '''
+        Render a song, with every note in the octave it is written in.
+
+        Args:
+            timeline (SongTimeline): The song
+
+        Returns:
+            ndarray: Mono int16 audio
+        '''
+        return self.render(timeline.midi_numbers, timeline.durations)
+
+class SynthCache:
+    '''
+    Songs rendered by a Synth, saved to disk so each song is only rendered once.
+
+    A render is found by a hash of the song file and the synth's settings, so editing a song or changing
+    the synth renders the song again rather than playing a stale render.
+    '''
+    def __init__(self, synth: Synth | None = None, directory: str = '.\\assets\\synth') -> None:
+        '''
+        Create a SynthCache instance.
+
+        Args:
+            synth (Synth): Synth to render songs with
+                           default: None, a Synth with its default settings
+            directory (str): Directory to save renders to. Created if it does not exist.
+                             default: '.\\assets\\synth'
+        '''
+        self.synth = synth or Synth()
+        self.directory = directory
+        self.lock = threading.Lock()
+
+    def get_key(self, path: str) -> str:
+        '''
+        Get the hash of a song file and the synth's settings that its render is saved under.
+        '''
+        with open(path, 'rb') as file:
+            song_hash = hashlib.sha256(file.read())
+        song_hash.update(json.dumps(self.synth.get_settings(), sort_keys=True).encode())
+        return song_hash.hexdigest()
+
+    def load(self, path: str) -> np.ndarray | None:
+        '''
+        Get the render of a song if it has been rendered before, without rendering it.
+
+        Args:
+            path (str): Location of the song file
+
+        Returns:
+            ndarray | None: Mono int16 audio at the synth's rate, or None if the song has not been rendered
+        '''
+        try:
+            return np.load(os.path.join(self.directory, self.get_key(path) + '.npy'))
+        except (OSError, ValueError):
+            return None
+
+    def get(self, path: str) -> np.ndarray:
+        '''
+        Get the render of a song, rendering and saving it if it has not been rendered before.
+
+        Args:
+            path (str): Location of the song file
+
+        Returns:
+            ndarray: Mono int16 audio at the synth's rate
+        '''
+        render_path = os.path.join(self.directory, self.get_key(path) + '.npy')
+        with self.lock:
+            track = self.load(path)
+            if track is not None:
+                return track
+
+            track = self.synth.render_song(SongTimeline.from_file(path))
+            os.makedirs(self.directory, exist_ok=True)
+            # Write to a temporary file and rename it over any old render so a render is never left half written
+            temp_path = render_path + '.tmp'
+            with open(temp_path, 'wb') as file:
+                np.save(file, track)
+            os.replace(temp_path, render_path)
+            return track
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+'''
+Grade a directory of recorded performances against a song, without a window or microphone.
+
+Usage:
+    python grade.py "Ode to Joy - Easy" .\\assignments
+    python grade.py "Ode to Joy - Easy" .\\assignments --output results.json --offset 3.3 --workers 8
+
+Every Wave file in the directory is graded in a pool of worker processes. Results are written as each recording
+finishes, as CSV or as JSON depending on the output file's extension, or as CSV to stdout without --output.
+'''
+import os
+import sys
+import csv
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, TextIO
+from audio.audio_manager import FFT_BACKENDS
+from audio.grading import RecordingGrader
+from audio.song_catalog import SongCatalog
+
+CSV_FIELDS = ('recording', 'song_name', 'score', 'song_length', 'accuracy', 'error')
+
+# Each worker process builds its grader once, rather than compiling the song for every recording
+grader: RecordingGrader | None = None
+
+def _initialise_worker(song_path: str, notes: dict[str, list[int]] | None, offset: float, fft_backend: str) -> None:
+    global grader
+    grader = RecordingGrader(song_path, notes, offset, fft_backend=fft_backend)
+
+def _grade(path: str) -> dict[str, Any]:
+    try:
+        return grader.grade(path)
+    except Exception as error:
+        # A broken recording should not stop the rest from being graded
+        return {'recording': path, 'error': f'{error.__class__.__name__}: {error}'}
+
+class ResultWriter:
+    '''
+    Writes results one at a time, so they can be read while grading is still running.
+    '''
+    def __init__(self, file: TextIO, format: str) -> None:
+        '''
+        Args:
+            file (TextIO): File to write to
+            format (str): 'csv' for one row per recording, or 'json' for a list of the full results
+        '''
+        self.file = file
+        self.format = format
+        self.count = 0
+        if format == 'csv':
+            self.csv_writer = csv.DictWriter(file, CSV_FIELDS, extrasaction='ignore')
+            self.csv_writer.writeheader()
+        else:
+            file.write('[')
+
+    def write(self, result: dict[str, Any]) -> None:
+        if self.format == 'csv':
+            self.csv_writer.writerow(result)
+        else:
+            separator = ',\n' if self.count else '\n'
+            self.file.write(separator + json.dumps(result))
+        self.count += 1
+        self.file.flush()
+
+    def close(self) -> None:
+        if self.format == 'json':
+            self.file.write('\n]\n')
+        self.file.flush()
+
+def grade_directory(song_path: str, directory: str, writer: ResultWriter, notes: dict[str, list[int]] | None = None, offset: float = 0.0, workers: int | None = None, fft_backend: str = 'scipy') -> int:
+    '''
+    Grade every Wave file in a directory, writing each result as it finishes.
+
+    Args:
+        song_path (str): Location of the song file
+        directory (str): Directory of recordings
+        writer (ResultWriter): Where to write the results
+        notes (dict): Calibrated note frequencies, in the format of `Application.notes`
+                      default: None, use the uncalibrated frequencies
+        offset (float): Seconds into each recording at which the first note is played
+                        default: 0.0
+        workers (int): Number of worker processes
+                       default: None, one per CPU
+        fft_backend (str): Library that computes the FFT of each frame, one of `FFT_BACKENDS`
+                           default: 'scipy'
+
+    Returns:
+        int: Number of recordings graded
+    '''
+    paths = sorted(
+        entry.path for entry in os.scandir(directory) if entry.is_file() and entry.name.lower().endswith('.wav')
+    )
+    with ProcessPoolExecutor(workers, initializer=_initialise_worker, initargs=(song_path, notes, offset, fft_backend)) as executor:
+        for future in as_completed([executor.submit(_grade, path) for path in paths]):
+            writer.write(future.result())
+    return len(paths)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Grade a directory of recorded performances against a song.')
+    parser.add_argument('song', help='File name of the song without its extension, e.g. "Ode to Joy - Easy"')
+    parser.add_argument('directory', help='Directory of Wave files to grade')
+    parser.add_argument('--output', help='File to write the results to, as JSON if it ends in .json and CSV otherwise')
+    parser.add_argument('--offset', type=float, default=0.0, help='Seconds into each recording at which the first note is played')
+    parser.add_argument('--notes', help='JSON file of calibrated note frequencies, such as the session.json of a recording')
+    parser.add_argument('--workers', type=int, help='Number of worker processes, one per CPU by default')
+    parser.add_argument('--fft-backend', choices=FFT_BACKENDS, default='scipy', help='Library that computes the FFTs, see headless.py --benchmark')
+    arguments = parser.parse_args()
+
+    song_catalog = SongCatalog()
+    song_catalog.refresh()
+    song = song_catalog.get_song(arguments.song)
+    if not song:
+        parser.error(f'song {arguments.song} does not exist')
+
+    notes = None
+    if arguments.notes:
+        with open(arguments.notes, 'r') as file:
+            notes = json.load(file)
+        # Recorded sessions keep their calibration alongside other details
+        notes = notes.get('notes', notes)
+
+    output_file = open(arguments.output, 'w', newline='') if arguments.output else sys.stdout
+    output_format = 'json' if arguments.output and arguments.output.lower().endswith('.json') else 'csv'
+    writer = ResultWriter(output_file, output_format)
+    try:
+        grade_directory(song['path'], arguments.directory, writer, notes, arguments.offset, arguments.workers, arguments.fft_backend)
+    finally:
+        writer.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+'''
+Run a song through the performance loop without a window or microphone, as fast as the CPU allows.
+
+Usage:
+    python headless.py "Ode to Joy - Easy"
+    python headless.py "Ode to Joy - Easy" --input recording.wav --render
+    python headless.py "Ode to Joy - Easy" --players 4
+    python headless.py "Ode to Joy - Easy" --parts "Megolovania - Hard"
+    python headless.py "Ode to Joy - Easy" --octaves
+    python headless.py "Ode to Joy - Easy" --analysis-rate 15
+    python headless.py "Ode to Joy - Easy" --metronome
+    python headless.py --replay ".\\assets\\recordings\\20231201-120000 - Ode to Joy"
+    python headless.py --benchmark
+
+Prints the score, accuracy breakdown and time spent in each stage of the performance loop as JSON.
+Users, scores, calibration and synth renders are kept in a temporary directory, so a run neither depends on nor changes
+the saved data.
+Without --input, a synthesized player who always plays the expected note is used, or one for each of --players,
+with the players after the first playing each of --parts instead of the song.
+With --octaves, notes are scored by MIDI number, so they must be played in the right octave.
+With --metronome, the click track is played, then played again through SDL's disk audio driver, and each click in what
+the mixer output is checked against its beat.
+With --replay, a recorded session is played back frame by frame and checked against its recording.
+With --benchmark, the throughput of the pitch detection with each FFT backend is measured instead.
+'''
+import os
+import json
+import time
+import argparse
+import tempfile
+from typing import Any, Callable
+import numpy as np
+from scipy.signal import correlate
+
+# Keep stdout clean for the JSON results, which needs setting before pygame is first imported
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+import pygame
+from application import Application
+from audio.audio_manager import FFT_BACKENDS
+from audio.ensemble import Ensemble
+from audio.grading import RecordingAnalyser, load_recording
+from audio.metronome import Metronome
+from audio.synth import Synth
+from audio.recorder import ReplaySession
+from audio.sources import ReferenceSource, ReplaySource, SignalSource
+
+class SimulatedClock:
+    '''
+    Drop-in replacement for pygame.time.Clock that advances by exactly one frame per tick without waiting.
+    '''
+    def __init__(self) -> None:
+        self.time = 0.0
+        self.frame_time = 0.0
+
+    def tick(self, framerate: int = 0) -> int:
+        '''
+        Advance the clock by one frame.
+
+        Args:
+            framerate (int): Frames per second the loop is running at. When 0 the clock does not advance.
+
+        Returns:
+            int: Milliseconds passed since the previous tick
+        '''
+        self.frame_time = 1000 / framerate if framerate else 0.0
+        self.time += self.frame_time
+        return round(self.frame_time)
+
+    def get_time(self) -> int:
+        return round(self.frame_time)
+
+    def get_ticks(self) -> float:
+        '''
+        Get the simulated time in milliseconds since the clock was created.
+        '''
+        return self.time
+
+    def get_fps(self) -> float:
+        return 1000 / self.frame_time if self.frame_time else 0.0
+
+class ReplayClock(SimulatedClock):
+    '''
+    Clock that replays the frame times of a recorded session.
+    '''
+    def __init__(self, frames: list[dict[str, Any]]) -> None:
+        super().__init__()
+        self.frames = frames
+        # Index of the current frame, which starts on the first tick
+        self.frame = -1
+
+    def tick(self, framerate: int = 0) -> int:
+        self.frame += 1
+        if self.frame < len(self.frames):
+            self.frame_time = self.frames[self.frame]['ms']
+        else:
+            self.frame_time = 1000 / framerate if framerate else 0.0
+        self.time += self.frame_time
+        return round(self.frame_time)
+
+def run(song_name: str, input_path: str | None = None, render: bool = False, players: int = 1, parts: list[str] | None = None, octave_aware: bool = False, analysis_rate: int | None = None, metronome: bool = False) -> dict[str, Any]:
+    '''
+    Run a performance of a song headlessly.
+
+    Args:
+        song_name (str): File name of the song without its extension, e.g. 'Ode to Joy - Easy'
+        input_path (str): Wave file to use as the microphone input
+                          default: None, use a synthesized player
+        render (bool): Whether to render each frame to the dummy display
+                       default: False
+        players (int): Number of synthesized players, each with their own input
+                       default: 1
+        parts (list): File names of the songs played by the players after the first, who otherwise play the song
+                      default: None
+        octave_aware (bool): Whether notes must be played in the right octave
+                             default: False
+        analysis_rate (int): Most times a second the audio is analysed
+                             default: None, use `Performance.analysis_rate`
+        metronome (bool): Whether to play the click track, and measure its timing under 'metronome'
+                          default: False
+
+    Returns:
+        dict: The performance results, in the format of `Application.performance_results`
+    '''
+    parts = parts or []
+    clock = SimulatedClock()
+    if input_path:
+        rate, signal = load_recording(input_path)
+        sources = [SignalSource(signal, clock, rate=rate)]
+    else:
+        sources = [ReferenceSource({}) for _ in range(max(players, len(parts) + 1))]
+
+    application = Application(headless=True, audio=sources[0], clock=clock)
+    application.octave_aware = octave_aware
+    application.play_metronome = metronome
+    if len(sources) > 1:
+        application.ensemble = Ensemble([(source, 0) for source in sources])
+    performance = application.screens['performance']
+    performance.render_enabled = render
+    if analysis_rate:
+        performance.analysis_rate = analysis_rate
+    for number, source in enumerate(sources):
+        if isinstance(source, ReferenceSource):
+            source.notes = application.notes
+            source.get_note = lambda number=number: performance.players[number]['current_note']
+
+    application.song_catalog.refresh()
+    song, *part_songs = [application.song_catalog.get_song(name) for name in [song_name, *parts]]
+    for name, entry in zip([song_name, *parts], [song, *part_songs]):
+        if not entry:
+            raise KeyError(f'Song {name} does not exist.')
+    application.parts = [(part['name'], part['difficulty'], part['path']) for part in part_songs]
+
+    application.set_song((song['name'], song['difficulty'], song['path']))
+    application.set_screen('performance')
+    if metronome:
+        return application.performance_results | {'metronome': measure_metronome(performance.metronome)}
+    return application.performance_results
+
+def capture_mixer_output(play: Callable[[], None]) -> np.ndarray:
+    '''
+    Play audio through SDL's disk audio driver, which writes everything the mixer outputs to a file as fast as it can
+    be mixed, and read back what was played.
+
+    Args:
+        play (Callable): Function that starts the audio playing, e.g. `Metronome.play`
+
+    Returns:
+        ndarray: Mono int16 audio the mixer output, from when it opened until the audio finished, or nothing if it did not open
+    '''
+    pygame.mixer.quit()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'mixer.raw')
+        os.environ.update({'SDL_AUDIODRIVER': 'disk', 'SDL_DISKAUDIOFILE': path, 'SDL_DISKAUDIODELAY': '0'})
+        try:
+            play()
+            channels = pygame.mixer.get_init()[2] if pygame.mixer.get_init() else 1
+            while pygame.mixer.get_init() and pygame.mixer.get_busy():
+                time.sleep(.001)
+        finally:
+            pygame.mixer.quit()
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        output = np.fromfile(path, dtype=np.int16) if os.path.exists(path) else np.zeros(0, dtype=np.int16)
+    return output[:len(output) // channels * channels].reshape(-1, channels)[:, 0]
+
+def measure_metronome(metronome: Metronome) -> dict[str, Any]:
+    '''
+    Play a metronome's click track again, capture what the mixer outputs, and measure how far each click in it is from its beat.
+    The output is lined up with song time where the rendered track matches it best, so a click the mixer plays late
+    or drops shows up as jitter or a missing beat.
+
+    Args:
+        metronome (Metronome): A metronome that has played
+
+    Returns:
+        dict: 'clicks', the number of clicks found, 'missing', the number of beats without a click, and 'max_jitter_ms'
+              and 'mean_jitter_ms', the largest and mean distance of a click from its beat in milliseconds
+    '''
+    start, end = metronome.start_time, metronome.start_time + len(metronome.track) / metronome.rate
+    beats, _ = metronome.get_beats(start, end)
+    def play() -> None:
+        metronome.prepare(start, end)
+        metronome.play()
+    output = capture_mixer_output(play)
+    if len(output) < len(metronome.track) or not len(metronome.track):
+        return {'clicks': 0, 'missing': len(beats), 'max_jitter_ms': None, 'mean_jitter_ms': None}
+    matches = correlate(output.astype(np.float32), metronome.track.astype(np.float32), mode='valid', method='fft')
+    lag = int(np.argmax(matches))
+    output = output[lag:lag + len(metronome.track)]
+
+    # A click starts at the first loud sample after at least a click's length of quiet
+    click_length = len(metronome.clicks['beat'])
+    loud = np.flatnonzero(np.abs(output.astype(np.int32)) > np.iinfo(np.int16).max * .1)
+    onsets = loud[np.diff(loud, prepend=-click_length - 1) > click_length] / metronome.rate + start
+
+    # Each click belongs to the nearest beat
+    nearest_beats = np.rint(onsets / metronome.seconds_per_beat) * metronome.seconds_per_beat
+    jitter = np.abs(onsets - nearest_beats) * 1000
+    return {
+        'clicks': len(onsets),
+        'missing': len(beats) - len(np.unique(nearest_beats)),
+        'max_jitter_ms': round(float(jitter.max()), 3) if len(jitter) else None,
+        'mean_jitter_ms': round(float(jitter.mean()), 3) if len(jitter) else None
+    }
+
+def replay(directory: str, render: bool = False) -> dict[str, Any]:
+    '''
+    Replay a recorded session through the performance loop.
+
+    Args:
+        directory (str): Directory the session was recorded to
+        render (bool): Whether to render each frame to the dummy display
+                       default: False
+
+    Returns:
+        dict: The performance results, with 'replay_matches' set to whether every frame and note event matched the recording
+    '''
+    session = ReplaySession(directory)
+    clock = ReplayClock(session.frames)
+    application = Application(headless=True, audio=ReplaySource(session, clock), clock=clock)
+    performance = application.screens['performance']
+    performance.render_enabled = render
+    performance.clock_speed = session.header['clock_speed']
+    performance.analysis_rate = session.header.get('analysis_rate', performance.analysis_rate)
+    application.notes = session.header['notes']
+    application.compile_notes()
+    application.octave_aware = session.header.get('octave_aware', False)
+    application.parts = [tuple(part) for part in session.header.get('parts', [])]
+
+    application.set_song(tuple(session.header['song']))
+    application.set_screen('performance')
+    application.performance_results['replay_matches'] = performance.event_log == session.events
+    return application.performance_results
+
+def benchmark(seconds: float = 10.0) -> list[dict[str, Any]]:
+    '''
+    Measure how fast the dominant frequencies of a signal are found with each FFT backend,
+    and with scipy using one thread per CPU, so the fastest can be chosen for the machine.
+
+    Args:
+        seconds (float): Length of the signal analysed
+                         default: 10.0
+
+    Returns:
+        list: For each backend, 'backend', 'workers', 'frames_per_second', and 'realtime', the seconds of audio analysed per second
+    '''
+    rate = 44_100
+    # A chromatic scale of half second notes from the song synthesizer, so the signal has harmonics and note changes
+    melody = np.resize(np.arange(60, 73), int(seconds * 2))
+    signal = Synth(rate=rate).render(melody, np.full(len(melody), .5))[:int(seconds * rate)]
+    noise = np.random.default_rng(0).normal(0, 500, len(signal))
+    signal = np.clip(signal + noise, -32768, 32767).astype(np.int16)
+
+    configurations = [(backend, None) for backend in FFT_BACKENDS]
+    if (os.cpu_count() or 1) > 1:
+        configurations.append(('scipy', os.cpu_count()))
+
+    results = []
+    for backend, workers in configurations:
+        analyser = RecordingAnalyser(rate=rate, fft_backend=backend, fft_workers=workers)
+        # Allocate the buffers before timing
+        analyser.get_frame_frequencies(signal[:rate])
+        start = time.perf_counter()
+        frames = len(analyser.get_frame_frequencies(signal))
+        duration = time.perf_counter() - start
+        results.append({
+            'backend': backend,
+            'workers': workers or 1,
+            'frames_per_second': round(frames / duration),
+            'realtime': round(seconds / duration, 1)
+        })
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Run a song through the performance loop without a window or microphone.')
+    parser.add_argument('song', nargs='?', help='File name of the song without its extension, e.g. "Ode to Joy - Easy"')
+    parser.add_argument('--input', help='Wave file to use as the microphone input instead of a synthesized player')
+    parser.add_argument('--replay', help='Directory of a recorded session to replay instead of playing a song')
+    parser.add_argument('--render', action='store_true', help='Render each frame to the dummy display')
+    parser.add_argument('--benchmark', action='store_true', help='Measure the throughput of each FFT backend instead of playing a song')
+    parser.add_argument('--players', type=int, default=1, help='Number of synthesized players, each with their own input')
+    parser.add_argument('--parts', nargs='+', default=[], help='Songs played by the players after the first')
+    parser.add_argument('--octaves', action='store_true', help='Score notes by MIDI number, so they must be played in the right octave')
+    parser.add_argument('--analysis-rate', type=int, help='Most times a second the audio is analysed')
+    parser.add_argument('--metronome', action='store_true', help='Play the click track and measure how far each click the mixer outputs is from its beat')
+    arguments = parser.parse_args()
+    if arguments.benchmark:
+        print(json.dumps(benchmark(), indent=4))
+        return
+    if not arguments.song and not arguments.replay:
+        parser.error('either a song, --replay or --benchmark is required')
+
+    if arguments.replay:
+        results = replay(arguments.replay, arguments.render)
+    else:
+        results = run(arguments.song, arguments.input, arguments.render, arguments.players, arguments.parts, arguments.octaves, arguments.analysis_rate, arguments.metronome)
+
+    keys = ('song_name', 'score', 'accuracy', 'accuracy_breakdown', 'stage_timings', 'analysis_count', 'metronome', 'replay_matches')
+    output = {key: results[key] for key in keys if key in results}
+    if 'ensemble' in results:
+        output['ensemble'] = [
+            {key: player[key] for key in ('song_name', 'score', 'song_length', 'accuracy')} for player in results['ensemble']
+        ]
+    print(json.dumps(output, indent=4))
+
+if __name__ == '__main__':
+    main()
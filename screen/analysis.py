@@ -1,8 +1,7 @@
 from __future__ import annotations
-from math import ceil
-
-import pygame
+import numpy as np
 from screen.screen import BaseScreen
+from ui.accuracy_graph import AccuracyGraph
 from ui.button import Button
 from user.user import User
 
@@ -13,8 +12,14 @@ if TYPE_CHECKING:
 class Analysis(BaseScreen):
     def __init__(self, application: Application):
         super().__init__(application)
+        self.graph = AccuracyGraph(application)
 
-    def update_user(self) -> None:
+    async def update_user(self) -> None:
+        '''
+        Save the performance to the user's high scores, the leaderboard and their history. The leaderboard and history
+        are written on the persistence executor, and are read back once written to show the leaderboard and past sessions.
+        '''
+        self.past_breakdowns = []
         if not self.application.user.logged_in:
             return
         
@@ -24,6 +29,22 @@ class Analysis(BaseScreen):
         self.user_data[self.song_name] = max(self.accuracy, highscore)
         self.application.user.save(self.user_data)
 
+        await self.application.persist(
+            self.application.leaderboard.update, self.song_name, self.application.user.get_username(), self.accuracy
+        )
+        session_id = await self.application.persist(
+            self.application.performance_history.record,
+            self.application.user.get_username(), 
+            self.application.performance_results
+        )
+
+        # The accuracy breakdowns of the sessions before this one, to compare against on the graph
+        for hits in self.application.performance_history.get_recent_hits(
+            self.application.user.get_username(), self.song_name, before=session_id
+        ):
+            if hits:
+                self.past_breakdowns.append(np.round(100 * np.cumsum(hits) / np.arange(1, len(hits) + 1)).astype(int).tolist())
+
     def add_buttons(self) -> None:
         '''
         Clears existing buttons and adds the options menu buttons to the screen_buttons list.
@@ -61,60 +82,42 @@ class Analysis(BaseScreen):
             highscore_text = self.application.get_font(40).render(f'High score: {self.user_data[self.song_name]}%', True, (0, 0, 0))
             self.application.screen.blit(highscore_text, (25, 210))
 
+        if self.ensemble:
+            self.render_ensemble_results()
+        else:
+            self.render_leaderboard()
+
         self.render_performance_graph()
 
+    def render_leaderboard(self) -> None:
+        leaderboard = self.application.leaderboard.get_top(self.song_name)
+        if not leaderboard:
+            return
+
+        leaderboard_text = self.application.get_font(40).render('Leaderboard', True, (0, 0, 0))
+        self.application.screen.blit(leaderboard_text, (25, 270))
+        for i, (username, score) in enumerate(leaderboard):
+            text = self.application.get_font(30).render(f'{i + 1}. {username} - {score}%', True, (0, 0, 0))
+            self.application.screen.blit(text, (25, 315 + (i * 35)))
+
+    def render_ensemble_results(self) -> None:
+        ensemble_text = self.application.get_font(40).render('Ensemble', True, (0, 0, 0))
+        self.application.screen.blit(ensemble_text, (25, 270))
+        for i, player in enumerate(self.ensemble):
+            text = self.application.get_font(30).render(f'P{i + 1}. {player["song_name"]} - {player["accuracy"]}%', True, (0, 0, 0))
+            self.application.screen.blit(text, (25, 315 + (i * 35)))
+
+        # Accuracy of the group across every part's notes
+        total_score = sum(player['score'] for player in self.ensemble)
+        total_length = sum(player['song_length'] for player in self.ensemble)
+        combined_accuracy = round(100 * total_score / total_length) if total_length else 0
+        combined_text = self.application.get_font(30).render(f'Together: {combined_accuracy}%', True, (0, 0, 0))
+        self.application.screen.blit(combined_text, (25, 325 + (len(self.ensemble) * 35)))
+
     def render_performance_graph(self) -> None:
         if self.score <= 1:
             return
-        
-        # Draw graph Y and X axis
-        pygame.draw.line(self.application.screen, (0, 0, 0), (640, 125), (640, 625), 4) # Y-axis
-        pygame.draw.line(self.application.screen, (0, 0, 0), (640, 625), (1140, 625), 4) # X-axis
-
-        # Create a translucent underlay under the graph area to obscure potentially distracting background image
-        graph_underlay = pygame.Surface((498, 499))
-        graph_underlay.set_alpha(200)
-        graph_underlay.fill(self.application.BACKGROUND_COLOR)
-        self.application.screen.blit(graph_underlay, (643, 125))
-
-        # Convert x and y value to x and y on-screen coordinates
-        # Ceiling of: (origin_y - offset) - ((length of axis / range of percents) * i)
-        y = lambda k: int(ceil((625 - 10) - (((500 / (100 - min_percent)) * (k - min_percent)))))
-        # Ceiling of: (origin_x) + ((total length of axis - text height / range of percents) * i)
-        x = lambda k: int(ceil((640 - 5) + (((500 / (self.song_length - 1)) * k))))
-
-        min_percent = int(min(self.accuracy_breakdown) * .1) * 10
-        # Prevent axis from having only one value on it
-        if min_percent == 100:
-            min_percent = 90 
-
-        # Calculate positions of and display graph y-axis label text
-        for i in range(0, (100 - min_percent) + 10, 10): 
-            text = self.application.get_font(20).render(f'{i + min_percent}%', True, (0, 0, 0))
-            self.application.screen.blit(text, (590, y(i + min_percent))) 
-
-        # Calculate positions of and display graph x-axis label text
-        x_positions = []
-        for i in range(self.song_length): 
-            if i == 0 or self.song_length <= 20 or i == self.song_length - 1: 
-                text = self.application.get_font(20).render(str(i + 1), True, (0, 0, 0))
-                self.application.screen.blit(text, (x(i), 640))
-            x_positions.append(x(i) + 6)
-
-        # Label text for axes 
-        y_label = self.application.get_font(30).render('Accuracy', True, (0, 0, 0))
-        self.application.screen.blit(y_label, (450, 350))
-        x_label = self.application.get_font(30).render('Note count', True, (0, 0, 0))
-        self.application.screen.blit(x_label, (830, 660))
-
-        # Plot points
-        percents = [y(percent) + 10 for percent in self.accuracy_breakdown]   
-        last_point = None
-        for point in zip(x_positions, percents):
-            if last_point:
-                pygame.draw.aaline(self.application.screen, (0, 0, 0), point, last_point, 4)
-            last_point = point
-            pygame.draw.circle(self.application.screen, (255, 0, 0), point, 4)            
+        self.graph.render(self.accuracy_breakdown, self.past_breakdowns)
 
     def load_performance_results(self) -> None:
         self.song_name: str = self.application.performance_results.get('song_name', 'Undefined')
@@ -122,10 +125,14 @@ class Analysis(BaseScreen):
         self.score: int = self.application.performance_results.get('score', 0)
         self.accuracy: int = self.application.performance_results.get('accuracy', 0)
         self.accuracy_breakdown: list[int] = self.application.performance_results.get('accuracy_breakdown', [])
+        self.ensemble: list[dict] = self.application.performance_results.get('ensemble', [])
 
     def setup(self) -> None:
         self.application.clear_screen()
-        self.load_performance_results()
-        self.update_user()
         self.render_static_elements() 
-        self.add_buttons()
\ No newline at end of file
+        self.add_buttons()
+
+    async def run(self) -> None:
+        self.load_performance_results()
+        await self.update_user()
+        await super().run()
\ No newline at end of file
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import asyncio
 import numpy as np
 import pygame
 from screen.screen import BaseScreen
@@ -8,51 +9,108 @@ if TYPE_CHECKING:
     from application import Application
 
 class Calibrate(BaseScreen):
+    # Dominant frequencies are counted in a histogram of 10 cent bins from 50Hz upwards, covering six and a half octaves
+    MINIMUM_FREQUENCY = 50
+    BINS_PER_OCTAVE = 120
+    HISTOGRAM_SIZE = 780
+    # A note is calibrated once this share of its frequencies fall in the most common bin or either side of it,
+    # judged over at least MINIMUM_BUFFERS buffers of sound. Notes that never settle are calibrated after MAXIMUM_BUFFERS.
+    CONFIDENCE = .6
+    MINIMUM_BUFFERS = 5
+    MAXIMUM_BUFFERS = 40
+
     def __init__(self, application: Application):
         super().__init__(application)
         self.current_note = None
+        self.confidence = 0.0
+
+    async def _run_audio_stream(self) -> None:
+        # Each buffer is analysed by the calibration loop as it arrives
+        async for _ in self.application.capture(self.application.audio.stream):
+            pass
+
+    def get_histogram_bins(self, frequencies: np.ndarray) -> np.ndarray:
+        '''
+        Find the histogram bin of each frequency, leaving out silence and frequencies outside the histogram.
+        '''
+        frequencies = frequencies[frequencies > 1]
+        bins = np.round(self.BINS_PER_OCTAVE * np.log2(frequencies / self.MINIMUM_FREQUENCY)).astype(np.int64)
+        return bins[(bins >= 0) & (bins < self.HISTOGRAM_SIZE)]
+
+    @staticmethod
+    def get_peak(histogram: np.ndarray) -> tuple[slice, float]:
+        '''
+        Find the most common bin of a histogram and either side of it, and the share of all counts that fall within them.
+        '''
+        peak = int(np.argmax(histogram))
+        peak_bins = slice(max(peak - 1, 0), peak + 2)
+        total = histogram.sum()
+        return peak_bins, float(histogram[peak_bins].sum() / total) if total else 0.0
+
+    def get_calibrated_frequencies(self, histogram: np.ndarray) -> list[int]:
+        '''
+        Convert the peak of a note's histogram into the frequencies it will be recognised by.
+        '''
+        peak_bins, _ = self.get_peak(histogram)
+        bins = np.arange(self.HISTOGRAM_SIZE)[peak_bins]
+        bins = bins[histogram[bins] > 0]
+        return sorted({round(self.MINIMUM_FREQUENCY * 2 ** (bin / self.BINS_PER_OCTAVE)) for bin in bins})
+
+    async def calibrate_note(self) -> bool:
+        '''
+        Listen to the current note until it has been heard consistently enough to calibrate.
+        The audio is streamed on the capture executor, so the screen keeps responding while each buffer is recorded.
+
+        Returns:
+            bool: Whether the note was calibrated, rather than calibration being cancelled
+        '''
+        histogram = np.zeros(self.HISTOGRAM_SIZE, dtype=np.int64)
+        buffers = 0
+        last_buffer = self.application.audio.buffer
+        self.confidence = 0.0
+        current_frequencies = None
+        while True:
+            await self.application.next_frame(60)
+
+            # Analyse each buffer once, as soon as it has been recorded
+            if self.application.audio.buffer is not last_buffer:
+                last_buffer = self.application.audio.buffer
+                current_frequencies = self.application.audio.get_dominant_frequencies()
+                bins = self.get_histogram_bins(current_frequencies)
+                if len(bins):
+                    histogram += np.bincount(bins, minlength=self.HISTOGRAM_SIZE)
+                    buffers += 1
+                    _, self.confidence = self.get_peak(histogram)
+
+                if (buffers >= self.MINIMUM_BUFFERS and self.confidence >= self.CONFIDENCE) or buffers >= self.MAXIMUM_BUFFERS:
+                    self.application.notes[self.current_note] = self.get_calibrated_frequencies(histogram)
+                    return True
+
+            self.render_static_elements()
+            self.render_dynamic_elements(current_frequencies=current_frequencies)
+
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.application.quit()
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        return False
+
+            pygame.display.flip()
+
+    async def run(self) -> None:
+        stream_task = asyncio.create_task(self._run_audio_stream())
+        try:
+            for self.current_note in self.application.notes:
+                if not await self.calibrate_note():
+                    # Go back to the saved calibration
+                    self.application.load_calibration()
+                    break
+            else:
+                self.application.save_calibration()
+        finally:
+            stream_task.cancel()
 
-    def run_calibration(self) -> None:
-        for self.current_note in self.application.notes:
-            tick = 0
-            buffering = True
-            buffer = {}
-            while buffering:
-                self.render_static_elements()
-
-                self.application.clock.tick(60)
-                tick += 1
-
-                if tick < 40:
-                    self.application.audio.stream()
-                    current_frequencies = self.application.audio.get_dominant_frequencies()
-                    self.render_dynamic_elements(current_frequencies=current_frequencies)
-
-                    # Creates a dictionary of how many times each dominant frequency appears in the timeframe
-                    for frequency in current_frequencies:
-                        if frequency > 1:
-                            buffer[int(frequency)] = buffer.get(int(frequency), 0) + 1
-                else:
-                    buffering = False
-                    # Extract top 3 most frequent frequencies
-                    sorted_buffer = dict(sorted(buffer.items(), key=lambda item: item[1], reverse=True)) # {667.0: 9, 668.0: 7, 665.0: 7, 671.0: 7, 654.0: 6, 673.0: 5, ...}
-                    top_3_occurances = list(sorted(set(sorted_buffer.values()), reverse=True))[:3] # [9, 7, 6]
-
-                    self.application.notes[self.current_note] = [
-                        frequency for frequency, occurences in sorted_buffer.items() if occurences in top_3_occurances
-                    ]
-                    
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        self.application.quit()
-                    if event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_ESCAPE:
-                            self.application.reset_notes()
-                            self.application.set_screen('options')
-                            return
-                
-                pygame.display.flip()
-        
         self.application.set_screen('options')
 
     def render_static_elements(self) -> None:
@@ -81,6 +139,6 @@ class Calibrate(BaseScreen):
             current_mic_note = self.application.audio.get_note_from_frequency(self.application.notes, current_frequencies)
             note = self.application.get_font(30).render(f'Frequency: {average_frequency:03d}Hz (closest standard note {current_mic_note})', True, (0, 0, 0))
             self.application.screen.blit(note, (10, 675))
-    
-    def setup(self) -> None:
-        self.run_calibration()
\ No newline at end of file
+
+        confidence_text = self.application.get_font(30).render(f'Confidence: {round(100 * self.confidence)}%', True, (0, 0, 0))
+        self.application.screen.blit(confidence_text, (10, 635))
\ No newline at end of file
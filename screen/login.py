@@ -20,9 +20,11 @@ class Login(BaseScreen):
             self.password_field.get_value()
         )
         if not self.user_input_error:
+            self.application.load_calibration()
             self.application.set_screen('options')
         else:
             self.render_static_elements()
+            self.application.invalidate_widgets()
 
     def create_account(self) -> None:
         self.user_input_error = self.application.user.create(
@@ -33,6 +35,7 @@ class Login(BaseScreen):
             self.application.set_screen('options')
         else:
             self.render_static_elements()
+            self.application.invalidate_widgets()
 
     def add_buttons(self) -> None:
         self.application.screen_buttons = []
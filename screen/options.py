@@ -1,4 +1,5 @@
 from __future__ import annotations
+import asyncio
 from screen.screen import BaseScreen
 from ui.button import Button
 from user.user import User
@@ -10,15 +11,47 @@ if TYPE_CHECKING:
 class Options(BaseScreen):
     def __init__(self, application: Application):
         super().__init__(application)
+        # Task reopening the microphone for a new number of players, if one has been started
+        self.players_task: asyncio.Task | None = None
 
     def sign_out(self) -> None:
-        self.application.user = User()
+        # The signed out user's unsaved changes are written in the background
+        self.application.persist(self.application.user.flush)
+        self.application.user = User(self.application.user_store)
+        self.application.load_calibration()
         self.setup()
 
     def delete_account(self) -> None:
+        self.application.leaderboard.remove_user(self.application.user.get_username())
+        self.application.persist(self.application.performance_history.remove_user, self.application.user.get_username())
         self.application.user.remove()
         self.sign_out()
 
+    def toggle_recording(self) -> None:
+        self.application.record_sessions = not self.application.record_sessions
+        self.setup()
+
+    def toggle_octaves(self) -> None:
+        self.application.octave_aware = not self.application.octave_aware
+        self.setup()
+
+    def toggle_metronome(self) -> None:
+        self.application.play_metronome = not self.application.play_metronome
+        self.setup()
+
+    def change_players(self) -> None:
+        # A click while the microphone is still being reopened is ignored
+        if self.players_task and not self.players_task.done():
+            return
+        self.players_task = asyncio.create_task(self._change_players())
+
+    async def _change_players(self) -> None:
+        # Cycle through one to four players
+        await self.application.set_players(len(self.application.ensemble) % 4 + 1)
+        # The screen may have been left while the microphone was reopened
+        if self.application.current_screen is self:
+            self.setup()
+
     def add_buttons(self) -> None:
         '''
         Clears existing buttons and adds the options menu buttons to the screen_buttons list.
@@ -42,6 +75,55 @@ class Options(BaseScreen):
                 on_click=lambda: self.application.set_screen('calibrate')
             )
         )
+        self.application.screen_buttons.append(
+            Button(
+                self.application, 
+                text='Tuner', 
+                position=(520, 200), 
+                dimensions=(200, 60),
+                on_click=lambda: self.application.set_screen('tuner')
+            )
+        )
+        self.application.screen_buttons.append(
+            Button(
+                self.application, 
+                text=f'Recording: {"On" if self.application.record_sessions else "Off"}', 
+                position=(300, 275), 
+                dimensions=(250, 60),
+                on_click=self.toggle_recording,
+                text_size=26
+            )
+        )
+        self.application.screen_buttons.append(
+            Button(
+                self.application, 
+                text=f'Players: {len(self.application.ensemble)}', 
+                position=(300, 350), 
+                dimensions=(250, 60),
+                on_click=self.change_players,
+                text_size=26
+            )
+        )
+        self.application.screen_buttons.append(
+            Button(
+                self.application, 
+                text=f'Octaves: {"On" if self.application.octave_aware else "Off"}', 
+                position=(300, 425), 
+                dimensions=(250, 60),
+                on_click=self.toggle_octaves,
+                text_size=26
+            )
+        )
+        self.application.screen_buttons.append(
+            Button(
+                self.application, 
+                text=f'Metronome: {"On" if self.application.play_metronome else "Off"}', 
+                position=(300, 500), 
+                dimensions=(250, 60),
+                on_click=self.toggle_metronome,
+                text_size=28
+            )
+        )
 
         if self.application.user.logged_in:
             self.application.screen_buttons.append(
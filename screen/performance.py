@@ -1,7 +1,15 @@
 from __future__ import annotations
-import threading
+import os
+import asyncio
+import time
 
+import numpy as np
 import pygame
+from audio.metronome import Metronome
+from audio.recorder import SessionRecorder
+from audio.note_detector import NoteDetector
+from audio.note_model import NoteModel, PITCH_CLASS_NAMES
+from audio.scoring import ScoringEngine, SongTimeline
 from audio.song_parser import SongParser
 from screen.screen import BaseScreen
 
@@ -13,6 +21,10 @@ class Performance(BaseScreen):
     def __init__(self, application: Application):
         super().__init__(application)
         self.clock_speed = 60
+        # Most times a second the audio is analysed, independent of the frame rate
+        self.analysis_rate = 30
+        # Turning rendering off lets the performance loop run as fast as possible when headless
+        self.render_enabled = True
 
     def _get_song_info_from_file(self) -> None:
         '''
@@ -29,9 +41,28 @@ class Performance(BaseScreen):
 
         # Strip all newlines and split into individual notes
         song_contents = [bar.strip('\n').split(',') for bar in song_data]
+
+        # Compile the timeline before SongParser reverses the song contents in place
+        self.timeline = SongTimeline(song_contents)
+        self.octave_aware = self.application.octave_aware
+        # Detected notes are already confirmed by each player's NoteDetector, so one detection is enough to hit a note
+        self.scoring_engine = ScoringEngine(self.timeline, required_matches=1, octave_aware=self.octave_aware)
+
+        # Each player is scored against their own part. The first player's part is the one shown on screen.
+        self.players = [self._create_player(self.song, self.timeline, self.scoring_engine)]
+        for number in range(1, len(self.application.ensemble)):
+            part = self.application.parts[number - 1] if number <= len(self.application.parts) else self.song
+            timeline = self.timeline if part == self.song else SongTimeline.from_file(part[2])
+            self.players.append(self._create_player(part, timeline, ScoringEngine(timeline, required_matches=1, octave_aware=self.octave_aware)))
         
         self.song_parser = SongParser(song_contents, self.application.images)
-        self.note_buffer = [self.song_parser.next_note()]
+        self.note_buffer = []
+        self.event_log = []
+        # Index into the timeline of the next note and barline to be added to the note buffer
+        self.next_note_index = 0
+        self.next_barline_index = 0
+        self.detected_notes = self.players[0]['detected_notes']
+        self.metronome = Metronome.from_timeline(self.timeline) if self.application.play_metronome else None
         
         # Identify song variables
         key = song_contents[-1][3].split('=')[1]
@@ -44,7 +75,7 @@ class Performance(BaseScreen):
             'cleff': self.application.images[song_contents[-1][1].split('=')[1] + '_cleff'],
             'time_signature': song_contents[-1][2].split('=')[1].split('/'),
             'key': key,
-            'song_length': int(song_contents[-1][4].split('=')[1]),
+            'song_length': len(self.scoring_engine.onsets),
             'metronome': 'left',
             'current_mic_note': 'X',
             'current_note': 'Y'
@@ -52,17 +83,162 @@ class Performance(BaseScreen):
 
         self.score = 0
         self.accuracy_breakdown = []
-
-        self.ticks_per_beat = (60 * self.clock_speed) / self.song_information['tempo']
+        self.note_results = []
+        # Seconds spent in each stage of the performance loop
+        self.stage_timings = {'render': 0.0, 'audio': 0.0, 'analysis': 0.0, 'scoring': 0.0}
+        # Audio is only analysed while a note can be hit, so count how often it is
+        self.analysis_count = 0
+        self.next_analysis_time = -np.inf
+
+        # Notes scroll (tempo / 20) pixels per frame at the target frame rate, but are positioned by time
         self.scroll_speed = self.song_information['tempo'] / 20
+        self.pixels_per_second = self.scroll_speed * self.clock_speed
+
+    @staticmethod
+    def _create_player(song: tuple[str, str, str], timeline: SongTimeline, scoring_engine: ScoringEngine) -> dict[str, Any]:
+        return {
+            'song': song,
+            'timeline': timeline,
+            'scoring_engine': scoring_engine,
+            'note_detector': NoteDetector(),
+            # The note detected while each note was expected, by timeline index
+            'detected_notes': {},
+            'expected_note': None,
+            'current_note': 'Y',
+            'current_mic_note': 'X',
+            'score': 0
+        }
 
-    def _run_audio_stream(self) -> None:
-        while True:
-            self.application.audio.stream() 
-            if self.performance_event != 'playing':
-                break
+    def get_note_label(self, timeline: SongTimeline, index: int | None) -> str:
+        '''
+        Get the name of a note of a timeline in the format detected notes are named in, or 'X' if there is no note.
+        '''
+        if index is None:
+            return 'X'
+        return NoteModel.get_name(int(timeline.midi_numbers[index])) if self.octave_aware else timeline.labels[index]
+
+    def get_pitch_name(self, pitch: int) -> str:
+        '''
+        Get the name of a detected pitch class, or MIDI number when octave aware, or 'rest' if it is not a note.
+        '''
+        if self.octave_aware or pitch < 0:
+            return NoteModel.get_name(pitch)
+        return PITCH_CLASS_NAMES[pitch]
+
+    def _log(self, event: dict[str, Any]) -> None:
+        '''
+        Add an event to the session's event log, and to the recording if the session is being recorded.
+        '''
+        self.event_log.append(event)
+        if self.recorder:
+            self.recorder.log(event)
+
+    def add_to_note_buffer(self, note: dict[str, Any]) -> None:
+        self.note_buffer.append(note)
+        self._log({'tick': self.tick, 'event': 'spawn', 'note': note['note_name']})
+
+    def get_note_position(self, song_time: float) -> float:
+        '''
+        Get the x-position of a note at the current song time, where a note is centered in the hitbox at its onset.
+
+        Args:
+            song_time (float): Onset of the note in seconds
+
+        Returns:
+            float: Left of the note image in pixels
+        '''
+        return self.hitbox_rect.centerx - 25 + (song_time - self.song_time) * self.pixels_per_second
 
-    def fade_in(self) -> None:
+    def spawn_notes(self) -> None:
+        '''
+        Add notes and barlines to the note buffer as they reach the right of the screen.
+        '''
+        # Seconds it takes a note to scroll from the right of the screen to the hitbox
+        lead_time = (self.application.WINDOW_SIZE[0] - self.get_note_position(self.song_time)) / self.pixels_per_second
+
+        onsets = self.timeline.onsets
+        while self.next_note_index < len(onsets) and onsets[self.next_note_index] - self.song_time <= lead_time:
+            note = self.song_parser.next_note()
+            note['index'] = self.next_note_index
+            note['onset'] = onsets[self.next_note_index]
+            self.add_to_note_buffer(note)
+            self.next_note_index += 1
+
+        bar_onsets = self.timeline.bar_onsets
+        while self.next_barline_index < len(bar_onsets) and bar_onsets[self.next_barline_index] - self.song_time <= lead_time:
+            self.add_to_note_buffer({
+                'pos': self.application.WINDOW_SIZE[0],
+                'onset': bar_onsets[self.next_barline_index],
+                'note_name': 'barline',
+                'note_img_offset': 0,
+                'note_img': None,
+                'tilt': None
+            })
+            self.next_barline_index += 1
+
+    def is_song_complete(self) -> bool:
+        # Every part can still be played until the acceptance window of its last note has closed
+        song_end = max(
+            (
+                player['scoring_engine'].onsets[-1] + player['scoring_engine'].late_tolerance
+                for player in self.players if len(player['scoring_engine'].onsets)
+            ),
+            default=self.scoring_engine.late_tolerance
+        )
+        return (
+            self.next_note_index == len(self.timeline.onsets)
+            and not self.note_buffer
+            and self.song_time > song_end
+        )
+
+    def start_recording(self) -> None:
+        '''
+        Start recording the session to a new directory in .\\assets\\recordings
+        '''
+        directory = os.path.join('.\\assets\\recordings', f'{time.strftime("%Y%m%d-%H%M%S")} - {self.song[0]}')
+        self.recorder = SessionRecorder(
+            directory, 
+            self.application.audio.rate, 
+            header={
+                'song': self.song, 
+                'parts': self.application.parts, 
+                'notes': self.application.notes, 
+                'octave_aware': self.octave_aware, 
+                'clock_speed': self.clock_speed,
+                'analysis_rate': self.analysis_rate
+            },
+            channels=self.application.audio.channels
+        )
+        self.application.audio.start_recording(self.recorder)
+        for event in self.event_log:
+            self.recorder.log(event)
+
+    def stop_audio(self) -> None:
+        '''
+        Stop streaming audio and finish any recording, without waiting for a read that is still in flight.
+        '''
+        self.performance_event = None
+        if self.metronome:
+            self.metronome.stop()
+        if self.stream_task:
+            self.stream_task.cancel()
+            self.stream_task = None
+
+        if self.recorder:
+            # Queued behind any read still in flight, so the recording keeps all of the audio that was read
+            self.application.capture_executor.submit(self._finish_recording, self.recorder)
+            self.recorder = None
+
+    def _finish_recording(self, recorder: SessionRecorder) -> None:
+        self.application.audio.start_recording(None)
+        recorder.close()
+
+    async def _run_audio_stream(self) -> None:
+        # Each buffer is analysed by the performance loop as it arrives
+        async for _ in self.application.capture(self.application.ensemble.stream):
+            pass
+
+    async def fade_in(self) -> None:
         '''
         Perform a fade-in transition from the background to the current screen content.
         '''
@@ -80,9 +256,10 @@ class Performance(BaseScreen):
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         self.application.set_screen('song_select')
-                        return
                 
             pygame.display.flip()
+            # Let other tasks run, and the screen be left if it has been
+            await asyncio.sleep(0)
 
     def handle_countdown(self) -> None:
         # Update the countdown each second when performance_event isn't set to 'playing'
@@ -94,7 +271,11 @@ class Performance(BaseScreen):
         if countdown_number == 0:
             self.tick = 1
             self.performance_event = 'playing'
-            self.stream_thread.start()
+            if self.metronome:
+                self.metronome.play()
+            # When headless the audio is streamed in the performance loop instead, so each run is deterministic
+            if not self.application.headless:
+                self.stream_task = asyncio.create_task(self._run_audio_stream())
     
     def handle_events(self) -> None:
         for event in pygame.event.get():
@@ -104,129 +285,167 @@ class Performance(BaseScreen):
             # Allow user to press Escape to stop playing and return to the main menu
             if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                 if self.is_playing():
-                    self.performance_event = None
-                    self.stream_thread.join()
                     self.application.set_screen('main_menu')
 
-    def run_performance_loop(self) -> None:
-        # Initialize a thread for running the audio stream in the background
-        self.stream_thread = threading.Thread(target=self._run_audio_stream)
-
+    async def run_performance_loop(self) -> None:
         while True:
-            self.render_dynamic_elements()
-            self.render_static_elements()
+            stage_start = time.perf_counter()
+            if self.render_enabled:
+                self.render_dynamic_elements()
+                self.render_static_elements()
+            self.stage_timings['render'] += time.perf_counter() - stage_start
             
-            self.application.clock.tick(self.clock_speed)
+            frame_time = await self.application.next_frame(self.clock_speed)
             self.tick += 1
+            if self.is_playing():
+                self.song_time += frame_time / 1000
 
             self.handle_countdown()
 
             # Handle song completion
-            if self.note_buffer == [None]:
-                self.performance_event = None
-                self.stream_thread.join()
-
-                self.application.performance_results = {
-                    'song_name': self.application.song[0] if self.application.song else 'Undefined',
-                    'song_length': self.song_information['song_length'],
-                    'score': self.score,
-                    'accuracy': round(100 * self.score / self.song_information['song_length']),
-                    'accuracy_breakdown':  self.accuracy_breakdown
-                }
-
-                self.application.set_screen('analysis')
+            if self.is_playing() and self.is_song_complete():
+                self.stop_audio()
+                self.finish()
+                if not self.application.headless:
+                    self.application.set_screen('analysis')
                 return
 
+            analysed_range = None
             if self.is_playing():
-                latest_note = self.note_buffer[-1]
-                
-                # Handle long duration notes
-                if latest_note and self.tick % self.ticks_per_beat == 0:
-                    latest_note['long_duration_bool'] += 1
-
-                # Toggle metoronome position on the appropriate tick
-                if (self.tick - self.song_information['metronome_offset']) % self.ticks_per_beat == 0:
-                    self.song_information['metronome'] = 'right' if self.song_information['metronome'] == 'left' else 'left'
-
-                # When the latest note's duration has passed 
-                note_length_passed = latest_note and self.tick % round(self.ticks_per_beat * latest_note['note_length']) == 0
-                if latest_note and note_length_passed:
-                    if self.song_parser.end_of_bar:
-                        # Add the barline to the note buffer when the end of the bar is reached
-                        barline = {
-                            'pos': 1280,
-                            'note_length': latest_note['note_length'],
-                            'note_name': 'barline',
-                            'long_duration_bool': 0,
-                            'played': 5,
-                            'note_img_offset': 0,
-                            'note_img': None,
-                            'tilt': None
-                        }
-                        self.note_buffer.append(barline)
-                        self.song_parser.end_of_bar = False
-                    else:
-                        # Otherwise get the next note
-                        if latest_note['note_length'] > 1:
-                            if latest_note['long_duration_bool'] == latest_note['note_length']:
-                                self.note_buffer.append(self.song_parser.next_note())
-                            else:
-                                self.tick += self.ticks_per_beat
-                        else:
-                            self.note_buffer.append(self.song_parser.next_note())
-
-                        if self.song_parser.end_of_bar and self.note_buffer[-1]:
-                            # To make sure the note length isn't extended by the barline 
-                            # (latest_note_length / 2) + barline_length = latest_note_length
-                            self.note_buffer[-1]['note_length'] /= 2
-
-                if self.tick > 10:
-                    current_mic_frequencies = self.application.audio.get_dominant_frequencies()
-                    self.song_information['current_mic_note'] = self.application.audio.get_note_from_frequency(self.application.notes, current_mic_frequencies)
-
-                # Handle a successful microphone and current note match
-                if self.song_information['current_note'] in self.song_information['current_mic_note'].split('/'):
-                    for note in self.note_buffer:
-                        if not note:
+                stage_start = time.perf_counter()
+                self.spawn_notes()
+
+                # Swing the metronome on every beat
+                beat = int(np.floor(self.song_time / self.timeline.seconds_per_beat))
+                self.song_information['metronome'] = 'left' if beat % 2 == 0 else 'right'
+
+                for player in self.players:
+                    player['expected_note'] = player['scoring_engine'].get_expected_note(self.song_time)
+                    player['current_note'] = self.get_note_label(player['timeline'], player['expected_note'])
+                self.song_information['current_note'] = self.players[0]['current_note']
+                self.stage_timings['scoring'] += time.perf_counter() - stage_start
+
+                # Only listen to players while one of their notes can be hit, so nothing is analysed during rests
+                listening = [player['expected_note'] is not None for player in self.players]
+                for player, listen in zip(self.players, listening):
+                    if not listen:
+                        player['note_detector'].reset()
+                        player['current_mic_note'] = 'X'
+                analyse = self.tick > 10 and any(listening) and self.song_time >= self.next_analysis_time
+
+                if self.application.headless and analyse:
+                    stage_start = time.perf_counter()
+                    self.application.ensemble.stream()
+                    self.stage_timings['audio'] += time.perf_counter() - stage_start
+
+                if analyse:
+                    stage_start = time.perf_counter()
+                    self.next_analysis_time = self.song_time + 1 / self.analysis_rate
+                    self.analysis_count += 1
+                    hop_pitches = self.application.ensemble.detect(
+                        self.application.notes, self.application.note_model if self.octave_aware else None, listening
+                    )
+                    for number, (player, pitches) in enumerate(zip(self.players, hop_pitches)):
+                        # Only audio streamed since the last detection is analysed
+                        if pitches is None:
                             continue
-
-                        note_name = note['note_name'][0] if note['note_name'][-1] == 'n' else note['note_name'][0] + note['note_name'][-1]
-
-                        if note_name == self.song_information['current_note']:
-                            note['played'] -= 1
-                            break
-                
-                # Handle note interaction 
-                for i, note in enumerate(self.note_buffer):
-                    if note:
-                        note['pos'] -= self.scroll_speed                  
-                        if self.hitbox_rect.left < note['pos'] < self.hitbox_rect.right:
-                            if note['note_name'][-1] == 'n':
-                                self.song_information['current_note'] = note['note_name'][0]
-                            else:
-                                self.song_information['current_note'] = note['note_name'][0] + note['note_name'][-1]
-                        elif note['pos'] < self.hitbox_rect.left - 40:
-                            note['played'] = 1099511627776 # 2 ** 40
-                        
-                        # User has played the correct note at the correct time
-                        if note['played'] <= 0:
-                            note['pos'] = -40
-                            self.song_information['current_note'] = 'X'
-                            self.score += 1    
-
-                        # Delete the note when it's x-position is off screen
-                        if note['pos'] <= -60:
-                            del self.note_buffer[i] 
-                            if note['note_name'] != 'barline':
-                                # Percent of notes played correctly out of all the notes so far
-                                self.accuracy_breakdown.append(round(100 * self.score / (len(self.accuracy_breakdown) + 1)))
-                        else:
-                            self.note_buffer[i] = note
+                        for event in player['note_detector'].update(pitches):
+                            event = {
+                                'tick': self.tick, 
+                                'event': event['event'], 
+                                'note': self.get_pitch_name(event['pitch']), 
+                                'confidence': round(event['confidence'], 2)
+                            }
+                            self._log(event | {'player': number} if number else event)
+                        player['current_mic_note'] = self.get_pitch_name(player['note_detector'].pitch)
+                    analysed_range = self.application.audio.analysed_range
+                    self.stage_timings['analysis'] += time.perf_counter() - stage_start
+                self.song_information['current_mic_note'] = self.players[0]['current_mic_note']
+
+                stage_start = time.perf_counter()
+                for number, player in enumerate(self.players):
+                    if player['expected_note'] is not None:
+                        player['detected_notes'][player['expected_note']] = player['current_mic_note']
+
+                    # Score the note being held, and remove any notes it completes from the screen
+                    if listening[number]:
+                        hit_notes = set(player['scoring_engine'].feed(
+                            [self.song_time], [player['note_detector'].pitch]
+                        ).tolist())
+                        for index in hit_notes:
+                            event = {'tick': self.tick, 'event': 'hit', 'note': player['timeline'].note_names[index]}
+                            self._log(event | {'player': number} if number else event)
+                        player['score'] = player['scoring_engine'].get_hit_count()
+                        if number == 0:
+                            self.note_buffer = [note for note in self.note_buffer if note.get('index') not in hit_notes]
+                self.score = self.players[0]['score']
+
+                # Move the notes, deleting them when their x-position is off screen
+                for note in self.note_buffer:
+                    note['pos'] = self.get_note_position(note['onset'])
+                    if note['pos'] <= -60:
+                        self._log({'tick': self.tick, 'event': 'remove', 'note': note['note_name']})
+                self.note_buffer = [note for note in self.note_buffer if note['pos'] > -60]
+                self.stage_timings['scoring'] += time.perf_counter() - stage_start
+
+            # Log the frame with the exact audio it analysed, so the session can be replayed
+            frame = {
+                'tick': self.tick,
+                'ms': self.application.clock.get_time(),
+                'range': list(analysed_range) if analysed_range else None,
+                'note': self.song_information['current_mic_note'],
+                'score': self.score
+            }
+            if len(self.players) > 1:
+                frame['notes'] = [player['current_mic_note'] for player in self.players]
+            self._log(frame)
             
             self.handle_events()
             
             self.song_information['tick'] = self.tick
-            pygame.display.flip()
+            if self.render_enabled:
+                pygame.display.flip()
+
+    def _get_player_results(self, player: dict[str, Any]) -> dict[str, Any]:
+        '''
+        Collect the results of every note of a player's part.
+        '''
+        results = player['scoring_engine'].get_results()
+        timeline = player['timeline']
+        song_length = len(results['hits'])
+        return {
+            'song_name': player['song'][0],
+            'song_length': song_length,
+            'score': player['score'],
+            'accuracy': round(100 * player['score'] / song_length) if song_length else 0,
+            'accuracy_breakdown': results['accuracy_curve'].tolist(),
+            'note_results': [
+                {
+                    'note_name': timeline.note_names[index],
+                    'hit': bool(hit),
+                    # Milliseconds between the note's onset and it being played, negative when played early
+                    'offset_ms': None if np.isnan(offset) else float(offset * 1000),
+                    'detected': player['detected_notes'].get(int(index))
+                }
+                for index, hit, offset in zip(results['notes'], results['hits'], results['offsets'])
+            ]
+        }
+
+    def finish(self) -> None:
+        '''
+        Collect the results of every note into Application.performance_results. The results are the first player's,
+        and with more than one player the results of every player are under 'ensemble'.
+        '''
+        player_results = [self._get_player_results(player) for player in self.players]
+        self.accuracy_breakdown = player_results[0]['accuracy_breakdown']
+        self.note_results = player_results[0]['note_results']
+
+        self.application.performance_results = player_results[0] | {
+            'stage_timings': self.stage_timings,
+            'analysis_count': self.analysis_count
+        }
+        if len(player_results) > 1:
+            self.application.performance_results['ensemble'] = player_results
     
     def render_static_elements(self) -> None:
         self.render_stave()
@@ -264,16 +483,17 @@ class Performance(BaseScreen):
     
     def render_hitbox(self, previous_rect: pygame.Rect) -> None:
         self.hitbox_rect = self.application.screen.blit(self.hitbox, (previous_rect.right + 25, 340))
-        
-        self.song_information['metronome_offset'] = round(
-            ((self.application.screen.get_width() - self.hitbox_rect.left) / self.scroll_speed) / self.ticks_per_beat
-        )
 
     def render_performance_info_text(self) -> None:
         title = self.application.get_font(30).render(f'Now playing - {self.song[0]}', True, (0, 0, 0)) 
         score_text = self.application.get_font(60).render('Score: ' + str(self.score), True, (0, 0, 0))
         self.application.screen.blit(title, (0, 0)) 
         self.application.screen.blit(score_text, (0, 40))
+
+        if len(self.players) > 1:
+            player_scores = '   '.join(f'P{number + 1}: {player["score"]}' for number, player in enumerate(self.players))
+            player_scores_text = self.application.get_font(30).render(player_scores, True, (0, 0, 0))
+            self.application.screen.blit(player_scores_text, (0, 110))
     
     def render_notes_and_barlines(self) -> None:
         for note in self.note_buffer:
@@ -345,12 +565,35 @@ class Performance(BaseScreen):
         self.hitbox.set_alpha(200)
         self.hitbox.fill((153, 217, 234)) 
 
-        self._get_song_info_from_file() 
-        self.fade_in()
-        
-        self.performance_event = None
         self.tick = 1
-        self.run_performance_loop()
+        self.recorder = None
+        self.stream_task: asyncio.Task | None = None
+        self.application.ensemble.reset()
+        self._get_song_info_from_file() 
+        # Render the static elements once even if rendering is disabled, as this lays out the hitbox
+        self.render_static_elements()
+        # Start the song time so that the first note begins at the right of the screen
+        self.song_time = 0.0
+        self.song_time = -(self.application.WINDOW_SIZE[0] - self.get_note_position(0.0)) / self.pixels_per_second
+        if self.metronome:
+            # Count in over the lead in, then click until the end of the last note. The track is rendered now rather
+            # than when the countdown ends, so rendering a long song does not hold up the first frames of the song.
+            self.metronome.prepare(self.song_time, self.timeline.length)
+
+    async def run(self) -> None:
+        self.setup()
+        try:
+            if not self.application.headless:
+                await self.fade_in()
+
+            self.performance_event = None
+            self.tick = 1
+            if self.application.record_sessions:
+                self.start_recording()
+            await self.run_performance_loop()
+        finally:
+            # However the screen is left, stop streaming and finish the recording
+            self.stop_audio()
 
     def is_playing(self):
         return self.performance_event == 'playing'
\ No newline at end of file
@@ -28,4 +28,12 @@ class BaseScreen:
         '''
         Setup the screen. To be implemented by subclasses.
         '''
-        pass
\ No newline at end of file
+        pass
+
+    async def run(self) -> None:
+        '''
+        Run the screen as a task of the application's event loop until it is left, which cancels the task.
+        By default the screen is set up and its widgets are handled by `Application.run_event_loop`.
+        Screens that run their own loop override this, awaiting `Application.next_frame` every frame.
+        '''
+        await self.application.run_event_loop()
\ No newline at end of file
@@ -1,18 +1,35 @@
 from __future__ import annotations
+from string import ascii_letters, digits
 import pygame
 
+from audio.song_search import SongSearch
 from screen.screen import BaseScreen
 from ui.button import Button
 from ui.scrollbar import ScrollBar
 from ui.song_tab import SongTab
+from ui.text_input import TextInput
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from application import Application
 
 class SongSelect(BaseScreen):
+    # Width of a song tab including the gap between tabs
+    TAB_WIDTH = 250 + 25
+    # Most tabs that can be on screen at once
+    VISIBLE_TABS = 6
+    # Area tabs are visible in, between the covers at the edges of the screen
+    VISIBLE_AREA = pygame.Rect(140, 115, 1000, 365)
+
     def __init__(self, application: Application) -> None:
         super().__init__(application)
+        self.library = []
+        self.songs = []
+        self.user_data = {}
+        # Every tab the screen can show, of which `application.song_tabs` holds the ones with a song to show
+        self.song_tab_pool: list[SongTab] = []
+        # Scroll position the tabs were last drawn at, or None if they must be drawn again
+        self.drawn_position: float | None = None
 
     def add_buttons(self) -> None:
         '''
@@ -28,43 +45,116 @@ class SongSelect(BaseScreen):
                 on_click=lambda: self.application.set_screen('main_menu'))
         )
 
+    def load_songs(self) -> None:
+        '''
+        Load the song library from the catalog and index it for searching.
+        '''
+        if self.application.song_catalog.refresh() or not self.library:
+            self.library = self.application.song_catalog.get_songs()
+            self.song_search = SongSearch(self.library)
+        self.songs = self.library
+        self.user_data = self.application.user.get_data()
+
+    def filter_songs(self, query: str) -> None:
+        '''
+        Show only the songs matching a search query. The tab pool and scroll bar are kept and resized for the results.
+
+        Args:
+            query (str): Search terms typed by the user
+        '''
+        self.songs = [self.library[i] for i in self.song_search.search(query)]
+        self.show_song_tabs()
+        self.application.scroll_bar.set_scroll_length(self._get_scroll_length())
+
     def create_song_tabs(self) -> None:
         '''
-        Create song tabs for each song in the list.
+        Create the pool of song tabs. Only enough tabs to fill the screen are created,
+        and they are recycled for other songs as the scroll bar moves.
         '''
+        self.song_tab_pool = []
+        for i in range(self.VISIBLE_TABS):
+            song_tab = SongTab(self.application, start_pos=self._get_start_pos(i))
+            for button in song_tab.buttons:
+                button.clip = self.VISIBLE_AREA
+            self.song_tab_pool.append(song_tab)
         self.application.song_tabs = []
-        songs = self.application.load_files(extensions=['.txt'])
-        user_data = self.application.user.get_data()
+        self.show_song_tabs()
 
-        for i, song in enumerate(songs):
-            song_name, song_difficulty = song[1].split(' - ')
-            song_location = song[0]
-            highscore = int(user_data.get(song_name, -1))
-            start_pos = round((i + 1) * (250 + 25)) - 135
+    def show_song_tabs(self) -> None:
+        '''
+        Show as many tabs from the pool as there are songs to fill them, hide the rest,
+        and assign the songs from the start of the list.
+        '''
+        shown = len(self.application.song_tabs)
+        visible = min(len(self.songs), len(self.song_tab_pool))
+        for song_tab in self.song_tab_pool[visible:shown]:
+            for button in song_tab.buttons:
+                self.application.screen_buttons.remove(button)
+        for song_tab in self.song_tab_pool[shown:visible]:
+            self.application.screen_buttons.extend(song_tab.buttons)
+        self.application.song_tabs = self.song_tab_pool[:visible]
 
-            song_tab = SongTab(
-                self.application, 
-                start_pos=start_pos, 
-                song=(song_name, song_difficulty, song_location),
-                highscore=highscore
+        self.update_song_tabs(0)
+        self.drawn_position = None
+
+    def update_song_tabs(self, scroll_position: int) -> None:
+        '''
+        Assign songs to the pooled tabs for the songs visible at the current scroll position.
+        A song keeps the same tab while it is on screen, so only tabs scrolling into view are reassigned.
+
+        Args:
+            scroll_position (int): Position of the scroll bar notch
+        '''
+        if not self.application.song_tabs:
+            return
+
+        # Index of the leftmost song with any part of its tab on screen
+        first_index = max(0, int((-scroll_position - self._get_start_pos(0)) // self.TAB_WIDTH))
+        first_index = min(first_index, len(self.songs) - len(self.application.song_tabs))
+
+        for i in range(first_index, first_index + len(self.application.song_tabs)):
+            song_tab = self.application.song_tabs[i % len(self.application.song_tabs)]
+            song = self.songs[i]
+            if song_tab.song[2] == song['path'] and song_tab.start_pos == self._get_start_pos(i):
+                continue
+
+            leaderboard = self.application.leaderboard.get_top(song['name'], 1)
+            song_tab.set_song(
+                song=(song['name'], song['difficulty'], song['path']),
+                highscore=int(self.user_data.get(song['name'], -1)),
+                start_pos=self._get_start_pos(i),
+                leader=leaderboard[0] if leaderboard else None
             )
-            self.application.screen_buttons.append(song_tab.button)
-            self.application.song_tabs.append(song_tab)
+
+    def _get_start_pos(self, index: int) -> int:
+        return round((index + 1) * self.TAB_WIDTH) - 135
     
-    def add_scrollbar(self) -> None:
-        if not self.application.song_tabs:
-            self.create_song_tabs()
+    def _get_scroll_length(self) -> int:
+        return round(self.TAB_WIDTH * len(self.songs)) - 1025
 
+    def add_scrollbar(self) -> None:
         self.application.scroll_bar = ScrollBar(
             self.application, 
             dimensions=(1000, 20), 
             position=(640, 504), 
-            scroll_length=round(275 * len(self.application.song_tabs)) - 1025, 
+            scroll_length=self._get_scroll_length(), 
             color=(153, 217, 234), 
             alt_color=(0, 162, 232), 
             clicked_color=(0, 131, 187)
         )
 
+    def add_text_inputs(self) -> None:
+        self.application.text_inputs = []
+        self.search_field = TextInput(
+            self.application, 
+            dimensions=(600, 45), 
+            position=(340, 560), 
+            character_limit=30, 
+            allowed_characters=ascii_letters + digits + " '<>=", 
+            on_change=self.filter_songs
+        )
+        self.application.text_inputs.append(self.search_field)
+
     def render_static_elements(self) -> None:
         # Background
         background_image = self.application.images['menu_background_e']
@@ -75,28 +165,39 @@ class SongSelect(BaseScreen):
         # Title
         title = self.application.get_font(50).render('Song Select', True, (0, 0, 0))
         self.application.screen.blit(title, (490, 36))
+
+        search_text = self.application.get_font(40).render('Search', True, (0, 0, 0))
+        self.application.screen.blit(search_text, (200, 555))
     
     def render_dynamic_elements(self, **kwargs: tuple[int, int]) -> None:
         mouse_position = kwargs.get('mouse_position', None)
         if not mouse_position:
             raise ValueError('The "mouse_position" keyword argument is required but missing.')
 
+        # The tabs only need drawing again once they have scrolled, hovering over their buttons is drawn by the buttons
+        if not self.application.scroll_bar or self.application.scroll_bar.get_notch_position() == self.drawn_position:
+            return
+        scroll_position = self.application.scroll_bar.get_notch_position()
+
         pygame.draw.rect(self.application.screen, self.application.BACKGROUND_COLOR, (0, 92, 1280, 400))
+        self.update_song_tabs(scroll_position)
 
         for tab in self.application.song_tabs:
-            if not self.application.scroll_bar:
-                break
-            tab.set_x(self.application.scroll_bar.get_notch_position())
+            tab.set_x(scroll_position)
             if -275 < tab.get_x() < 1280:
                 tab.render()
-                tab.button.is_hovered(mouse_position)
+                for button in tab.buttons:
+                    button.is_hovered(mouse_position)
 
         pygame.draw.rect(self.application.screen, self.application.BACKGROUND_COLOR + (255,), (0, 115, 140, 365))
         pygame.draw.rect(self.application.screen, self.application.BACKGROUND_COLOR + (255,), (1140, 115, 1280, 365))
+        self.drawn_position = scroll_position
 
     def setup(self) -> None:
         self.application.clear_screen()
         self.render_static_elements() 
         self.add_buttons()
+        self.load_songs()
         self.create_song_tabs()
-        self.add_scrollbar() 
\ No newline at end of file
+        self.add_scrollbar()
+        self.add_text_inputs()
\ No newline at end of file
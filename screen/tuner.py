@@ -0,0 +1,165 @@
+from __future__ import annotations
+import asyncio
+from collections import deque
+import time
+import numpy as np
+import pygame
+from audio.audio_manager import get_interpolated_frequency
+from audio.note_model import NoteModel
+from screen.screen import BaseScreen
+from ui.button import Button
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from application import Application
+
+class Tuner(BaseScreen):
+    '''
+    A chromatic tuner showing the note being played and how many cents sharp or flat it is.
+
+    The microphone is read in small hops on the capture executor, and the pitch of the newest window of audio is estimated
+    after every hop. The screen is redrawn as soon as each estimate is ready rather than on a frame clock, and shows
+    how often it updates and how long audio takes to reach the display, as a check of the audio pipeline.
+    '''
+    # Samples analysed for each estimate, and samples read between estimates
+    WINDOW_SIZE = 2048
+    HOP_SIZE = 256
+    # Windows with a root mean square amplitude below this are silence
+    SILENCE = 300
+    # Cents either side of a note that count as in tune
+    IN_TUNE = 5
+    # Seconds of updates the update rate and latency are averaged over
+    STATISTICS_TIME = 1.0
+
+    def __init__(self, application: Application):
+        super().__init__(application)
+        # Tuned to equal temperament rather than to the calibration, so instruments are tuned to a standard
+        self.note_model = NoteModel()
+        self.window = np.zeros(self.WINDOW_SIZE, dtype=np.float32)
+        # Time the newest estimate's audio was read, and its frequency in Hz, or None for silence
+        self.estimate: tuple[float, float | None] | None = None
+
+    def _estimate(self) -> tuple[float, float | None]:
+        '''
+        Read the next hop from the microphone and estimate the pitch of the newest window, blocking until the hop is recorded.
+        '''
+        samples = self.application.audio.read(self.HOP_SIZE)
+        read_time = time.perf_counter()
+        if samples.ndim > 1:
+            samples = samples[:, 0]
+        self.window = np.concatenate((self.window, samples))[-self.WINDOW_SIZE:]
+
+        if np.sqrt(np.mean(self.window ** 2)) < self.SILENCE:
+            return read_time, None
+        return read_time, get_interpolated_frequency(self.window, self.application.audio.rate)
+
+    async def _listen(self) -> None:
+        async for estimate in self.application.capture(self._estimate):
+            self.estimate = estimate
+            self.estimated.set()
+
+    async def run(self) -> None:
+        self.setup()
+        listen_task = asyncio.create_task(self._listen())
+
+        # Times each estimate was shown, and how long its audio took to be shown
+        update_times: deque[float] = deque()
+        latencies: deque[float] = deque()
+        input_latency = self.application.audio.get_input_latency()
+        shown_estimate = None
+        try:
+            while True:
+                # Redraw as soon as there is a new estimate, and at least every tenth of a second to respond to input
+                try:
+                    await asyncio.wait_for(self.estimated.wait(), .1)
+                except asyncio.TimeoutError:
+                    pass
+                self.estimated.clear()
+                estimate = self.estimate
+
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        self.application.quit()
+                    if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                        self.application.set_screen('options')
+                    if event.type == pygame.MOUSEBUTTONDOWN and self.back_button.is_hovered(pygame.mouse.get_pos(), True):
+                        self.back_button.call()
+
+                self.application.screen.blit(self.background, (0, 0))
+                self.back_button.invalidate()
+                self.back_button.is_hovered(pygame.mouse.get_pos())
+                self.render_dynamic_elements(estimate=estimate, update_times=update_times, latencies=latencies)
+                pygame.display.flip()
+
+                if estimate is not None and estimate is not shown_estimate:
+                    shown_estimate = estimate
+                    shown_time = time.perf_counter()
+                    update_times.append(shown_time)
+                    latencies.append(shown_time - estimate[0] + input_latency)
+                    while update_times[0] < shown_time - self.STATISTICS_TIME:
+                        update_times.popleft()
+                        latencies.popleft()
+        finally:
+            listen_task.cancel()
+
+    def render_static_elements(self) -> None:
+        # Background color and image
+        self.application.screen.fill(self.application.BACKGROUND_COLOR)
+        background_image = self.application.images['menu_background_b']
+        image_position = (round(640 - (background_image.get_size()[0] * .5)), round(360 - (background_image.get_size()[1] * .5)))
+        self.application.screen.blit(background_image, image_position)
+        self.application.screen.blit(self.application.overlay, (0, 0))
+
+        title = self.application.get_font(50).render('Tuner', True, (0, 0, 0))
+        self.application.screen.blit(title, (580, 36))
+
+        # Scale of the cents meter, every 10 cents from 50 flat to 50 sharp
+        pygame.draw.line(self.application.screen, (0, 0, 0), (340, 500), (940, 500), 4)
+        for cents in range(-50, 60, 10):
+            x = 640 + cents * 6
+            pygame.draw.line(self.application.screen, (0, 0, 0), (x, 485 if cents % 50 else 470), (x, 515 if cents % 50 else 530), 3)
+            label = self.application.get_font(20).render(f'{cents:+d}' if cents else '0', True, (0, 0, 0))
+            self.application.screen.blit(label, (x - label.get_width() // 2, 535))
+
+    def render_dynamic_elements(self, **kwargs) -> None:
+        estimate = kwargs.get('estimate')
+        update_times = kwargs.get('update_times', [])
+        latencies = kwargs.get('latencies', [])
+
+        frequency = estimate[1] if estimate else None
+        midi_number = int(self.note_model.get_midi_numbers([frequency])[0]) if frequency else -1
+        if midi_number < 0:
+            note_text = self.application.get_font(150).render('-', True, (0, 0, 0))
+            self.application.screen.blit(note_text, (640 - note_text.get_width() // 2, 150))
+        else:
+            cents = float(self.note_model.get_cents([frequency])[0])
+            color = (0, 160, 0) if abs(cents) <= self.IN_TUNE else (200, 0, 0)
+            note_text = self.application.get_font(150).render(NoteModel.get_name(midi_number), True, color)
+            self.application.screen.blit(note_text, (640 - note_text.get_width() // 2, 150))
+            details = self.application.get_font(30).render(f'{frequency:.1f}Hz   {cents:+.0f} cents', True, (0, 0, 0))
+            self.application.screen.blit(details, (640 - details.get_width() // 2, 380))
+            # Needle showing how far the note is from being in tune
+            x = 640 + round(np.clip(cents, -50, 50) * 6)
+            pygame.draw.line(self.application.screen, color, (x, 450), (x, 550), 6)
+
+        if len(update_times) > 1:
+            rate = (len(update_times) - 1) / (update_times[-1] - update_times[0])
+            latency = 1000 * sum(latencies) / len(latencies)
+            statistics = self.application.get_font(30).render(f'Updates: {rate:.0f}/s   Latency: {latency:.0f}ms', True, (0, 0, 0))
+            self.application.screen.blit(statistics, (1250 - statistics.get_width(), 670))
+
+    def setup(self) -> None:
+        self.application.clear_screen()
+        self.render_static_elements()
+        self.back_button = Button(
+            self.application,
+            text='Back',
+            position=(128, 648),
+            dimensions=(160, 75),
+            on_click=lambda: self.application.set_screen('options')
+        )
+        self.background = self.application.screen.copy()
+        self.window = np.zeros(self.WINDOW_SIZE, dtype=np.float32)
+        self.estimate = None
+        # Set whenever there is a new estimate to show
+        self.estimated = asyncio.Event()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+'''
+Serve recording grading over HTTP, so the pitch detection and scoring can run on a central machine.
+
+Usage:
+    python server.py --port 8000 --workers 4
+
+Endpoints:
+    GET  /songs                          List the songs that can be graded
+    GET  /stats                          Number of requests served and rejected, and their mean timings
+    POST /grade?song=<song>&offset=<s>   Grade the Wave file in the request body against a song, e.g.
+                                         curl --data-binary @take.wav "localhost:8000/grade?song=Ode%20to%20Joy%20-%20Easy"
+
+Grading runs in a pool of worker processes. At most `workers + queue_size` recordings are accepted at once,
+and further requests are turned away with 503 until one finishes, rather than queueing without limit.
+Every response to /grade includes how long the request spent being read, queued and graded, in its body and
+in a Server-Timing header.
+'''
+import io
+import os
+import json
+import time
+import wave
+import struct
+import argparse
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+from audio.grading import RecordingGrader, load_recording
+from audio.song_catalog import SongCatalog
+
+# Largest recording accepted, in bytes. Ten minutes of 16 bit 44.1kHz stereo audio is about 100MB.
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024
+
+# Errors raised when reading a request body that is not a complete Wave file
+WAVE_ERRORS = (struct.error, wave.Error, EOFError, ValueError)
+
+class InvalidRecording(Exception):
+    '''
+    The request body could not be read as a Wave file, which is the client's error rather than the server's.
+    '''
+
+# Graders built by this worker process, by song and offset, so each song is only compiled once per worker
+graders: dict[tuple[str, float], RecordingGrader] = {}
+
+def _grade(song_path: str, offset: float, data: bytes) -> tuple[dict[str, Any], float]:
+    '''
+    Grade a Wave file in a worker process.
+
+    Returns:
+        results (dict): The results, in the format of `Application.performance_results`
+        grading_time (float): Seconds spent grading
+    '''
+    start = time.perf_counter()
+    if (song_path, offset) not in graders:
+        graders[song_path, offset] = RecordingGrader(song_path, offset=offset)
+    try:
+        rate, signal = load_recording(io.BytesIO(data))
+    except WAVE_ERRORS as error:
+        raise InvalidRecording(str(error)) from error
+    results = graders[song_path, offset].grade_signal(signal, rate)
+    return results, time.perf_counter() - start
+
+class GradingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], workers: int | None = None, queue_size: int = 8) -> None:
+        '''
+        Create a GradingServer instance and start its worker processes.
+
+        Args:
+            address (tuple): Host and port to listen on
+            workers (int): Number of worker processes
+                           default: None, one per CPU
+            queue_size (int): Number of recordings that can wait for a free worker
+                              default: 8
+        '''
+        super().__init__(address, GradingRequestHandler)
+        self.song_catalog = SongCatalog()
+        self.song_catalog.refresh()
+        workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(workers)
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+
+        self.stats_lock = threading.Lock()
+        self.stats = {'graded': 0, 'rejected': 0, 'failed': 0}
+        # Total milliseconds spent in each stage by graded requests
+        self.timing_totals = {'read': 0.0, 'queue': 0.0, 'grade': 0.0, 'total': 0.0}
+
+    def record(self, outcome: str, timings: dict[str, float] | None = None) -> None:
+        with self.stats_lock:
+            self.stats[outcome] += 1
+            for stage, duration in (timings or {}).items():
+                self.timing_totals[stage] += duration
+
+    def get_stats(self) -> dict[str, Any]:
+        with self.stats_lock:
+            graded = self.stats['graded']
+            return {
+                **self.stats,
+                'mean_ms': {stage: total / graded if graded else 0.0 for stage, total in self.timing_totals.items()}
+            }
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.executor.shutdown(cancel_futures=True)
+
+class GradingRequestHandler(BaseHTTPRequestHandler):
+    server: GradingServer
+
+    def _send_json(self, status: int, body: Any, headers: dict[str, str] | None = None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str, headers: dict[str, str] | None = None) -> None:
+        self._send_json(status, {'error': message}, headers)
+
+    def do_GET(self) -> None:
+        path = urlparse(self.path).path
+        if path == '/songs':
+            self.server.song_catalog.refresh()
+            self._send_json(200, [
+                {key: song[key] for key in ('name', 'difficulty', 'notes', 'tempo')} for song in self.server.song_catalog.get_songs()
+            ])
+        elif path == '/stats':
+            self._send_json(200, self.server.get_stats())
+        else:
+            self._send_error(404, f'{path} does not exist')
+
+    def do_POST(self) -> None:
+        start = time.perf_counter()
+        # Responses sent before the body is read close the connection, as the unread body cannot be skipped
+        try:
+            length = int(self.headers['Content-Length'])
+        except (TypeError, ValueError):
+            self.close_connection = True
+            self._send_error(411, 'Content-Length is required')
+            return
+        if length > MAX_UPLOAD_SIZE:
+            self.close_connection = True
+            self._send_error(413, f'recordings must be at most {MAX_UPLOAD_SIZE} bytes')
+            return
+
+        url = urlparse(self.path)
+        if url.path != '/grade':
+            self.close_connection = True
+            self._send_error(404, f'{url.path} does not exist')
+            return
+
+        query = parse_qs(url.query)
+        song = self.server.song_catalog.get_song(query.get('song', [''])[0])
+        if not song:
+            self.close_connection = True
+            self._send_error(404, 'song must be one of the songs listed by /songs')
+            return
+        try:
+            offset = float(query.get('offset', ['0'])[0])
+        except ValueError:
+            self.close_connection = True
+            self._send_error(400, 'offset must be a number of seconds')
+            return
+
+        # Turn the request away straight away when every worker and queue slot is taken, without reading the body,
+        # so only the recordings that have a slot are ever held in memory
+        if not self.server.slots.acquire(blocking=False):
+            self.server.record('rejected')
+            self.close_connection = True
+            self._send_error(503, 'all workers are busy', {'Retry-After': '1'})
+            return
+
+        try:
+            data = self.rfile.read(length)
+            read_time = time.perf_counter()
+            results, grading_time = self.server.executor.submit(_grade, song['path'], offset, data).result()
+        except InvalidRecording as error:
+            self.server.record('failed')
+            self._send_error(400, f'the request body must be a Wave file: {error}')
+            return
+        except Exception as error:
+            # Anything else is a fault of the server, such as a worker process dying or a bug in grading
+            self.server.record('failed')
+            self.log_error('grading failed: %r', error)
+            traceback.print_exc()
+            self._send_error(500, f'grading failed: {error!r}')
+            return
+        finally:
+            self.server.slots.release()
+
+        end = time.perf_counter()
+        timings = {
+            'read': (read_time - start) * 1000,
+            'queue': (end - read_time - grading_time) * 1000,
+            'grade': grading_time * 1000,
+            'total': (end - start) * 1000
+        }
+        self.server.record('graded', timings)
+        results['timing_ms'] = timings
+        self._send_json(200, results, {
+            'Server-Timing': ', '.join(f'{stage};dur={duration:.1f}' for stage, duration in timings.items())
+        })
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Serve recording grading over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on')
+    parser.add_argument('--workers', type=int, help='Number of worker processes, one per CPU by default')
+    parser.add_argument('--queue-size', type=int, default=8, help='Number of recordings that can wait for a free worker')
+    arguments = parser.parse_args()
+
+    server = GradingServer((arguments.host, arguments.port), arguments.workers, arguments.queue_size)
+    print(f'Grading on http://{arguments.host}:{server.server_port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
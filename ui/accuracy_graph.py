@@ -0,0 +1,153 @@
+from __future__ import annotations
+import numpy as np
+import pygame
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from application import Application
+
+def downsample(values: np.ndarray, buckets: int) -> np.ndarray:
+    '''
+    Choose which points of a series to draw, keeping the first and last point and the lowest and highest point
+    of each of a number of equal buckets, so the line keeps its shape however many points it has.
+
+    Args:
+        values (ndarray): The series
+        buckets (int): Number of buckets, at most two points of each are kept
+
+    Returns:
+        ndarray: Indices of the points to draw, in order
+    '''
+    if len(values) <= 2 * buckets:
+        return np.arange(len(values))
+
+    starts = np.linspace(0, len(values), buckets + 1).astype(np.int64)[:-1]
+    bucket_ids = np.repeat(np.arange(buckets), np.diff(np.append(starts, len(values))))
+    indices = [np.array([0, len(values) - 1])]
+    for reduce in (np.minimum, np.maximum):
+        # The first point of each bucket equal to the bucket's extreme
+        extremes = np.flatnonzero(reduce.reduceat(values, starts)[bucket_ids] == values)
+        _, first = np.unique(bucket_ids[extremes], return_index=True)
+        indices.append(extremes[first])
+    return np.unique(np.concatenate(indices))
+
+class AccuracyGraph:
+    '''
+    A line graph of accuracy across the notes of a song, with the results of past sessions overlaid.
+
+    The graph is drawn once into a surface, which is reused until the results change. Long series are downsampled
+    to the width of the graph, and each line is drawn in one call rather than segment by segment.
+    '''
+    # Most points that are each marked with a circle, as more would overlap
+    MAXIMUM_MARKERS = 100
+    # Color of each past session's line, most recent first
+    OVERLAY_COLORS = [(110, 110, 110), (150, 150, 150), (190, 190, 190)]
+
+    def __init__(self, application: Application, position: tuple[int, int] = (640, 125), size: tuple[int, int] = (500, 500)) -> None:
+        '''
+        Create an AccuracyGraph instance.
+
+        Args:
+            application (Application): Context of the Application instance required for rendering
+            position (tuple): Coordinates of the top of the y-axis
+                              default: (640, 125)
+            size (tuple): Width and height of the plotting area
+                          default: (500, 500)
+        '''
+        self.application = application
+        self.position = position
+        self.size = size
+        # The area drawn to, including the axis labels to the left of and below the plotting area
+        self.rect = pygame.Rect(position[0] - 200, position[1] - 40, size[0] + 260, size[1] + 110)
+        self.surface: pygame.Surface | None = None
+        self.key: tuple | None = None
+        # Label surfaces by text and size, as the same labels are drawn on every graph
+        self.labels: dict[tuple[str, int], pygame.Surface] = {}
+
+    def get_label(self, text: str, size: int) -> pygame.Surface:
+        if (text, size) not in self.labels:
+            self.labels[text, size] = self.application.get_font(size).render(text, True, (0, 0, 0))
+        return self.labels[text, size]
+
+    def get_points(self, percents: list[int], min_percent: int) -> list[list[float]]:
+        '''
+        Get the on-surface coordinates of the points of a series that are drawn.
+        '''
+        values = np.asarray(percents, dtype=np.float64)
+        if len(values) < 2:
+            return []
+        indices = downsample(values, self.size[0] // 2)
+        width, height = self.size
+        left, top = self.position[0] - self.rect.x, self.position[1] - self.rect.y
+        # The first point is on the y-axis and the last at the end of the x-axis
+        x = np.ceil(left - 5 + width / (len(values) - 1) * indices) + 6
+        # The lowest percent is on the x-axis and 100% at the top of the y-axis
+        y = np.ceil(top + height - 10 - height / (100 - min_percent) * (values[indices] - min_percent)) + 10
+        return np.column_stack((x, y)).tolist()
+
+    def draw(self, percents: list[int], overlays: list[list[int]]) -> pygame.Surface:
+        '''
+        Draw the graph onto a new transparent surface.
+        '''
+        surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        width, height = self.size
+        left, top = self.position[0] - self.rect.x, self.position[1] - self.rect.y
+
+        # Create a translucent underlay under the graph area to obscure potentially distracting background image
+        surface.fill((*self.application.BACKGROUND_COLOR, 200), pygame.Rect(left + 3, top, width - 2, height - 1))
+        # Draw graph Y and X axis
+        pygame.draw.line(surface, (0, 0, 0), (left, top), (left, top + height), 4)
+        pygame.draw.line(surface, (0, 0, 0), (left, top + height), (left + width, top + height), 4)
+
+        min_percent = int(min(min(series) for series in [percents, *overlays] if series) * .1) * 10
+        # Prevent axis from having only one value on it
+        if min_percent == 100:
+            min_percent = 90
+
+        # Y-axis labels every 10%, at the height of their percent
+        for percent in range(min_percent, 110, 10):
+            y = int(np.ceil(top + height - 10 - height / (100 - min_percent) * (percent - min_percent)))
+            surface.blit(self.get_label(f'{percent}%', 20), (left - 50, y))
+        # X-axis labels under every note of short songs, otherwise under the first and last
+        song_length = len(percents)
+        label_notes = range(song_length) if song_length <= 20 else (0, song_length - 1)
+        for note in label_notes:
+            x = int(np.ceil(left - 5 + width / (song_length - 1) * note))
+            surface.blit(self.get_label(str(note + 1), 20), (x, top + height + 15))
+
+        # Label text for axes
+        surface.blit(self.get_label('Accuracy', 30), (left - 190, top + 225))
+        surface.blit(self.get_label('Note count', 30), (left + 190, top + height + 35))
+        if overlays:
+            caption = f'Grey: your last {len(overlays)} session{"s" if len(overlays) > 1 else ""}'
+            surface.blit(self.get_label(caption, 20), (left + 5, top - 30))
+
+        # Oldest sessions first, so more recent lines are drawn over them
+        for series, color in reversed(list(zip(overlays, self.OVERLAY_COLORS))):
+            points = self.get_points(series, min_percent)
+            if points:
+                pygame.draw.aalines(surface, color, False, points)
+
+        points = self.get_points(percents, min_percent)
+        if points:
+            pygame.draw.aalines(surface, (0, 0, 0), False, points)
+        if len(points) <= self.MAXIMUM_MARKERS:
+            for point in points:
+                pygame.draw.circle(surface, (255, 0, 0), point, 4)
+        return surface
+
+    def render(self, percents: list[int], overlays: list[list[int]] | None = None) -> None:
+        '''
+        Draw the graph onto the display, redrawing it only if the results have changed.
+
+        Args:
+            percents (list): Accuracy in percent up to and including each note, in the format of `accuracy_breakdown`
+            overlays (list): Accuracy breakdowns of past sessions, most recent first. Up to three are drawn.
+                             default: None
+        '''
+        overlays = [series for series in (overlays or [])[:len(self.OVERLAY_COLORS)] if series]
+        key = (tuple(percents), tuple(tuple(series) for series in overlays))
+        if key != self.key:
+            self.surface = self.draw(percents, overlays)
+            self.key = key
+        self.application.screen.blit(self.surface, self.rect)
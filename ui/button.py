@@ -9,6 +9,9 @@ if TYPE_CHECKING:
 class Button:
     '''
     A user interface element that when clicked triggers some action.
+
+    Each state of the button is drawn once, when it is created, and the button is only drawn onto the display
+    when its state changes.
     '''
     def __init__(self,
                  application: Application, 
@@ -53,28 +56,40 @@ class Button:
         # (desired_x - button_width * 0.5, desired_y - button_height * 0.5)
         button_position = (round(position[0] - (dimensions[0] * 0.5)), round(position[1] - (dimensions[1] * 0.5)))
         self.rect = pygame.Rect(button_position, (dimensions[0], dimensions[1]))
-        self.render(self.colors['primary'])
+        # Area of the display the button may be drawn in, or None for anywhere
+        self.clip: pygame.Rect | None = None
+        # Number of times the button has been drawn onto the display
+        self.render_count = 0
+        self.state: str | None = None
+        self.surfaces = {
+            'normal': self._draw(self.colors['primary']),
+            'hover': self._draw(self.colors['hover']),
+            'pressed': self._draw(self.colors['alt'])
+        }
+        self.render()
 
     def call(self):
         self.function()
 
-    def render(self, color: tuple[int, int, int]) -> None:
+    def _draw(self, color: tuple[int, int, int]) -> pygame.Surface:
         '''
-        Draw the button onto the display.
-        
+        Draw the button onto a new surface the size of the button.
+
         Args:
-            color (tuple) : the color of the center of the button 
+            color (tuple): The color of the center of the button
         '''
+        surface = pygame.Surface(self.rect.size)
+
         # Draw the button frame
         frame_pixel_size = 10
-        pygame.draw.rect(self.application.screen, self.colors['alt'], self.rect)
+        surface.fill(self.colors['alt'])
 
         # Draw the button
         pygame.draw.rect(
-            self.application.screen, 
+            surface, 
             color, 
             pygame.Rect(
-                (self.rect.x + (frame_pixel_size // 2),self.rect.y + (frame_pixel_size // 2)),
+                (frame_pixel_size // 2, frame_pixel_size // 2),
                 (self.rect.width - frame_pixel_size, self.rect.height - frame_pixel_size)
             )
         )
@@ -82,36 +97,66 @@ class Button:
         # Render text in the middle of the button
         font = self.application.get_font(int(self.dimensions[1] - self.text_size))
         label = font.render(self.text, True, self.colors['text'])
-        text_position = (self.position[0] - self.dimensions[0] * .45, self.position[1] - self.dimensions[1] * .45)
-        self.application.screen.blit(label, text_position)
+        text_position = (self.position[0] - self.dimensions[0] * .45 - self.rect.x, self.position[1] - self.dimensions[1] * .45 - self.rect.y)
+        surface.blit(label, text_position)
+        return surface
 
-    def is_hovered(self, mouse_position: tuple[int, int]) -> bool:
+    def render(self, state: str = 'normal') -> None:
         '''
-        Test whether the button is being hovered over and rerender the button.
+        Draw the button onto the display, if it is not already drawn in that state.
+        
+        Args:
+            state (str): 'normal', 'hover' or 'pressed'
+                         default: 'normal'
+        '''
+        if state == self.state:
+            return
+
+        previous_clip = self.application.screen.get_clip()
+        if self.clip:
+            self.application.screen.set_clip(self.clip)
+        self.application.screen.blit(self.surfaces[state], self.rect)
+        self.application.screen.set_clip(previous_clip)
+        self.state = state
+        self.render_count += 1
+
+    def invalidate(self) -> None:
+        '''
+        Draw the button again on its next render, such as after something has been drawn over it.
+        '''
+        self.state = None
+
+    def is_hovered(self, mouse_position: tuple[int, int], mouse_clicked: bool = False) -> bool:
+        '''
+        Test whether the button is being hovered over and rerender the button if its state has changed.
         
         Args:
             mouse_position (tuple): The coordinates of the mouse cursor.
+            mouse_clicked (bool): Whether the mouse is clicked, to show the button as pressed. Default = False.
 
         Returns:
             bool: Whether the button is being hovered over.
         '''
         is_hovered = self.rect.collidepoint(mouse_position)
         if is_hovered:
-            self.render(self.colors['hover'])
+            self.render('pressed' if mouse_clicked else 'hover')
         else:
-            self.render(self.colors['primary'])
+            self.render('normal')
 
         return is_hovered
 
     def set_position(self, position: tuple[int, int]) -> None:
         '''
-        Set the position of a button.
+        Set the position of a button. The button is drawn at its new position on its next render.
 
         Args:
             position (tuple): The coordinates of the button.
         '''
+        if position == self.position:
+            return
         self.position = position
         self.rect = pygame.Rect(
             (round(position[0] - (self.dimensions[0] * .5)), round(position[1] - (self.dimensions[1] * .5))),
             (self.dimensions[0], self.dimensions[1])
-        )
\ No newline at end of file
+        )
+        self.invalidate()
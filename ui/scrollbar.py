@@ -31,10 +31,6 @@ class ScrollBar:
         self.application = application
         self.dimensions = dimensions
         self.position = position
-        # If the scrollable area is less than the width of the scroll bar track, 
-        # set to the scroll bar track width (no scrolling needed)
-        self.scroll_length = max(scroll_length, dimensions[0] + 1)# add 1 to avoid a division by 0 error
-        self.scroll_position = scroll_position
         self.colors = {
             'primary': color,
             'alt': alt_color,
@@ -48,21 +44,37 @@ class ScrollBar:
                 (dimensions[0], dimensions[1])
             )
         )
-        # The size of the scroll notch is: (size of scroll bar) / ( (scrolling length) * (size of scroll bar) )
-        self.scroll_bar_thumb = pygame.draw.rect(
-            application.screen, 
-            alt_color, 
-            pygame.Rect(
-                (self.scroll_bar_track.x + scroll_position, self.scroll_bar_track.y),
-                (self.scroll_bar_track.width / (scroll_length + 1000) * self.scroll_bar_track.width, self.scroll_bar_track.height)
-            )
-        )
+        self._size_thumb(scroll_length, scroll_position)
+        pygame.draw.rect(application.screen, alt_color, self.scroll_bar_thumb)
         self.was_scroll_bar_clicked = False
+        # Number of times the scroll bar has been drawn onto the display
+        self.render_count = 0
+
+    def _size_thumb(self, scroll_length: int, scroll_position: int) -> None:
+        # If everything fits without scrolling, the thumb fills the track and cannot move
+        self.scroll_length = max(scroll_length, 0)
+        self.scroll_position = scroll_position
+        # The size of the scroll notch is: (size of scroll bar) / ( (scrolling length) + (size of scroll bar) ) * (size of scroll bar)
+        self.scroll_bar_thumb = pygame.Rect(
+            (self.scroll_bar_track.x + scroll_position, self.scroll_bar_track.y),
+            (self.scroll_bar_track.width / (self.scroll_length + self.scroll_bar_track.width) * self.scroll_bar_track.width, self.scroll_bar_track.height)
+        )
         if self.scroll_bar_track.width > self.scroll_bar_thumb.width:
-            self.scroll_amount = scroll_length / (self.scroll_bar_track.width - self.scroll_bar_thumb.width)
+            self.scroll_amount = self.scroll_length / (self.scroll_bar_track.width - self.scroll_bar_thumb.width)
         else:
             self.scroll_amount = 0
 
+    def set_scroll_length(self, scroll_length: int) -> None:
+        '''
+        Resize the scroll bar for a new number of pixels to be scrolled, and move the notch back to the start.
+
+        Args:
+            scroll_length (int): The number of pixels to be scrolled.
+        '''
+        self._size_thumb(scroll_length, 0)
+        self.was_scroll_bar_clicked = False
+        self.render(self.colors['alt'])
+
     def _handle_scroll_bar_drag(self, mouse_position: tuple[int, int], mouse_clicked: bool) -> None:
         if mouse_clicked:
             self._update_scroll_bar_position(mouse_position)
@@ -89,6 +101,7 @@ class ScrollBar:
         '''
         pygame.draw.rect(self.application.screen, self.colors['primary'], self.scroll_bar_track)
         pygame.draw.rect(self.application.screen, thumb_color, self.scroll_bar_thumb)
+        self.render_count += 1
 
     def check(self, mouse_position: tuple[int, int], mouse_clicked: bool) -> None:
         '''
@@ -11,7 +11,8 @@ class SongTab:
                  application: Application, 
                  start_pos: int, 
                  song: tuple[str, str, str] = ('name', 'difficulty', 'location'), 
-                 highscore: int = -1) -> None:
+                 highscore: int = -1,
+                 leader: tuple[str, int] | None = None) -> None:
         '''
         Initialize a SongTab instance.
 
@@ -20,6 +21,7 @@ class SongTab:
             start_pos (int): Starting X-position of the tab.
             song (tuple): A list containing the song's name, difficulty, and location. Defaults to placeholders.
             highscore (int): Highscore for the song. Defaults to -1 (not set).
+            leader (tuple): Username and score of the top of the song's leaderboard. Defaults to None.
         '''
         self.application = application
         self.start_pos = start_pos
@@ -37,29 +39,83 @@ class SongTab:
             hover_color=(58, 186, 218), 
             text_color=(0, 0, 0)
         )
+        self.listen_button = Button(
+            self.application, 
+            text='listen', 
+            text_size=22, 
+            position=(self.position + 125, 315), 
+            dimensions=(160, 60), 
+            on_click=self.listen,
+            color=(213, 240, 247), 
+            alt_color=(0, 162, 232), 
+            hover_color=(58, 186, 218), 
+            text_color=(0, 0, 0)
+        )
+        self.buttons = [self.button, self.listen_button]
+        self.highscore = highscore
+        self.leader = leader
+        # Number of times the tab has been drawn onto the display
+        self.render_count = 0
+        self.surface = self._draw()
+
+    def set_song(self, song: tuple[str, str, str], highscore: int, start_pos: int, leader: tuple[str, int] | None = None) -> None:
+        '''
+        Reuse the tab for a different song.
+
+        Args:
+            song (tuple): A list containing the song's name, difficulty, and location.
+            highscore (int): Highscore for the song, or -1 if not set.
+            start_pos (int): Starting X-position of the tab.
+            leader (tuple): Username and score of the top of the song's leaderboard.
+        '''
+        self.song = song
         self.highscore = highscore
+        self.leader = leader
+        self.start_pos = start_pos
+        self.position = start_pos
+        self.surface = self._draw()
+
+    def listen(self) -> None:
+        self.application.play_preview(self.song[2])
 
     def start_song(self) -> None:
         self.application.set_song(self.song)
         self.application.set_screen('performance')
 
-    def render(self) -> None:
-        pygame.draw.rect(self.application.screen, (0, 162, 232), (self.position, 115, 250, 350))
-        pygame.draw.rect(self.application.screen, (153, 217, 234), (self.position + 5, 120, 240, 340)) # 5 pixels smaller to create a border
+    def _draw(self) -> pygame.Surface:
+        '''
+        Draw the tab, without its button, onto a new surface. The tab is redrawn only when its song changes,
+        so scrolling just moves the surface.
+        '''
+        surface = pygame.Surface((250, 350))
+        surface.fill((0, 162, 232))
+        pygame.draw.rect(surface, (153, 217, 234), (5, 5, 240, 340)) # 5 pixels smaller to create a border
 
         font_40 = self.application.get_font(40)
         font_20 = self.application.get_font(20)
         name_text = font_40.render(self.song[0], True, (0, 0, 0))
         difficulty_text = font_20.render(self.song[1], True, (0, 0, 0))
-        self.application.screen.blit(name_text, (self.position + 10, 120))
-        self.application.screen.blit(difficulty_text, (self.position + 10, 170))
+        surface.blit(name_text, (10, 5))
+        surface.blit(difficulty_text, (10, 55))
 
         if self.highscore >= 0:
             highscore = font_20.render(f'Highscore: {self.highscore}%', True, (0, 0, 0))
-            self.application.screen.blit(highscore, (self.position + 10, 200))
+            surface.blit(highscore, (10, 85))
+
+        if self.leader:
+            leader = font_20.render(f'Top: {self.leader[0]} - {self.leader[1]}%', True, (0, 0, 0))
+            surface.blit(leader, (10, 115))
+        return surface
+
+    def render(self) -> None:
+        self.application.screen.blit(self.surface, (self.position, 115))
+        for button in self.buttons:
+            button.invalidate()
+        self.render_count += 1
 
     def set_x(self, x) -> None:
         self.button.set_position((self.start_pos + x + 125, 400))
+        self.listen_button.set_position((self.start_pos + x + 125, 315))
         self.position = self.start_pos + x
 
     def get_x(self) -> int:
@@ -1,4 +1,5 @@
 from __future__ import annotations
+from typing import Callable
 import pygame
 
 from typing import TYPE_CHECKING
@@ -15,7 +16,8 @@ class TextInput:
         allowed_characters: str, 
         color: tuple[int, int, int] = (153, 217, 234), 
         active_color: tuple[int, int, int] = (113, 203, 225), 
-        input_hidden: bool = False
+        input_hidden: bool = False,
+        on_change: Callable[[str], None] | None = None
     ) -> None:
         '''
         Initialize a TextInput instance.
@@ -29,6 +31,7 @@ class TextInput:
             color (tuple): Color when inactive.
             active_color (tuple): Color when active.
             input_hidden (bool): Whether the input should be hidden. Defaults to False.
+            on_change (Callable): Function called with the new value whenever the value changes. Defaults to None.
         '''
         self.application = application
         self.dimensions = dimensions
@@ -38,21 +41,47 @@ class TextInput:
         self.colors = {'inactive': color, 'active': active_color}
         self.rect = pygame.Rect(position, dimensions)
         self.input_hidden = input_hidden
+        self.on_change = on_change
         self.is_active = False
         self.cursor = None
         self.value = []
         self.cursor_position = 0
+        # Number of times the text input has been drawn onto the display
+        self.render_count = 0
+        self.state: str | None = None
+        self._draw_surfaces()
 
-    def render(self) -> None:
+    def _draw_surfaces(self) -> None:
         '''
-        Render the text input on the screen.
+        Draw the text input with its current value onto a new surface for each state.
         '''
-        color = self.colors['active'] if self.is_active else self.colors['inactive']
-        pygame.draw.rect(self.application.screen, color, self.rect)
         font = self.application.get_font(self.dimensions[1])
         text_content = '•' * len(self.value) if self.input_hidden else ''.join(self.value)
         text = font.render(text_content, True, (0, 0, 0))
-        self.application.screen.blit(text, (self.rect.left + (.01 * self.dimensions[0]), self.rect.top - (.1 * self.dimensions[1])))
+        self.surfaces = {}
+        for state, color in (('normal', self.colors['inactive']), ('focused', self.colors['active'])):
+            surface = pygame.Surface(self.rect.size)
+            surface.fill(color)
+            surface.blit(text, (.01 * self.dimensions[0], -.1 * self.dimensions[1]))
+            self.surfaces[state] = surface
+        self.state = None
+
+    def render(self) -> None:
+        '''
+        Render the text input on the screen, if it has changed since it was last rendered.
+        '''
+        state = 'focused' if self.is_active else 'normal'
+        if state == self.state:
+            return
+        self.application.screen.blit(self.surfaces[state], self.rect)
+        self.state = state
+        self.render_count += 1
+
+    def invalidate(self) -> None:
+        '''
+        Draw the text input again on its next render, such as after something has been drawn over it.
+        '''
+        self.state = None
 
     def check(self, mouse_position: tuple[int, int], mouse_clicked: bool) -> None:
         '''
@@ -73,7 +102,7 @@ class TextInput:
                 self.cursor = None
             if mouse_clicked:
                 self.is_active = False
-        self.render()        
+        self.render()
 
     def key_press(self, key: str) -> None:
         '''
@@ -85,7 +114,12 @@ class TextInput:
         if not self.is_active:
             return
 
+        previous_value = self.get_value()
         self._handle_character_input(key)
+        if self.get_value() != previous_value:
+            self._draw_surfaces()
+            if self.on_change:
+                self.on_change(self.get_value())
 
     def _handle_character_input(self, key: str) -> None:
         if key == '\x08':  # Backspace
@@ -0,0 +1,68 @@
+import os
+import json
+import threading
+from user.user import User
+
+class CalibrationProfiles:
+    '''
+    Saved note calibrations, by user and input device, so calibration only has to be done once per microphone.
+
+    A logged in user's profiles are kept in their user data under 'calibration'. Profiles made without logging in
+    are kept in a file shared by everyone using the computer, and are used by any user without a profile of their own.
+    '''
+    def __init__(self, path: str = '.\\assets\\calibration.json') -> None:
+        '''
+        Create a CalibrationProfiles instance, loading the shared profiles if there are any.
+
+        Args:
+            path (str): Location of the shared profiles
+                        default: '.\\assets\\calibration.json'
+        '''
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, 'r') as file:
+                self.shared_profiles: dict[str, dict[str, list[int]]] = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            self.shared_profiles = {}
+
+    def load(self, user: User, device: str) -> dict[str, list[int]] | None:
+        '''
+        Get the calibration to use for a device.
+
+        Args:
+            user (User): The current user, who may not be logged in
+            device (str): Name of the input device
+
+        Returns:
+            dict | None: Calibrated note frequencies, in the format of `Application.notes`, or None if the device has not been calibrated
+        '''
+        profiles = user.get_data().get('calibration', {})
+        if device in profiles:
+            return profiles[device]
+        with self.lock:
+            return self.shared_profiles.get(device)
+
+    def save(self, user: User, device: str, notes: dict[str, list[int]]) -> None:
+        '''
+        Save a calibration to the user's profiles, or to the shared profiles if no user is logged in.
+
+        Args:
+            user (User): The current user, who may not be logged in
+            device (str): Name of the input device
+            notes (dict): Calibrated note frequencies, in the format of `Application.notes`
+        '''
+        notes = {note: list(frequencies) for note, frequencies in notes.items()}
+        if user.logged_in:
+            data = user.get_data()
+            data['calibration'] = data.get('calibration', {}) | {device: notes}
+            user.save(data)
+            return
+
+        with self.lock:
+            self.shared_profiles[device] = notes
+            # Write to a temporary file and rename it over the old profiles so they are never left half written
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w') as file:
+                json.dump(self.shared_profiles, file)
+            os.replace(temp_path, self.path)
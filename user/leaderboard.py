@@ -0,0 +1,88 @@
+import sqlite3
+import threading
+from user.user_store import UserStore
+
+class Leaderboard:
+    '''
+    Per-song rankings of every user's best score.
+
+    Scores are kept in a table ordered by song and score, so reading the top of a song's ranking only
+    touches those rows however many users there are. It is updated as each result is saved.
+    '''
+    def __init__(self, path: str = '.\\assets\\users\\leaderboard.db') -> None:
+        '''
+        Open the leaderboard database, creating it if it does not exist.
+
+        Args:
+            path (str): Location of the database file
+                        default: '.\\assets\\users\\leaderboard.db'
+        '''
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS scores ('
+                'song TEXT NOT NULL, username TEXT NOT NULL, score INTEGER NOT NULL, '
+                'PRIMARY KEY (song, username)) WITHOUT ROWID'
+            )
+            self.connection.execute('CREATE INDEX IF NOT EXISTS scores_by_rank ON scores (song, score DESC)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+    def seed(self, user_store: UserStore) -> None:
+        '''
+        Fill the leaderboard from the high scores already saved in the user store. This only happens once.
+
+        Args:
+            user_store (UserStore): The store of every user's data
+        '''
+        with self.lock, self.connection:
+            if self.connection.execute("SELECT 1 FROM meta WHERE key = 'seeded'").fetchone():
+                return
+
+            for username, data in user_store.get_all():
+                for song, score in data.items():
+                    if song != 'password' and isinstance(score, int):
+                        self._update(song, username, score)
+
+            self.connection.execute("INSERT INTO meta VALUES ('seeded', '1')")
+
+    def _update(self, song: str, username: str, score: int) -> None:
+        self.connection.execute(
+            'INSERT INTO scores VALUES (?, ?, ?) '
+            'ON CONFLICT (song, username) DO UPDATE SET score = MAX(score, excluded.score)',
+            (song, username, score)
+        )
+
+    def update(self, song: str, username: str, score: int) -> None:
+        '''
+        Record a user's score on a song, keeping it only if it beats their previous best.
+
+        Args:
+            song (str): Name of the song
+            username (str): The user who performed
+            score (int): Accuracy of the performance as a percentage
+        '''
+        with self.lock, self.connection:
+            self._update(song, username, score)
+
+    def get_top(self, song: str, count: int = 5) -> list[tuple[str, int]]:
+        '''
+        Get the highest ranked users on a song.
+
+        Args:
+            song (str): Name of the song
+            count (int): Number of users to get
+                         default: 5
+
+        Returns:
+            list: (username, score) of each user, best first
+        '''
+        with self.lock:
+            return self.connection.execute(
+                'SELECT username, score FROM scores WHERE song = ? ORDER BY score DESC LIMIT ?',
+                (song, count)
+            ).fetchall()
+
+    def remove_user(self, username: str) -> None:
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM scores WHERE username = ?', (username,))
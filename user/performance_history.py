@@ -0,0 +1,158 @@
+import time
+import sqlite3
+import threading
+from typing import Any
+
+class PerformanceHistory:
+    '''
+    Append-only log of every performance by every user, with aggregate queries over it.
+
+    Each session is one row of `sessions`, and the result of each note in the session is one row of `notes`.
+    Note rows are clustered by session, so reading a session or a user's sessions never scans other users' data.
+    '''
+    def __init__(self, path: str = '.\\assets\\users\\history.db') -> None:
+        '''
+        Open the history database, creating it if it does not exist.
+
+        Args:
+            path (str): Location of the database file
+                        default: '.\\assets\\users\\history.db'
+        '''
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            # Appends only ever touch the end of the log, so write-ahead logging keeps them cheap
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                'id INTEGER PRIMARY KEY, username TEXT NOT NULL, timestamp REAL NOT NULL, '
+                'song TEXT NOT NULL, score INTEGER NOT NULL, accuracy INTEGER NOT NULL)'
+            )
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS sessions_by_user ON sessions (username, song, timestamp)'
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS notes ('
+                'session_id INTEGER NOT NULL, note_index INTEGER NOT NULL, note_name TEXT NOT NULL, '
+                'hit INTEGER NOT NULL, offset_ms REAL, detected TEXT, '
+                'PRIMARY KEY (session_id, note_index)) WITHOUT ROWID'
+            )
+
+    def record(self, username: str, results: dict[str, Any], timestamp: float | None = None) -> int:
+        '''
+        Append a performance to the log.
+
+        Args:
+            username (str): The user who performed
+            results (dict): Performance results in the format of `Application.performance_results`
+            timestamp (float): Time of the performance in seconds since the epoch
+                               default: now
+
+        Returns:
+            session_id (int): Identifier of the new session
+        '''
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO sessions (username, timestamp, song, score, accuracy) VALUES (?, ?, ?, ?, ?)',
+                (
+                    username,
+                    time.time() if timestamp is None else timestamp,
+                    results.get('song_name', 'Undefined'),
+                    results.get('score', 0),
+                    results.get('accuracy', 0)
+                )
+            )
+            session_id = cursor.lastrowid
+            self.connection.executemany(
+                'INSERT INTO notes VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    (session_id, i, note['note_name'], int(note['hit']), note['offset_ms'], note['detected'])
+                    for i, note in enumerate(results.get('note_results', []))
+                )
+            )
+        return session_id
+
+    def remove_user(self, username: str) -> None:
+        '''
+        Delete every session of a user and the results of their notes.
+
+        Args:
+            username (str): The user to delete
+        '''
+        with self.lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM notes WHERE session_id IN (SELECT id FROM sessions WHERE username = ?)', (username,)
+            )
+            self.connection.execute('DELETE FROM sessions WHERE username = ?', (username,))
+
+    def get_progress(self, username: str, song: str) -> list[tuple[float, int]]:
+        '''
+        Get a user's accuracy on a song over time.
+
+        Returns:
+            list: (timestamp, accuracy) of each session, oldest first
+        '''
+        with self.lock:
+            return self.connection.execute(
+                'SELECT timestamp, accuracy FROM sessions WHERE username = ? AND song = ? ORDER BY timestamp',
+                (username, song)
+            ).fetchall()
+
+    def get_recent_hits(self, username: str, song: str, limit: int = 3, before: int | None = None) -> list[list[int]]:
+        '''
+        Get whether each note was hit in a user's most recent sessions of a song.
+
+        Args:
+            username (str): The user who performed
+            song (str): Name of the song
+            limit (int): Most sessions to get
+                         default: 3
+            before (int): Only get sessions recorded before this session
+                          default: None, get the latest sessions
+
+        Returns:
+            list: Whether each note of each session was hit, 1 or 0, most recent session first
+        '''
+        query, parameters = 'SELECT id FROM sessions WHERE username = ? AND song = ?', [username, song]
+        if before is not None:
+            query, parameters = query + ' AND id < ?', parameters + [before]
+        with self.lock:
+            session_ids = self.connection.execute(query + ' ORDER BY timestamp DESC LIMIT ?', parameters + [limit]).fetchall()
+            return [
+                [hit for hit, in self.connection.execute(
+                    'SELECT hit FROM notes WHERE session_id = ? ORDER BY note_index', (session_id,)
+                )]
+                for session_id, in session_ids
+            ]
+
+    def get_weakest_notes(self, username: str, limit: int = 5) -> list[tuple[str, float, int]]:
+        '''
+        Get the notes a user misses most often across all of their sessions.
+
+        Returns:
+            list: (note name, hit rate, attempts) of each note, lowest hit rate first
+        '''
+        with self.lock:
+            return self.connection.execute(
+                'SELECT note_name, AVG(hit), COUNT(*) FROM notes '
+                'JOIN sessions ON sessions.id = notes.session_id '
+                'WHERE sessions.username = ? GROUP BY note_name ORDER BY AVG(hit), COUNT(*) DESC LIMIT ?',
+                (username, limit)
+            ).fetchall()
+
+    def get_mean_latency(self, username: str) -> dict[str, float]:
+        '''
+        Get a user's mean timing offset of correctly played notes on each song.
+
+        Returns:
+            dict: Each song name and the mean offset in milliseconds, negative when played early
+        '''
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT song, AVG(offset_ms) FROM notes '
+                'JOIN sessions ON sessions.id = notes.session_id '
+                'WHERE sessions.username = ? AND notes.hit = 1 GROUP BY song',
+                (username,)
+            ).fetchall()
+        return dict(rows)
@@ -1,26 +1,28 @@
-import os
-import json
+from __future__ import annotations
+import threading
+from user.user_store import UserStore
 
 class User:
     '''
     User class to handle song performance storing.
+
+    The user's data is kept in memory once they log in. Saves mark it as dirty and are written to the
+    user store in the background, with saves made in quick succession coalesced into a single write.
     '''
-    def __init__(self) -> None:
-        self.data_file_path: str = ''
+    # Seconds to wait after a save before writing, so that bursts of saves only write once
+    WRITE_DELAY = 1.0
+
+    def __init__(self, store: UserStore) -> None:
+        self.store = store
+        self.username: str | None = None
+        self.data: dict[str, str | int] = {}
         self.logged_in = False
 
-    def _load_data(self) -> None:
-        '''
-        Load user data from a JSON file.
-        
-        Raises:
-            Exception: If the file path is not provided.
-        '''
-        if not self.data_file_path:
-            raise Exception("Unable to load user data as the file path has not been provided.")
-        
-        with open(self.data_file_path, 'r') as file:
-            self.data: dict[str, str | int] = json.load(file)
+        self._dirty = False
+        self._data_lock = threading.Lock()
+        # Held for the whole of a write so that an older snapshot can never overwrite a newer one
+        self._write_lock = threading.Lock()
+        self._write_timer: threading.Timer | None = None
 
     def validate(self, username: str, password: str) -> str | None:
         '''
@@ -36,24 +38,16 @@ class User:
         if not username or not password:
             return 'Both fields must be filled in.'
         
-        directory = [[files, root] for root, _, files in os.walk('.\\assets\\users\\')]
-        if len(directory) == 1 and not directory[0][0]:
+        data = self.store.get(username)
+        if data is None:
             return 'User does not exist.'
 
-        for file in directory[0][0]:
-            if username in file:
-                self.data_file_path = directory[0][1] + file
-                self._load_data()
+        if password != data['password']:
+            return 'Invalid password.'
 
-                if password == self.data['password']:
-                    self.username = username
-                    self.logged_in = True
-                    return
-                else:
-                    self.data_file_path = ''
-                    self.data = {}
-                    return 'Invalid password.'
-        return 'User does not exist.'
+        self.username = username
+        self.data = data
+        self.logged_in = True
 
     def create(self, username: str, password: str) -> str | None:
         '''
@@ -69,67 +63,90 @@ class User:
         if not username or not password:
             return 'Both fields must be filled in.'
         
-        error = self.validate(username, password)
-        if error != 'User does not exist.':
+        if self.store.exists(username):
             return 'User already exists.'
         
-        self.data_file_path = f'.\\assets\\users\\{username}.json'
         self.username = username
         self.logged_in = True
         self.save({'password': password})
+        self.flush()
 
     def save(self, data: dict[str, str | int]) -> None:
         '''
-        Save user data to a JSON file.
+        Update the user's data and schedule it to be written to the user store in the background.
         
         Args:
             data (dict): The user data to be saved.
         
         Raises:
-            Exception: If the file path is not provided.
+            Exception: If no user is logged in.
         '''
-        self.data = data
+        if not self.username:
+            raise Exception("Unable to save user data as no user is logged in.")
 
-        if not self.data_file_path:
-            raise Exception("Unable to save user data as the file path has not been provided.")
-        
-        with open(self.data_file_path, 'w') as file:
-            json.dump(data, file, indent=4)
+        with self._data_lock:
+            self.data = data
+            self._dirty = True
+            if self._write_timer is None:
+                self._write_timer = threading.Timer(self.WRITE_DELAY, self.flush)
+                self._write_timer.daemon = True
+                self._write_timer.start()
+
+    def flush(self) -> None:
+        '''
+        Write any unsaved changes to the user store now, blocking until they are written.
+        '''
+        with self._write_lock:
+            with self._data_lock:
+                if self._write_timer:
+                    self._write_timer.cancel()
+                    self._write_timer = None
+                if not self._dirty or not self.username:
+                    return
+                snapshot = dict(self.data)
+                self._dirty = False
+
+            self.store.put(self.username, snapshot)
 
     def remove(self) -> None:
         '''
-        Remove the user's data file.
+        Remove the user's data from the user store.
         
         Raises:
-            ValueError: If the file path is not provided.
+            ValueError: If no user is logged in.
         '''
-        if not self.data_file_path:
-            raise ValueError("Unable to remove user data as the file path has not been provided.")
-        
-        self.logged_in = False
-        os.remove(self.data_file_path)
+        if not self.username:
+            raise ValueError("Unable to remove user data as no user is logged in.")
+        
+        # Held until the user is deleted, so a write already in progress cannot put the user back afterwards
+        with self._write_lock:
+            with self._data_lock:
+                if self._write_timer:
+                    self._write_timer.cancel()
+                    self._write_timer = None
+                self._dirty = False
+
+            self.logged_in = False
+            self.store.delete(self.username)
 
     def get_data(self) -> dict[str, str | int]:
         '''
-        Get the user's data.
+        Get a copy of the user's data. Changes are made to the copy and passed to `save`, so the data is never
+        changed while a background write is taking a snapshot of it.
         
         Returns:
-            dict: The user's data if available, or an empty dictionary if the file path is not stored.
+            dict: The user's data if available, or an empty dictionary if no user is logged in.
         '''
-        if self.data_file_path:
-            self._load_data()
-            return self.data
-        else:
+        if not self.username:
             return {}
+        with self._data_lock:
+            return dict(self.data)
 
     def get_username(self) -> str | None:
         '''
         Get the username associated with the user's data.
         
         Returns:
-            str | None: The username if available, or None if the file path is not stored.
+            str | None: The username if available, or None if no user is logged in.
         '''
-        if self.data_file_path:
-            return self.username
-        else:
-            return None
\ No newline at end of file
+        return self.username
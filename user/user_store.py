@@ -0,0 +1,94 @@
+import os
+import json
+import sqlite3
+import threading
+from typing import Any
+
+class UserStore:
+    '''
+    SQLite database holding every user's data, indexed by username.
+    '''
+    def __init__(self, path: str = '.\\assets\\users\\users.db', legacy_directory: str = '.\\assets\\users') -> None:
+        '''
+        Open the user database, creating it and importing any per-user JSON files the first time.
+
+        Args:
+            path (str): Location of the database file
+                        default: '.\\assets\\users\\users.db'
+            legacy_directory (str): Directory of per-user JSON files to migrate from
+                                    default: '.\\assets\\users'
+        '''
+        self.path = path
+        # The connection is shared between threads, so access to it is serialised by the lock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, data TEXT NOT NULL)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self._migrate(legacy_directory)
+
+    def _migrate(self, legacy_directory: str) -> None:
+        '''
+        Import the per-user JSON files used by earlier versions. This only happens once per database,
+        and the JSON files are left in place.
+
+        Args:
+            legacy_directory (str): Directory containing '<username>.json' files
+        '''
+        with self.lock, self.connection:
+            if self.connection.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+                return
+
+            for file_name in os.listdir(legacy_directory):
+                username, extension = os.path.splitext(file_name)
+                if extension != '.json':
+                    continue
+                with open(os.path.join(legacy_directory, file_name), 'r') as file:
+                    data = json.load(file)
+                self.connection.execute('INSERT OR IGNORE INTO users VALUES (?, ?)', (username, json.dumps(data)))
+
+            self.connection.execute("INSERT INTO meta VALUES ('migrated', '1')")
+
+    def get(self, username: str) -> dict[str, Any] | None:
+        '''
+        Look up a user's data.
+
+        Args:
+            username (str): Exact username to look up
+
+        Returns:
+            dict | None: The user's data, or None if the user does not exist
+        '''
+        with self.lock:
+            row = self.connection.execute('SELECT data FROM users WHERE username = ?', (username,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def exists(self, username: str) -> bool:
+        with self.lock:
+            return self.connection.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone() is not None
+
+    def get_all(self) -> list[tuple[str, dict[str, Any]]]:
+        '''
+        Get every user's data. This reads the whole store, so it is only for one-off jobs such as migrations.
+
+        Returns:
+            list: (username, data) of each user
+        '''
+        with self.lock:
+            rows = self.connection.execute('SELECT username, data FROM users').fetchall()
+        return [(username, json.loads(data)) for username, data in rows]
+
+    def put(self, username: str, data: dict[str, Any]) -> None:
+        '''
+        Create or replace a user's data in a single transaction.
+
+        Args:
+            username (str): The user to save
+            data (dict): The user's data
+        '''
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO users VALUES (?, ?)', (username, json.dumps(data)))
+
+    def delete(self, username: str) -> None:
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM users WHERE username = ?', (username,))